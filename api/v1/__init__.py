@@ -1 +1 @@
-from . import beatmaps, beatmapsets, leaderboards, scores, users, requests, login, token, queues, profiles
+from . import beatmaps, beatmapsets, leaderboards, scores, users, requests, login, token, queues, profiles, metrics
@@ -1,31 +1,52 @@
-from io import BytesIO
-
-import aiofiles
-from starlette.responses import PlainTextResponse
+from starlette.responses import FileResponse, Response
 from connexion import request
 
 from app.beatmap_manager import BeatmapManager
 from app.database import PostgresqlDB
 from app.redis import RedisClient
+from app.utils import etag_matches
+from app.config import IMMUTABLE_CACHE_CONTROL
+
+MEDIA_TYPE = "text/plain; charset=utf-8"
 
 
 async def search(beatmap_id: int, snapshot_number: int):
     rc: RedisClient = request.state.rc
     db: PostgresqlDB = request.state.db
 
-    if not await db.get_beatmap_snapshot(beatmap_id=beatmap_id, snapshot_number=snapshot_number):
+    beatmap_snapshot = await db.get_beatmap_snapshot(beatmap_id=beatmap_id, snapshot_number=snapshot_number)
+
+    if not beatmap_snapshot:
         return {"message": f"There is no beatmap snapshot with beatmap ID '{beatmap_id}' and snapshot number '{snapshot_number}'"}, 404
 
+    accepted_encodings = {encoding.split(";")[0].strip() for encoding in request.headers.get("accept-encoding", "").split(",")}
     bm = BeatmapManager(rc, db)
-    dotosu_file_path = bm.get_path(beatmap_id, snapshot_number)
 
     try:
-        async with aiofiles.open(dotosu_file_path, 'rb') as file:
-            dotosu_file_data = await file.read()
+        dotosu_file_path, content_encoding = bm.get_encoded_path(beatmap_snapshot.checksum, accepted_encodings)
     except FileNotFoundError:
-        return {"message": f"Beatmap .osu file not found: {beatmap_id}/{snapshot_number}.osu"}, 404
+        dotosu_file_path = content_encoding = None
+
+    # The checksum is the MD5 of the file itself, so it makes for a strong validator of each representation
+    headers = {
+        "ETag": f'"{beatmap_snapshot.checksum}{f"-{content_encoding}" if content_encoding else ""}"',
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL,
+        "Vary": "Accept-Encoding"
+    }
+
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
 
-    dotosu_file_io = BytesIO(dotosu_file_data)
-    dotosu_file_io.seek(0)
+    if dotosu_file_path is not None:
+        if content_encoding is not None:
+            headers["Content-Encoding"] = content_encoding
+
+        return FileResponse(dotosu_file_path, headers=headers, media_type=MEDIA_TYPE)
+
+    # Stored in a form the client can't decode, so decompress it here
+    try:
+        dotosu_file_data = await bm.get(beatmap_snapshot.checksum)
+    except FileNotFoundError:
+        return {"message": f"Beatmap .osu file not found: {beatmap_id}/{snapshot_number}.osu"}, 404
 
-    return PlainTextResponse(content=dotosu_file_io.read().decode())
+    return Response(content=dotosu_file_data, headers=headers, media_type=MEDIA_TYPE)
@@ -39,20 +39,18 @@ async def post(body: dict, **kwargs):
 
     try:
         bm = BeatmapManager(rc, db)
-        beatmap_ids = await bm.archive(beatmapset_id)
+        snapshot_numbers = await bm.archive(beatmapset_id)
     except httpx.HTTPStatusError as e:
         return e.response.json(), e.response.status_code
 
-    if beatmap_ids:
-        response = []
-
-        for beatmap_id in beatmap_ids:
-            snapshot_number = (await db.get_beatmap_snapshot(beatmap_id=beatmap_id, _reversed=True)).snapshot_number
-
-            response.append({
+    if snapshot_numbers:
+        response = [
+            {
                 "beatmap_id": beatmap_id,
                 "snapshot_number": snapshot_number
-            })
+            }
+            for beatmap_id, snapshot_number in snapshot_numbers.items()
+        ]
 
         return response, 201
     else:
@@ -32,4 +32,6 @@ async def search(**kwargs):
 
         page_data = [BeatmapsetListingSchema.model_validate(beatmapset_listing).model_dump(context=context) for beatmapset_listing in page]
 
-    return page_data, 200
+    headers = {"X-Next-Cursor": se.next_cursor} if se.next_cursor else {}
+
+    return page_data, 200, headers
@@ -1,10 +1,11 @@
-from starlette.responses import StreamingResponse
+from starlette.responses import FileResponse, StreamingResponse, Response
 from connexion import request
 
 from app.beatmap_manager import BeatmapManager
 from app.database import PostgresqlDB
 from app.redis import RedisClient
-from app.utils import stream_file
+from app.utils import etag_matches
+from app.config import IMMUTABLE_CACHE_CONTROL
 
 
 async def search(beatmapset_id: int, snapshot_number: int):
@@ -13,12 +14,19 @@ async def search(beatmapset_id: int, snapshot_number: int):
 
     try:
         bm = BeatmapManager(rc, db)
-        zip_file_io = await bm.get_zip(beatmapset_id, snapshot_number)
+        zip_file, checksum = await bm.get_zip(beatmapset_id, snapshot_number)
     except ValueError:
         return {"message": f"BeatmapsetSnapshot with beatmapset_id '{beatmapset_id}' and snapshot_number '{snapshot_number}' not found"}, 404
 
-    return StreamingResponse(
-        content=stream_file(zip_file_io),
-        headers={"Content-Disposition": f"attachment; filename={beatmapset_id}.zip"},
-        media_type="application/zip"
-    )
+    headers = {"Content-Disposition": f"attachment; filename={beatmapset_id}.zip"}
+
+    if checksum is not None:
+        headers |= {"ETag": f'"{checksum}"', "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+
+        if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+            return Response(status_code=304, headers={key: headers[key] for key in ("ETag", "Cache-Control")})
+
+    if isinstance(zip_file, str):
+        return FileResponse(zip_file, headers=headers, media_type="application/zip")
+
+    return StreamingResponse(content=zip_file, headers=headers, media_type="application/zip")
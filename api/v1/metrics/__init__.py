@@ -0,0 +1,12 @@
+from starlette.responses import PlainTextResponse
+
+from app.enums import RoleName
+from app.metrics import render_metrics
+from app.security import role_authorization
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@role_authorization(RoleName.ADMIN)
+async def search(**kwargs):
+    return PlainTextResponse(content=render_metrics(), headers={"Content-Type": PROMETHEUS_CONTENT_TYPE})
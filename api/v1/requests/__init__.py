@@ -10,11 +10,14 @@ from app.database.schemas import RequestSchema
 from app.security import role_authorization
 from app.security.overrides import queue_owner_override
 from app.enums import RoleName
-from app.redis import Namespace, ChannelName, RedisClient
+from app.redis import Namespace, ChannelName, RedisClient, FRESH_READ_MAX_AGE
 from app.redis.models import QueueRequestHandlerTask
+from app.exceptions import RateLimitExceeded
 from app.config import ADMIN_USER_IDS, DISABLE_SECURITY
 from . import listings, tasks
 
+RATE_LIMIT_TIMEOUT = 10
+
 
 async def search(**kwargs):  # TODO: Need to redo this since /requests/listings is a thing now
     db: PostgresqlDB = request.state.db
@@ -82,8 +85,12 @@ async def post(body: dict, **kwargs):
     if await db.get_request(beatmapset_id=beatmapset_id, queue_id=queue_id):
         return {"message": f"The request with beatmapset ID '{beatmapset_id}' already exists in queue '{queue.name}'"}, 409
 
-    oac = OsuAPIClient(rc)
-    beatmapset_dict = await oac.get_beatmapset(beatmapset_id)
+    oac = OsuAPIClient(rc, rate_limit_timeout=RATE_LIMIT_TIMEOUT)
+
+    try:
+        beatmapset_dict = await oac.get_beatmapset(beatmapset_id, max_age=FRESH_READ_MAX_AGE)
+    except RateLimitExceeded as e:
+        return {"message": str(e)}, 429
 
     if beatmapset_dict["status"] in ("ranked", "approved", "qualified", "loved"):
         return {"message": f"The beatmapset is already {beatmapset_dict['status']} on osu!"}, 400
@@ -37,4 +37,6 @@ async def search(**kwargs):  # TODO: Improve security
             for beatmapset_listing, request_ in page
         ]
 
-    return page_data, 200
+    headers = {"X-Next-Cursor": se.next_cursor} if se.next_cursor else {}
+
+    return page_data, 200, headers
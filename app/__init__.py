@@ -3,12 +3,14 @@ from connexion.exceptions import Forbidden
 from connexion.resolver import RestyResolver
 from connexion.middleware import MiddlewarePosition
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.gzip import GZipMiddleware
 
 from .lifespan import lifespan
 from .spec import openapi_spec
-from .error_handlers import forbidden
-from .config import SPEC_DIR
+from .error_handlers import forbidden, circuit_open
+from .exceptions import CircuitOpenError
+from .metrics import CallerMiddleware
+from .middleware import SelectiveGZipMiddleware
+from .config import SPEC_DIR, GZIP_EXCLUDED_PATHS
 
 connexion_app = AsyncApp(__name__, specification_dir=SPEC_DIR, lifespan=lifespan)
 
@@ -18,10 +20,17 @@ connexion_app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 connexion_app.add_middleware(
-    GZipMiddleware,
-    position=MiddlewarePosition.BEFORE_EXCEPTION
+    SelectiveGZipMiddleware,
+    position=MiddlewarePosition.BEFORE_EXCEPTION,
+    exclude_paths=GZIP_EXCLUDED_PATHS
+)
+connexion_app.add_middleware(
+    CallerMiddleware,
+    position=MiddlewarePosition.BEFORE_SECURITY
 )
 connexion_app.add_api(openapi_spec, resolver=RestyResolver("api.v1"))
 connexion_app.add_error_handler(Forbidden, forbidden)
+connexion_app.add_error_handler(CircuitOpenError, circuit_open)
@@ -1,257 +1,313 @@
 import os
+import time
+import random
 import asyncio
-from io import BytesIO
-from zipfile import ZipFile
+import hashlib
+import contextlib
+from typing import AsyncIterator
 
-import httpx
 import aiofiles
-from httpx import HTTPError
-from sqlalchemy.exc import IntegrityError
+from httpx import HTTPError, HTTPStatusError
 
-from app.osu_api import OsuAPIClient
+from app.osu_api import OsuAPIClient, RETRY_STATUS_CODES
+from .http_client import get_http_client
+from .blob_store import BlobStore
+from .zip_stream import stream_zip, ZIP_COMPRESSION_METHODS, READ_CHUNK_SIZE
 from .database import PostgresqlDB
-from .database.models import Profile, Tag
 from .database.schemas import BeatmapSnapshotSchema, BeatmapsetSnapshotSchema, ProfileSchema
-from .redis import RedisClient, Namespace, LOCK_EXPIRY
-from .utils import combine_checksums, aware_utcnow
-from .exceptions import RestrictedUserError
+from .redis import RedisClient, RedisLock, ChannelName, Namespace, RateLimitPriority, FRESH_READ_MAX_AGE
+from .utils import combine_checksums
+from .exceptions import ChecksumMismatchError
 from .logger import logger
-from .config import INSTANCE_DIR
+from .config import INSTANCE_DIR, OSU_BASE_URL, BEATMAP_DOWNLOAD_CONFIGURATION, BEATMAPSET_ZIP_CONFIGURATION, BLOB_STORAGE_CONFIGURATION
 
-BEATMAPS_PATH = os.path.join(INSTANCE_DIR, "beatmaps")
 BEATMAPSETS_PATH = os.path.join(INSTANCE_DIR, "beatmapsets")
-BEATMAP_DOWNLOAD_BASEURL = "https://osu.ppy.sh/osu/"
-BEATMAP_SNAPSHOT_FILE_PATH = os.path.join(BEATMAPS_PATH, "{beatmap_id}/{snapshot_number}.osu")
+BEATMAP_DOWNLOAD_BASEURL = OSU_BASE_URL + "/osu/"
 
 
-class BeatmapManager:
-    def __init__(self, rc: RedisClient, db: PostgresqlDB):
-        self.rc = rc
-        self.db = db
-        self.oac = OsuAPIClient(rc)
+def _load_blob_dictionary() -> bytes | None:
+    if not (dictionary_path := BLOB_STORAGE_CONFIGURATION["dictionary_path"]):
+        return None
 
-    async def archive(self, beatmapset_id: int, download: bool = True) -> list[int]:
-        beatmapset_dict = await self.oac.get_beatmapset(beatmapset_id)
-        checksum = combine_checksums([beatmap["checksum"] for beatmap in beatmapset_dict["beatmaps"]])
+    with open(dictionary_path, "rb") as file:
+        return file.read()
 
-        await self._ensure_populated(beatmapset_dict)
 
-        if not await self.db.get_beatmapset_snapshot(checksum=checksum):
-            beatmap_ids = await self._snapshot(beatmapset_dict)
+# .osu files are stored by checksum, so identical content across beatmaps and snapshots is kept once
+blob_store = BlobStore(compression_level=BLOB_STORAGE_CONFIGURATION["compression_level"], dictionary=_load_blob_dictionary())
+# Beatmapset snapshots are immutable, so their zips are built once and kept under the beatmapset snapshot checksum
+zip_store = BlobStore(BEATMAPSETS_PATH)
 
-            if download:
-                await self._download(beatmap_ids)
+SNAPSHOT_INDEX_BATCH_SIZE = 1000
 
-            return beatmap_ids
-        else:
-            return []
+# Shared by every BeatmapManager in the process, so concurrent archives don't multiply the parallelism
+_download_semaphore = asyncio.Semaphore(BEATMAP_DOWNLOAD_CONFIGURATION["concurrency"])
 
-    async def _ensure_populated(self, beatmapset_dict: dict):
-        beatmapset_id = beatmapset_dict["id"]
-        user_id = beatmapset_dict["user_id"]
 
-        # Beatmapset
-        try:
-            await self._ensure_user_populated(user_id)
-        except RestrictedUserError:
-            user_dict = beatmapset_dict["user"]
-
-            if user_dict.get("is_deleted", False):
-                user_dict["username"] = beatmapset_dict.get("creator")
+class BeatmapManager:
+    def __init__(self, rc: RedisClient, db: PostgresqlDB, priority: RateLimitPriority = RateLimitPriority.INTERACTIVE):
+        self.rc = rc
+        self.db = db
+        self.oac = OsuAPIClient(rc, priority=priority)
 
-            await self._populate_profile(user_id, restricted_user_dict=user_dict, is_restricted=True)
+    async def archive(self, beatmapset_id: int, download: bool = True) -> dict[int, int]:
+        # Returns the snapshot number of every beatmap that got a new snapshot, keyed by beatmap ID
+        beatmapset_dict = await self.oac.get_beatmapset(beatmapset_id, max_age=FRESH_READ_MAX_AGE)
+        checksum = combine_checksums([beatmap["checksum"] for beatmap in beatmapset_dict["beatmaps"]])
 
-        if not await self.db.get_beatmapset(id=beatmapset_id):
-            await self.db.add_beatmapset(id=beatmapset_id, user_id=user_id)
+        if await self._is_snapshotted(beatmapset_id, checksum):
+            # Its mappers can still lack a profile, including restricted and deleted ones, which are filled in as a first archive would
+            if profile_dicts := await self._fetch_missing_profiles(beatmapset_dict):
+                await self._publish_profile_fetcher_tasks(await self.db.archive_profiles(profile_dicts))
 
-        # Beatmap
-        for beatmap_dict in beatmapset_dict["beatmaps"]:
-            beatmap_id = beatmap_dict["id"]
-            user_id = beatmap_dict["user_id"]
+            return {}
 
-            try:
-                await self._ensure_user_populated(user_id)
-            except RestrictedUserError:
-                await self._populate_profile(user_id, is_restricted=True)
+        # Everything that needs the osu! API happens up front, so the transaction below never waits on it
+        profile_dicts = await self._fetch_missing_profiles(beatmapset_dict)
 
-            if not await self.db.get_beatmap(id=beatmap_id):
-                await self.db.add_beatmap(id=beatmap_id, beatmapset_id=beatmapset_id, user_id=user_id)
+        beatmapset_snapshot_dict = BeatmapsetSnapshotSchema.model_validate(beatmapset_dict).model_dump(
+            exclude={"id", "snapshot_number", "snapshot_date", "verified", "beatmap_snapshots", "tags", "user_profile"}
+        )
+        beatmap_snapshot_dicts = [
+            BeatmapSnapshotSchema.model_validate(beatmap_dict).model_dump(
+                exclude={"id", "snapshot_number", "snapshot_date", "beatmapset_snapshots", "leaderboard", "owner_profiles"}
+            )
+            for beatmap_dict in beatmapset_dict["beatmaps"]
+        ]
+        owner_user_ids = {beatmap_dict["id"]: [owner["id"] for owner in beatmap_dict["owners"]] for beatmap_dict in beatmapset_dict["beatmaps"]}
+        tag_names = list(dict.fromkeys(tag.strip() for tag in beatmapset_dict["tags"].split(" ") if tag.strip()))
+
+        beatmapset_snapshot_number, beatmap_snapshots, profile_fetcher_task_ids = await self.db.archive_beatmapset_snapshot(
+            beatmapset_snapshot_dict,
+            beatmap_snapshot_dicts,
+            owner_user_ids,
+            profile_dicts,
+            tag_names
+        )
 
-    async def _ensure_user_populated(self, user_id: int):
-        if not await self.db.get_user(id=user_id):
-            await self.db.add_user(id=user_id)
+        await self._publish_profile_fetcher_tasks(profile_fetcher_task_ids)
 
-        try:
-            await self._populate_profile(user_id)
-        except HTTPError:
-            raise RestrictedUserError(user_id)
+        if beatmapset_snapshot_number is not None:
+            await self.rc.hset(Namespace.BEATMAPSET_SNAPSHOT_INDEX.value, str(beatmapset_id), f"{checksum}:{beatmapset_snapshot_number}")
 
-    async def _populate_profile(self, user_id: int, restricted_user_dict: dict = None, is_restricted: bool = False) -> Profile | None:
-        restricted_user_dict = restricted_user_dict if restricted_user_dict is not None else {}
-        lock_hash_name = Namespace.LOCK.hash_name(Namespace.OSU_USER_PROFILE.hash_name(user_id))
+        if download:
+            await self._download(beatmap_snapshots)
 
-        try:
-            lock_acquired = await self.rc.set(lock_hash_name, "locked", ex=LOCK_EXPIRY, nx=True)
+        return {beatmap_id: snapshot_number for beatmap_id, snapshot_number, _ in beatmap_snapshots}
 
-            if not lock_acquired:
-                for _ in range(LOCK_EXPIRY):
-                    await asyncio.sleep(1)
+    async def _publish_profile_fetcher_tasks(self, task_ids: list[int]):
+        for task_id in task_ids:
+            await self.rc.publish(ChannelName.PROFILE_FETCHER_TASKS.value, task_id)
 
-                    if (profile := await self.db.get_profile(user_id=user_id)) and not is_restricted:
-                        return profile
+    async def _is_snapshotted(self, beatmapset_id: int, checksum: str) -> bool:
+        # The index maps each beatmapset to the checksum and number of its latest snapshot, so an unchanged set skips the snapshot lookup
+        # It is only ever trusted to say yes, anything else is settled by the database
+        if (indexed := await self.rc.hget(Namespace.BEATMAPSET_SNAPSHOT_INDEX.value, str(beatmapset_id))) and indexed.split(":")[0] == checksum:
+            return True
 
-            if (profile := await self.db.get_profile(user_id=user_id)) and not is_restricted:
-                return profile
+        return await self.db.get_beatmapset_snapshot(checksum=checksum) is not None
 
-            if not is_restricted:
-                user_dict = await self.oac.get_user(user_id)
-                profile_dict = ProfileSchema.model_validate(user_dict).model_dump()
-            else:
-                profile_dict = {
-                    "user_id": user_id,
-                    "is_restricted": True,
-                    "avatar_url": restricted_user_dict.get("avatar_url"),
-                    "username": restricted_user_dict.get("username"),
-                    "country_code": restricted_user_dict.get("country_code"),
-                }
+    @classmethod
+    async def rebuild_snapshot_index(cls, rc: RedisClient, db: PostgresqlDB):
+        start_time = time.perf_counter()
+        rows = await db.get_latest_beatmapset_snapshot_checksums()
+        temp_hash_name = f"{Namespace.BEATMAPSET_SNAPSHOT_INDEX.value}:rebuild"
 
-            try:
-                profile = await self.db.add_profile(**profile_dict)
-            except IntegrityError:
-                profile_id = (await self.db.get_profile(user_id=user_id)).id
-                profile = await self.db.update_profile(profile_id, **profile_dict)
+        # Built aside and swapped in, so archives running meanwhile never see a partial index
+        await rc.delete(temp_hash_name)
 
-            task_id = (await self.db.get_profile_fetcher_task(user_id=user_id)).id
-            await self.db.update_profile_fetcher_task(task_id, last_fetch=aware_utcnow())
-        finally:
-            await self.rc.delete(lock_hash_name)
+        for i in range(0, len(rows), SNAPSHOT_INDEX_BATCH_SIZE):
+            mapping = {str(beatmapset_id): f"{checksum}:{snapshot_number}" for beatmapset_id, checksum, snapshot_number in rows[i:i + SNAPSHOT_INDEX_BATCH_SIZE]}
+            await rc.hset(temp_hash_name, mapping=mapping)
 
-        return profile
+        if rows:
+            await rc.rename(temp_hash_name, Namespace.BEATMAPSET_SNAPSHOT_INDEX.value)
+        else:
+            await rc.delete(Namespace.BEATMAPSET_SNAPSHOT_INDEX.value)
 
-    async def _snapshot(self, beatmapset_dict: dict) -> list[int]:
-        beatmap_snapshots = []
-        snapshotted_beatmap_ids = []
+        logger.info(f"[{cls.__name__}] Rebuilt the beatmapset snapshot index with {len(rows)} beatmapsets in {time.perf_counter() - start_time:.2f} seconds")
 
-        # BeatmapSnapshot
-        for beatmap_dict in beatmapset_dict["beatmaps"]:
-            beatmap_snapshot = await self.db.get_beatmap_snapshot(checksum=beatmap_dict["checksum"])
+    async def _fetch_missing_profiles(self, beatmapset_dict: dict) -> list[dict]:
+        user_ids = list(dict.fromkeys([
+            beatmapset_dict["user_id"],
+            *(beatmap_dict["user_id"] for beatmap_dict in beatmapset_dict["beatmaps"]),
+            *(owner["id"] for beatmap_dict in beatmapset_dict["beatmaps"] for owner in beatmap_dict["owners"])
+        ]))
+        profiled_user_ids = await self.db.get_profiled_user_ids(user_ids)
 
-            if not beatmap_snapshot:
-                beatmap_snapshot_dict = BeatmapSnapshotSchema.model_validate(beatmap_dict).model_dump(
-                    exclude={"beatmapset_snapshots", "leaderboard", "owner_profiles"}
-                )
-                beatmap_snapshot_dict["owner_profiles"] = await self._populate_owner_profiles(beatmap_dict["owners"])
-                beatmap_snapshot = await self.db.add_beatmap_snapshot(**beatmap_snapshot_dict)
-                snapshotted_beatmap_ids.append(beatmap_snapshot.beatmap_id)
+        if not (unprofiled_user_ids := [user_id for user_id in user_ids if user_id not in profiled_user_ids]):
+            return []
 
-            beatmap_snapshots.append(beatmap_snapshot)
+        # Restricted and deleted accounts just fail their single lookup, so checking for them in bulk first would only add a call
+        async def fetch_profile(user_id: int) -> dict:
+            try:
+                user_dict = await self.oac.get_user(user_id)
+                return ProfileSchema.model_validate(user_dict).model_dump(exclude={"id", "updated_at"}) | {"is_restricted": False}
+            except HTTPError:
+                pass
 
-        # BeatmapsetSnapshot
-        beatmapset_snapshot_dict = BeatmapsetSnapshotSchema.model_validate(beatmapset_dict).model_dump(
-            exclude={"beatmap_snapshots", "tags", "user_profile"}
-        )
-        beatmapset_snapshot_dict["beatmap_snapshots"] = beatmap_snapshots
-        beatmapset_snapshot_dict["tags"] = await self._populate_tags(beatmapset_dict["tags"])
-        await self.db.add_beatmapset_snapshot(**beatmapset_snapshot_dict)
+            restricted_user_dict = {}
 
-        return snapshotted_beatmap_ids
+            if user_id == beatmapset_dict["user_id"]:
+                restricted_user_dict = beatmapset_dict["user"]
 
-    async def _populate_owner_profiles(self, owners: list[dict[str, int | str]]) -> list[Profile]:
-        user_ids = [owner["id"] for owner in owners]
-        profiles = []
+                if restricted_user_dict.get("is_deleted", False):
+                    restricted_user_dict = restricted_user_dict | {"username": beatmapset_dict.get("creator")}
 
-        for user_id in user_ids:
-            if not await self.db.get_user(id=user_id):
-                await self.db.add_user(id=user_id)
+            return self._restricted_profile_dict(user_id, restricted_user_dict)
 
-            try:
-                profile = await self._populate_profile(user_id)
-            except HTTPError:
-                profile = await self._populate_profile(user_id, is_restricted=True)
+        return list(await asyncio.gather(*(fetch_profile(user_id) for user_id in unprofiled_user_ids)))
 
-            profiles.append(profile)
+    @staticmethod
+    def _restricted_profile_dict(user_id: int, restricted_user_dict: dict) -> dict:
+        return {
+            "user_id": user_id,
+            "avatar_url": restricted_user_dict.get("avatar_url"),
+            "username": restricted_user_dict.get("username"),
+            "country_code": restricted_user_dict.get("country_code"),
+            "graveyard_beatmapset_count": None,
+            "loved_beatmapset_count": None,
+            "pending_beatmapset_count": None,
+            "ranked_beatmapset_count": None,
+            "kudosu": None,
+            "is_restricted": True
+        }
+
+    async def _download(self, beatmap_snapshots: list[tuple[int, int, str]]):
+        results = await asyncio.gather(
+            *(self._download_snapshot(*beatmap_snapshot) for beatmap_snapshot in beatmap_snapshots),
+            return_exceptions=True
+        )
+        errors = [result for result in results if isinstance(result, BaseException)]
 
-        return profiles
+        for (beatmap_id, snapshot_number, _), result in zip(beatmap_snapshots, results):
+            if isinstance(result, BaseException):
+                logger.error(f"[{self.__class__.__name__}] Failed to download beatmap {beatmap_id}, snapshot {snapshot_number}: {result}")
 
-    async def _populate_tags(self, tags_str: str) -> list[Tag]:
-        tag_strs = set(tag.strip() for tag in tags_str.split(" ") if tag.strip())
-        tags = []
+        if errors:
+            raise errors[0]
 
-        if not tags_str:
-            return []
+    async def _download_snapshot(self, beatmap_id: int, snapshot_number: int, checksum: str):
+        if blob_store.exists(checksum):
+            return
 
-        for tag_str in tag_strs:
-            tag = await self.db.get_tag(name=tag_str)
+        client = get_http_client()
+        url = BEATMAP_DOWNLOAD_BASEURL + str(beatmap_id)
+        max_retries = BEATMAP_DOWNLOAD_CONFIGURATION["max_retries"]
 
-            if not tag:
-                tag = await self.db.add_tag(name=tag_str)
+        for attempt in range(max_retries + 1):
+            temp_path = blob_store.temp_path(checksum)
 
-            tags.append(tag)
+            try:
+                async with _download_semaphore:
+                    md5 = hashlib.md5()
 
-        return tags
+                    async with client.stream("GET", url) as response:
+                        response.raise_for_status()
 
-    async def _download(self, beatmap_ids: list[int]):
-        async with httpx.AsyncClient() as client:
-            for beatmap_id in beatmap_ids:
-                url = os.path.join(BEATMAP_DOWNLOAD_BASEURL, str(beatmap_id))
-                output_directory = os.path.join(BEATMAPS_PATH, str(beatmap_id))
-                os.makedirs(output_directory, exist_ok=True)
-                snapshot_number = (await self.db.get_beatmap_snapshot(beatmap_id=beatmap_id, _reversed=True)).snapshot_number
-                output_path = os.path.join(output_directory, f"{snapshot_number}.osu")
+                        async with aiofiles.open(temp_path, "wb") as f:
+                            async for chunk in response.aiter_bytes():
+                                md5.update(chunk)
+                                await f.write(chunk)
 
-                async with client.stream("GET", url) as response:
-                    async with aiofiles.open(output_path, "wb") as f:
-                        async for chunk in response.aiter_bytes():
-                            await f.write(chunk)
+                if (actual_checksum := md5.hexdigest()) != checksum:
+                    raise ChecksumMismatchError(checksum, actual_checksum)
 
-    @staticmethod
-    async def get(beatmap_id: int, snapshot_number: int) -> bytes:
-        file_path = BEATMAP_SNAPSHOT_FILE_PATH.format(beatmap_id=beatmap_id, snapshot_number=snapshot_number)
+                # The blob only appears under its checksum once it is complete and verified
+                await asyncio.to_thread(blob_store.commit, temp_path, checksum)
+                return
+            except (HTTPError, ChecksumMismatchError) as e:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
 
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"No .osu file found for beatmap {beatmap_id}, snapshot {snapshot_number}")
+                if attempt == max_retries or (isinstance(e, HTTPStatusError) and e.response.status_code not in RETRY_STATUS_CODES):
+                    raise
 
-        async with aiofiles.open(file_path, "rb") as file:
-            return await file.read()
+                delay = random.uniform(0, BEATMAP_DOWNLOAD_CONFIGURATION["retry_base_delay"] * 2 ** attempt)
+                logger.warning(f"[{self.__class__.__name__}] Download of beatmap {beatmap_id} failed ({e}), retrying in {delay:.2f} seconds ({attempt + 1}/{max_retries})")
+                await asyncio.sleep(delay)
 
     @staticmethod
-    def get_path(beatmap_id: int, snapshot_number: int) -> str:
-        file_path = BEATMAP_SNAPSHOT_FILE_PATH.format(beatmap_id=beatmap_id, snapshot_number=snapshot_number)
-
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"No .osu file found for beatmap {beatmap_id}, snapshot {snapshot_number}")
+    async def get(checksum: str) -> bytes:
+        try:
+            return await blob_store.read(checksum)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No .osu file found for checksum {checksum}")
 
-        return file_path
+    @staticmethod
+    def get_encoded_path(checksum: str, accepted_encodings: set[str]) -> tuple[str, str | None]:
+        # Returns a path to the .osu file that can be sent as is, along with its Content-Encoding
+        try:
+            return blob_store.get_encoded_path(checksum, accepted_encodings)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"No .osu file found for checksum {checksum} in any of the encodings {accepted_encodings}")
 
-    async def get_zip(self, beatmapset_id: int, snapshot_number: int) -> BytesIO:
-        beatmapset_snapshot = await self.db.get_beatmapset_snapshot(
-            beatmapset_id=beatmapset_id,
-            snapshot_number=snapshot_number,
-            _auto_eager_loads={"beatmap_snapshots"}
-        )
+    async def get_zip(self, beatmapset_id: int, snapshot_number: int) -> tuple[str | AsyncIterator[bytes], str | None]:
+        # Returns either the path of the cached zip, or a stream of it being built, along with the checksum it is cached under
+        # The checksum is None when some of the .osu files are missing, in which case the zip is streamed but never cached
+        beatmapset_snapshot = await self.db.get_beatmapset_snapshot(beatmapset_id=beatmapset_id, snapshot_number=snapshot_number)
 
         if not beatmapset_snapshot:
             raise ValueError(f"No snapshot found for beatmapset {beatmapset_id}, snapshot {snapshot_number}")
 
-        beatmap_paths = []
+        checksum = beatmapset_snapshot.checksum
 
-        for beatmap_snapshot in beatmapset_snapshot.beatmap_snapshots:
-            beatmap_path = self.get_path(beatmap_snapshot.beatmap_id, beatmap_snapshot.snapshot_number)
+        if zip_store.exists(checksum):
+            return zip_store.get_path(checksum), checksum
+
+        beatmapset_snapshot = await self.db.get_beatmapset_snapshot(id=beatmapset_snapshot.id, _auto_eager_loads={"beatmap_snapshots"})
+        beatmap_files = []
 
-            if os.path.exists(beatmap_path):
-                beatmap_paths.append((beatmap_path, f"{beatmap_snapshot.beatmap_id}.osu"))
+        for beatmap_snapshot in beatmapset_snapshot.beatmap_snapshots:
+            if blob_store.exists(beatmap_snapshot.checksum):
+                beatmap_files.append((f"{beatmap_snapshot.beatmap_id}.osu", beatmap_snapshot.checksum))
             else:
-                logger.warning(f"File {beatmap_path} does not exist and will be skipped.")
+                logger.warning(f"File {blob_store.get_path(beatmap_snapshot.checksum)} does not exist and will be skipped.")
 
-        return await asyncio.to_thread(self._create_zip, beatmap_paths)
+        compression = ZIP_COMPRESSION_METHODS[BEATMAPSET_ZIP_CONFIGURATION["compression"]]
+
+        # Never cache an incomplete zip
+        if len(beatmap_files) < len(beatmapset_snapshot.beatmap_snapshots):
+            return self._stream_zip(beatmap_files, compression), None
+
+        return self._stream_and_cache_zip(beatmap_files, checksum, compression), checksum
 
     @staticmethod
-    def _create_zip(beatmap_paths: list[tuple[str, str]]) -> BytesIO:
-        zip_buffer = BytesIO()
+    def _stream_zip(beatmap_files: list[tuple[str, str]], compression: int) -> AsyncIterator[bytes]:
+        return stream_zip([(filename, blob_store.iter_chunks(checksum)) for filename, checksum in beatmap_files], compression=compression)
+
+    async def _stream_and_cache_zip(self, beatmap_files: list[tuple[str, str]], checksum: str, compression: int) -> AsyncIterator[bytes]:
+        # The lock is only taken once streaming starts, so a stream that is never consumed holds nothing
+        lock = RedisLock(self.rc, Namespace.BEATMAPSET_ZIP.hash_name(checksum))
 
-        with ZipFile(zip_buffer, "w") as zip_file:
-            for beatmap_path, filename in beatmap_paths:
-                zip_file.write(beatmap_path, filename)
+        if not await lock.acquire(blocking=False):
+            # Someone else is building it, give them a moment before streaming an uncached copy ourselves
+            await lock.acquire(timeout=BEATMAPSET_ZIP_CONFIGURATION["build_wait_timeout"])
 
-        zip_buffer.seek(0)
-        return zip_buffer
+        try:
+            if zip_store.exists(checksum):
+                async with aiofiles.open(zip_store.get_path(checksum), "rb") as file:
+                    while chunk := await file.read(READ_CHUNK_SIZE):
+                        yield chunk
+            elif not lock.locked:
+                async for chunk in self._stream_zip(beatmap_files, compression):
+                    yield chunk
+            else:
+                # Written into the cache as it is streamed, and only committed once all of it has been
+                temp_path = zip_store.temp_path(checksum)
+
+                try:
+                    async with aiofiles.open(temp_path, "wb") as file:
+                        async for chunk in self._stream_zip(beatmap_files, compression):
+                            await file.write(chunk)
+                            yield chunk
+                except BaseException:
+                    # The write may have failed before the file was even created, and that error is the one to raise
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(temp_path)
+
+                    raise
+
+                zip_store.commit(temp_path, checksum)
+        finally:
+            await lock.release()
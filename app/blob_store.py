@@ -0,0 +1,114 @@
+import os
+import hashlib
+from typing import AsyncIterator
+
+import aiofiles
+import zstandard
+
+from .utils import generate_uuid
+from .config import INSTANCE_DIR
+
+BLOBS_PATH = os.path.join(INSTANCE_DIR, "blobs")
+HASH_CHUNK_SIZE = 65536
+COMPRESSED_SUFFIX = ".zst"
+
+
+class BlobStore:
+    """Content-addressed file store, where every blob lives at {root}/ab/cd/abcd... keyed by the MD5 checksum of its content
+
+    With a compression level set, blobs are committed zstd-compressed as abcd....zst instead, and decompressed transparently on read
+    """
+
+    def __init__(self, root: str = BLOBS_PATH, compression_level: int | None = None, dictionary: bytes | None = None):
+        self.root = root
+        self.compression_level = compression_level
+        self.dictionary = dictionary
+        self.dict_data = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+
+        if self.dict_data is not None and compression_level is not None:
+            # Done once up front, rather than lazily by whichever thread first compresses with it
+            self.dict_data.precompute_compress(level=compression_level)
+
+    # zstd contexts aren't thread-safe, and commits run in worker threads, so every operation gets its own
+    def compressor(self) -> zstandard.ZstdCompressor:
+        return zstandard.ZstdCompressor(level=self.compression_level, dict_data=self.dict_data)
+
+    def decompressor(self) -> zstandard.ZstdDecompressor:
+        return zstandard.ZstdDecompressor(dict_data=self.dict_data)
+
+    def get_path(self, checksum: str) -> str:
+        return os.path.join(self.root, checksum[:2], checksum[2:4], checksum)
+
+    def get_compressed_path(self, checksum: str) -> str:
+        return self.get_path(checksum) + COMPRESSED_SUFFIX
+
+    def exists(self, checksum: str) -> bool:
+        return os.path.exists(self.get_compressed_path(checksum)) or os.path.exists(self.get_path(checksum))
+
+    def get_encoded_path(self, checksum: str, accepted_encodings: set[str]) -> tuple[str, str | None]:
+        # Returns a path that can be sent as is, along with its Content-Encoding
+        # Dictionary-compressed blobs can't be decoded by clients, so those are never handed out
+        if "zstd" in accepted_encodings and self.dictionary is None and os.path.exists(compressed_path := self.get_compressed_path(checksum)):
+            return compressed_path, "zstd"
+
+        if os.path.exists(path := self.get_path(checksum)):
+            return path, None
+
+        raise FileNotFoundError(f"No uncompressed blob found for checksum {checksum}")
+
+    def temp_path(self, checksum: str) -> str:
+        # Unique per writer, so concurrent writes of the same blob never interleave
+        path = self.get_path(checksum)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        return f"{path}.{generate_uuid()}.part"
+
+    def commit(self, temp_path: str, checksum: str):
+        # Blocking when compressing, so callers in the event loop should run it in a thread
+        if self.compression_level is None:
+            os.replace(temp_path, self.get_path(checksum))
+            return
+
+        compressed_temp_path = temp_path + COMPRESSED_SUFFIX
+
+        with open(temp_path, "rb") as src, open(compressed_temp_path, "wb") as dst:
+            dst.write(self.compressor().compress(src.read()))
+
+        os.replace(compressed_temp_path, self.get_compressed_path(checksum))
+        os.remove(temp_path)
+
+    async def read(self, checksum: str) -> bytes:
+        return b"".join([chunk async for chunk in self.iter_chunks(checksum)])
+
+    async def iter_chunks(self, checksum: str, chunk_size: int = HASH_CHUNK_SIZE) -> AsyncIterator[bytes]:
+        if os.path.exists(compressed_path := self.get_compressed_path(checksum)):
+            path, decompressobj = compressed_path, self.decompressor().decompressobj()
+        elif os.path.exists(path := self.get_path(checksum)):
+            decompressobj = None
+        else:
+            raise FileNotFoundError(f"No blob found for checksum {checksum}")
+
+        async with aiofiles.open(path, "rb") as file:
+            while chunk := await file.read(chunk_size):
+                if decompressobj is not None:
+                    chunk = decompressobj.decompress(chunk)
+
+                if chunk:
+                    yield chunk
+
+    def verify(self, checksum: str) -> bool:
+        if os.path.exists(compressed_path := self.get_compressed_path(checksum)):
+            with open(compressed_path, "rb") as file:
+                return hashlib.md5(self.decompressor().decompress(file.read())).hexdigest() == checksum
+
+        return self.exists(checksum) and self.hash_file(self.get_path(checksum)) == checksum
+
+    @staticmethod
+    def hash_file(path: str) -> str:
+        md5 = hashlib.md5()
+
+        with open(path, "rb") as file:
+            while chunk := file.read(HASH_CHUNK_SIZE):
+                md5.update(chunk)
+
+        return md5.hexdigest()
@@ -11,6 +11,7 @@ SPEC_DIR = os.path.abspath("api/v1")
 INSTANCE_DIR = os.path.abspath("instance")
 
 FRONTEND_BASE_URL = os.getenv("BASE_URL", "http://localhost:3000")
+OSU_BASE_URL = os.getenv("OSU_BASE_URL", "https://osu.ppy.sh").rstrip("/")
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 
@@ -36,12 +37,44 @@ REDIS_CONFIGURATION = {
     "protocol": 3
 }
 
+HTTP_CLIENT_CONFIGURATION = {
+    "http2": os.getenv("HTTP_CLIENT_HTTP2", "true").lower() in ("true", "1", "yes"),
+    "max_connections": int(os.getenv("HTTP_CLIENT_MAX_CONNECTIONS", 20)),
+    "max_keepalive_connections": int(os.getenv("HTTP_CLIENT_MAX_KEEPALIVE_CONNECTIONS", 10)),
+    "keepalive_expiry": float(os.getenv("HTTP_CLIENT_KEEPALIVE_EXPIRY", 30)),
+    "connect_timeout": float(os.getenv("HTTP_CLIENT_CONNECT_TIMEOUT", 5)),
+    "read_timeout": float(os.getenv("HTTP_CLIENT_READ_TIMEOUT", 15)),
+    "write_timeout": float(os.getenv("HTTP_CLIENT_WRITE_TIMEOUT", 15)),
+    "pool_timeout": float(os.getenv("HTTP_CLIENT_POOL_TIMEOUT", 10))
+}
+
+BEATMAP_DOWNLOAD_CONFIGURATION = {
+    "concurrency": int(os.getenv("BEATMAP_DOWNLOAD_CONCURRENCY", 4)),
+    "max_retries": int(os.getenv("BEATMAP_DOWNLOAD_MAX_RETRIES", 3)),
+    "retry_base_delay": float(os.getenv("BEATMAP_DOWNLOAD_RETRY_BASE_DELAY", 1))
+}
+
+BLOB_STORAGE_CONFIGURATION = {
+    "compression_level": int(level) if (level := os.getenv("BLOB_COMPRESSION_LEVEL", "19")) else None,  # Empty to store blobs uncompressed
+    # Blobs written with a dictionary can only ever be read back with that same dictionary, and are never served pre-compressed
+    "dictionary_path": os.getenv("BLOB_COMPRESSION_DICTIONARY_PATH")
+}
+
+BEATMAPSET_ZIP_CONFIGURATION = {
+    "compression": os.getenv("BEATMAPSET_ZIP_COMPRESSION", "deflate"),  # "deflate" or "stored"
+    "build_wait_timeout": float(os.getenv("BEATMAPSET_ZIP_BUILD_WAIT_TIMEOUT", 5))
+}
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# Responses under these paths are already compressed, so gzipping them again only costs CPU
+GZIP_EXCLUDED_PATHS = (r"/beatmapsets/\d+/snapshots/\d+/zip$",)
+
 OAUTH_CONFIGURATION = {
     "client_id": os.getenv("OSU_CLIENT_ID"),
     "client_secret": os.getenv("OSU_CLIENT_SECRET"),
     "redirect_uri": FRONTEND_BASE_URL + "/callback",
-    "authorize_url": "https://osu.ppy.sh/oauth/authorize",
-    "token_endpoint": "https://osu.ppy.sh/oauth/token",
+    "authorize_url": OSU_BASE_URL + "/oauth/authorize",
+    "token_endpoint": OSU_BASE_URL + "/oauth/token",
     "token_endpoint_auth_method": "client_secret_basic"
 }
 
@@ -4,13 +4,14 @@ from app.database.models import ModelClass, Base
 from .decorators import session_manager, ensure_required
 from .protocol import DatabaseProtocol
 from .misc import Misc
+from .bulk import Bulk
 from .c import C
 from .r import R
 from .u import U
 from .d import D
 
 
-class CRUD(C, R, U, D, Misc, DatabaseProtocol):
+class CRUD(C, R, U, D, Misc, Bulk, DatabaseProtocol):
     async def create_database(self):
         async with self.engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
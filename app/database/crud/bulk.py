@@ -0,0 +1,285 @@
+from sqlalchemy.sql import select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models import *
+from app.database.sort_keys import sort_keys_select, sort_keys_insert_columns, mapper_sort_keys_update
+from app.database.statements import score_fetcher_tasks_insert, profile_fetcher_tasks_insert, next_snapshot_number_select, listing_update, listing_insert, beatmapset_snapshot_stats_insert, search_documents_upsert
+from app.utils import aware_utcnow
+from .decorators import session_manager
+
+
+class _Bulk:
+    @staticmethod
+    async def _insert_users(user_ids: list[int], session: AsyncSession) -> list[int]:
+        # User, along with the fetcher tasks that the User after_insert event would otherwise create
+        # Returns the IDs of the created profile fetcher tasks
+        insert_users_stmt = (
+            insert(User)
+            .values([{"id": user_id} for user_id in user_ids])
+            .on_conflict_do_nothing(index_elements=[User.id])
+            .returning(User.id)
+        )
+
+        if not (new_user_ids := list((await session.scalars(insert_users_stmt)).all())):
+            return []
+
+        await session.execute(score_fetcher_tasks_insert(new_user_ids))
+
+        return list((await session.scalars(profile_fetcher_tasks_insert(new_user_ids))).all())
+
+    @staticmethod
+    async def _insert_profiles(profile_dicts: list[dict], session: AsyncSession):
+        insert_profiles_stmt = (
+            insert(Profile)
+            .values(profile_dicts)
+            .on_conflict_do_nothing(index_elements=[Profile.user_id])
+            .returning(Profile.user_id)
+        )
+
+        if not (profiled_user_ids := list((await session.scalars(insert_profiles_stmt)).all())):
+            return
+
+        update_profile_fetcher_tasks_stmt = (
+            update(ProfileFetcherTask)
+            .where(ProfileFetcherTask.user_id.in_(profiled_user_ids))
+            .values(last_fetch=aware_utcnow())
+        )
+
+        await session.execute(update_profile_fetcher_tasks_stmt, execution_options={"synchronize_session": False})
+        await session.execute(mapper_sort_keys_update(profiled_user_ids), execution_options={"synchronize_session": False})
+
+
+class Bulk(_Bulk):
+    @session_manager
+    async def upsert_listing_sort_keys(self, beatmapset_listing_ids: list[int], session: AsyncSession = None):
+        insert_stmt = insert(BeatmapsetListingSortKeys).from_select(sort_keys_insert_columns, sort_keys_select(beatmapset_listing_ids))
+        upsert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=[BeatmapsetListingSortKeys.beatmapset_listing_id],
+            set_={name: insert_stmt.excluded[name] for name in sort_keys_insert_columns[1:]}
+        )
+
+        await session.execute(upsert_stmt)
+
+    @session_manager
+    async def get_stale_sort_key_listing_ids(self, limit: int, session: AsyncSession = None) -> list[int]:
+        # Listings without sort keys, or whose keys are for a snapshot they no longer point at
+        select_stmt = (
+            select(BeatmapsetListing.id)
+            .outerjoin(BeatmapsetListingSortKeys, BeatmapsetListingSortKeys.beatmapset_listing_id == BeatmapsetListing.id)
+            .where(BeatmapsetListingSortKeys.beatmapset_snapshot_id.is_distinct_from(BeatmapsetListing.beatmapset_snapshot_id))
+            .order_by(BeatmapsetListing.id)
+            .limit(limit)
+        )
+
+        return list((await session.scalars(select_stmt)).all())
+
+    @session_manager
+    async def insert_beatmapset_snapshot_stats(self, beatmapset_snapshot_ids: list[int], session: AsyncSession = None):
+        await session.execute(beatmapset_snapshot_stats_insert(beatmapset_snapshot_ids))
+
+    @session_manager
+    async def upsert_search_documents(self, beatmapset_snapshot_ids: list[int], session: AsyncSession = None):
+        await session.execute(search_documents_upsert(beatmapset_snapshot_ids))
+
+    @session_manager
+    async def get_beatmapset_snapshot_ids_without(
+            self,
+            model: type[BeatmapsetSnapshotSearch | BeatmapsetSnapshotStats],
+            limit: int,
+            session: AsyncSession = None
+    ) -> list[int]:
+        # Snapshots that have no row in the given side table yet, from before it existed
+        select_stmt = (
+            select(BeatmapsetSnapshot.id)
+            .outerjoin(model, model.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+            .where(model.beatmapset_snapshot_id.is_(None))
+            .order_by(BeatmapsetSnapshot.id)
+            .limit(limit)
+        )
+
+        return list((await session.scalars(select_stmt)).all())
+
+    @session_manager
+    async def get_profiled_user_ids(self, user_ids: list[int], session: AsyncSession = None) -> set[int]:
+        select_stmt = (
+            select(Profile.user_id)
+            .where(Profile.user_id.in_(user_ids))
+        )
+
+        return set((await session.scalars(select_stmt)).all())
+
+    @session_manager
+    async def archive_profiles(self, profile_dicts: list[dict], session: AsyncSession = None) -> list[int]:
+        # Writes the profiles of users met on an already archived beatmapset, returns the IDs of the profile fetcher tasks that were created
+        profile_dicts = sorted(profile_dicts, key=lambda profile_dict: profile_dict["user_id"])
+        profile_fetcher_task_ids = await self._insert_users([profile_dict["user_id"] for profile_dict in profile_dicts], session)
+        await self._insert_profiles(profile_dicts, session)
+        await session.commit()
+
+        return profile_fetcher_task_ids
+
+    @session_manager
+    async def archive_beatmapset_snapshot(
+            self,
+            beatmapset_snapshot_dict: dict,
+            beatmap_snapshot_dicts: list[dict],
+            owner_user_ids: dict[int, list[int]],
+            profile_dicts: list[dict],
+            tag_names: list[str],
+            session: AsyncSession = None
+    ) -> tuple[int | None, list[tuple[int, int, str]], list[int]]:
+        # Returns the new beatmapset snapshot's number (None if it already existed), the (beatmap_id, snapshot_number, checksum) of every new
+        # beatmap snapshot, and the IDs of the profile fetcher tasks that were created
+        beatmapset_id = beatmapset_snapshot_dict["beatmapset_id"]
+        # Rows shared between beatmapsets (users, profiles, tags) are written in sorted order, so that concurrent
+        # archives lock them in the same order and can't deadlock each other
+        user_ids = sorted({
+            beatmapset_snapshot_dict["user_id"],
+            *(beatmap_snapshot_dict["user_id"] for beatmap_snapshot_dict in beatmap_snapshot_dicts),
+            *(user_id for user_ids in owner_user_ids.values() for user_id in user_ids)
+        })
+        profile_dicts = sorted(profile_dicts, key=lambda profile_dict: profile_dict["user_id"])
+        tag_names = sorted(set(tag_names))
+
+        # User & Profile
+        profile_fetcher_task_ids = await self._insert_users(user_ids, session)
+
+        if profile_dicts:
+            await self._insert_profiles(profile_dicts, session)
+
+        # Beatmapset & Beatmap
+        insert_beatmapset_stmt = (
+            insert(Beatmapset)
+            .values(id=beatmapset_id, user_id=beatmapset_snapshot_dict["user_id"])
+            .on_conflict_do_nothing(index_elements=[Beatmapset.id])
+        )
+        insert_beatmaps_stmt = (
+            insert(Beatmap)
+            .values([
+                {"id": beatmap_snapshot_dict["beatmap_id"], "beatmapset_id": beatmapset_id, "user_id": beatmap_snapshot_dict["user_id"]}
+                for beatmap_snapshot_dict in beatmap_snapshot_dicts
+            ])
+            .on_conflict_do_nothing(index_elements=[Beatmap.id])
+        )
+
+        await session.execute(insert_beatmapset_stmt)
+        await session.execute(insert_beatmaps_stmt)
+
+        # BeatmapSnapshot
+        insert_beatmap_snapshots_stmt = (
+            insert(BeatmapSnapshot)
+            .values([
+                {
+                    **beatmap_snapshot_dict,
+                    "snapshot_number": next_snapshot_number_select(BeatmapSnapshot, BeatmapSnapshot.beatmap_id, beatmap_snapshot_dict["beatmap_id"]).scalar_subquery()
+                }
+                for beatmap_snapshot_dict in beatmap_snapshot_dicts
+            ])
+            .on_conflict_do_nothing(index_elements=[BeatmapSnapshot.checksum])
+            .returning(BeatmapSnapshot.id, BeatmapSnapshot.beatmap_id, BeatmapSnapshot.snapshot_number, BeatmapSnapshot.checksum)
+        )
+        new_beatmap_snapshots = (await session.execute(insert_beatmap_snapshots_stmt)).all()
+        beatmap_snapshot_ids = {checksum: beatmap_snapshot_id for beatmap_snapshot_id, _, _, checksum in new_beatmap_snapshots}
+        checksums = [beatmap_snapshot_dict["checksum"] for beatmap_snapshot_dict in beatmap_snapshot_dicts]
+
+        if existing_checksums := [checksum for checksum in checksums if checksum not in beatmap_snapshot_ids]:
+            select_beatmap_snapshots_stmt = (
+                select(BeatmapSnapshot.checksum, BeatmapSnapshot.id)
+                .where(BeatmapSnapshot.checksum.in_(existing_checksums))
+            )
+            beatmap_snapshot_ids |= dict((await session.execute(select_beatmap_snapshots_stmt)).tuples().all())
+
+        if new_beatmap_snapshots:
+            new_owner_user_ids = {user_id for _, beatmap_id, _, _ in new_beatmap_snapshots for user_id in owner_user_ids.get(beatmap_id, [])}
+            select_profiles_stmt = (
+                select(Profile.user_id, Profile.id)
+                .where(Profile.user_id.in_(new_owner_user_ids))
+            )
+            profile_ids = dict((await session.execute(select_profiles_stmt)).tuples().all())
+            owner_rows = [
+                {"profile_id": profile_ids[user_id], "beatmap_snapshot_id": beatmap_snapshot_id}
+                for beatmap_snapshot_id, beatmap_id, _, _ in new_beatmap_snapshots
+                for user_id in dict.fromkeys(owner_user_ids.get(beatmap_id, []))
+                if user_id in profile_ids
+            ]
+
+            if owner_rows:
+                await session.execute(insert(beatmap_snapshot_owner_association).values(owner_rows).on_conflict_do_nothing())
+
+        # Tag
+        tag_ids = []
+
+        if tag_names:
+            insert_tags_stmt = (
+                insert(Tag)
+                .values([{"name": tag_name} for tag_name in tag_names])
+                .on_conflict_do_nothing(index_elements=[Tag.name])
+                .returning(Tag.id, Tag.name)
+            )
+            new_tags = (await session.execute(insert_tags_stmt)).tuples().all()
+            tag_ids = [tag_id for tag_id, _ in new_tags]
+            new_tag_names = {tag_name for _, tag_name in new_tags}
+
+            # DO NOTHING instead of a no-op DO UPDATE, which would write a dead tuple for every existing tag
+            if existing_tag_names := [tag_name for tag_name in tag_names if tag_name not in new_tag_names]:
+                select_tags_stmt = (
+                    select(Tag.id)
+                    .where(Tag.name.in_(existing_tag_names))
+                )
+                tag_ids += (await session.scalars(select_tags_stmt)).all()
+
+        # BeatmapsetSnapshot
+        insert_beatmapset_snapshot_stmt = (
+            insert(BeatmapsetSnapshot)
+            .values(
+                **beatmapset_snapshot_dict,
+                snapshot_number=next_snapshot_number_select(BeatmapsetSnapshot, BeatmapsetSnapshot.beatmapset_id, beatmapset_id).scalar_subquery()
+            )
+            .on_conflict_do_nothing(index_elements=[BeatmapsetSnapshot.checksum])
+            .returning(BeatmapsetSnapshot.id, BeatmapsetSnapshot.snapshot_number)
+        )
+
+        if (new_beatmapset_snapshot := (await session.execute(insert_beatmapset_snapshot_stmt)).first()) is None:  # Archived concurrently by someone else
+            await session.commit()
+            return None, [], profile_fetcher_task_ids
+
+        beatmapset_snapshot_id, beatmapset_snapshot_number = new_beatmapset_snapshot
+
+        insert_beatmap_snapshot_associations_stmt = (
+            insert(beatmap_snapshot_beatmapset_snapshot_association)
+            .values([
+                {"beatmap_snapshot_id": beatmap_snapshot_id, "beatmapset_snapshot_id": beatmapset_snapshot_id}
+                for beatmap_snapshot_id in dict.fromkeys(beatmap_snapshot_ids[checksum] for checksum in checksums)
+            ])
+            .on_conflict_do_nothing()
+        )
+        await session.execute(insert_beatmap_snapshot_associations_stmt)
+
+        if tag_ids:
+            insert_tag_associations_stmt = (
+                insert(tag_beatmapset_snapshot_association)
+                .values([{"tag_id": tag_id, "beatmapset_snapshot_id": beatmapset_snapshot_id} for tag_id in tag_ids])
+                .on_conflict_do_nothing()
+            )
+            await session.execute(insert_tag_associations_stmt)
+
+        # Stats and search document, once the difficulties and tags they are built from are associated
+        await self.insert_beatmapset_snapshot_stats([beatmapset_snapshot_id], session=session)
+        await self.upsert_search_documents([beatmapset_snapshot_id], session=session)
+
+        # BeatmapsetListing, as the BeatmapsetSnapshot after_insert event would
+        listing_update_stmt = listing_update(beatmapset_id, beatmapset_snapshot_id)
+
+        if (beatmapset_listing_id := (await session.execute(listing_update_stmt, execution_options={"synchronize_session": False})).scalar()) is None:
+            beatmapset_listing_id = await session.scalar(listing_insert(beatmapset_id, beatmapset_snapshot_id))
+
+        await self.upsert_listing_sort_keys([beatmapset_listing_id], session=session)
+
+        await session.commit()
+
+        return (
+            beatmapset_snapshot_number,
+            [(beatmap_id, snapshot_number, checksum) for _, beatmap_id, snapshot_number, checksum in new_beatmap_snapshots],
+            profile_fetcher_task_ids
+        )
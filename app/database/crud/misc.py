@@ -1,7 +1,7 @@
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database.models import Tag
+from app.database.models import Tag, BeatmapsetListing, BeatmapsetSnapshot
 from .decorators import session_manager
 
 
@@ -16,3 +16,13 @@ class Misc:
         )
 
         return list((await session.scalars(select_stmt)).all())
+
+    @session_manager
+    async def get_latest_beatmapset_snapshot_checksums(self, session: AsyncSession = None) -> list[tuple[int, str, int]]:
+        # (beatmapset_id, checksum, snapshot_number) of the snapshot each beatmapset listing points at
+        select_stmt = (
+            select(BeatmapsetListing.beatmapset_id, BeatmapsetSnapshot.checksum, BeatmapsetSnapshot.snapshot_number)
+            .join(BeatmapsetSnapshot, BeatmapsetListing.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+        )
+
+        return list((await session.execute(select_stmt)).tuples().all())
@@ -1,10 +1,8 @@
 from sqlalchemy.sql import select
-from sqlalchemy.sql.sqltypes import Numeric, Float
 from sqlalchemy.sql.functions import func
-from sqlalchemy.sql.expression import cast
 
 from app.database.ctes.bms_ss.bm_ss import bms_ss_with_multiple_bm_ss_cte
-from app.database.models import BeatmapSnapshot, beatmap_snapshot_beatmapset_snapshot_association
+from app.database.models import BeatmapSnapshot, BeatmapsetSnapshotStats, beatmap_snapshot_beatmapset_snapshot_association
 
 hit_length_cte = (
     select(
@@ -32,38 +30,30 @@ hit_length_agg_cte = (
     .cte("hit_length_agg_cte")
 )
 
+# Precomputed per snapshot on archive
 min_hit_length_cte = (
     select(
-        hit_length_cte.c.beatmapset_snapshot_id,
-        func.min(hit_length_cte.c.hit_length).label("target")
+        BeatmapsetSnapshotStats.beatmapset_snapshot_id,
+        BeatmapsetSnapshotStats.min_hit_length.label("target")
     )
-    .group_by(hit_length_cte.c.beatmapset_snapshot_id)
+    .where(BeatmapsetSnapshotStats.min_hit_length.isnot(None))
     .cte("min_hit_length_cte")
 )
 
 max_hit_length_cte = (
     select(
-        hit_length_cte.c.beatmapset_snapshot_id,
-        func.max(hit_length_cte.c.hit_length).label("target")
+        BeatmapsetSnapshotStats.beatmapset_snapshot_id,
+        BeatmapsetSnapshotStats.max_hit_length.label("target")
     )
-    .group_by(hit_length_cte.c.beatmapset_snapshot_id)
+    .where(BeatmapsetSnapshotStats.max_hit_length.isnot(None))
     .cte("max_hit_length_cte")
 )
 
 avg_hit_length_cte = (
     select(
-        hit_length_cte.c.beatmapset_snapshot_id,
-        cast(
-            func.round(
-                cast(
-                    func.avg(hit_length_cte.c.hit_length),
-                    Numeric
-                ),
-                2
-            ),
-            Float
-        ).label("target")
+        BeatmapsetSnapshotStats.beatmapset_snapshot_id,
+        BeatmapsetSnapshotStats.avg_hit_length.label("target")
     )
-    .group_by(hit_length_cte.c.beatmapset_snapshot_id)
+    .where(BeatmapsetSnapshotStats.avg_hit_length.isnot(None))
     .cte("avg_hit_length_cte")
 )
@@ -4,7 +4,7 @@ from sqlalchemy.sql.functions import func
 from sqlalchemy.sql.expression import cast
 
 from app.database.ctes.bms_ss.bm_ss import bms_ss_with_multiple_bm_ss_cte
-from app.database.models import BeatmapSnapshot, beatmap_snapshot_beatmapset_snapshot_association
+from app.database.models import BeatmapSnapshot, BeatmapsetSnapshotStats, beatmap_snapshot_beatmapset_snapshot_association
 
 sr_gap_cte = (
     select(
@@ -45,38 +45,30 @@ sr_gap_agg_cte = (
     .cte("sr_gap_agg_cte")
 )
 
+# Precomputed per snapshot on archive
 min_sr_gap_cte = (
     select(
-        sr_gap_cte.c.beatmapset_snapshot_id,
-        func.min(sr_gap_cte.c.sr_gap).label("target")
+        BeatmapsetSnapshotStats.beatmapset_snapshot_id,
+        BeatmapsetSnapshotStats.min_sr_gap.label("target")
     )
-    .group_by(sr_gap_cte.c.beatmapset_snapshot_id)
+    .where(BeatmapsetSnapshotStats.min_sr_gap.isnot(None))
     .cte("min_sr_gap_cte")
 )
 
 max_sr_gap_cte = (
     select(
-        sr_gap_cte.c.beatmapset_snapshot_id,
-        func.max(sr_gap_cte.c.sr_gap).label("target")
+        BeatmapsetSnapshotStats.beatmapset_snapshot_id,
+        BeatmapsetSnapshotStats.max_sr_gap.label("target")
     )
-    .group_by(sr_gap_cte.c.beatmapset_snapshot_id)
+    .where(BeatmapsetSnapshotStats.max_sr_gap.isnot(None))
     .cte("max_sr_gap_cte")
 )
 
 avg_sr_gap_cte = (
     select(
-        sr_gap_cte.c.beatmapset_snapshot_id,
-        cast(
-            func.round(
-                cast(
-                    func.avg(sr_gap_cte.c.sr_gap),
-                    Numeric
-                ),
-                2
-            ),
-            Float
-        ).label("target")
+        BeatmapsetSnapshotStats.beatmapset_snapshot_id,
+        BeatmapsetSnapshotStats.avg_sr_gap.label("target")
     )
-    .group_by(sr_gap_cte.c.beatmapset_snapshot_id)
+    .where(BeatmapsetSnapshotStats.avg_sr_gap.isnot(None))
     .cte("avg_sr_gap_cte")
 )
@@ -1,33 +1,54 @@
-from sqlalchemy.sql import select, or_
+import re
+
+from sqlalchemy.sql import select, or_, bindparam
 from sqlalchemy.sql.selectable import CTE
+from sqlalchemy.sql.functions import func
+from sqlalchemy.sql.expression import literal_column
+
+from app.database.models import BeatmapsetSnapshotSearch
+
+# No stemming or stop words, since these are mostly names, in any language
+TEXT_SEARCH_CONFIG = literal_column("'simple'::regconfig")
+TRIGRAM_MIN_LENGTH = 3  # Shorter patterns can't be narrowed down by the trigram index
+SEARCH_TERM_PATTERN = re.compile(r"[^\W_]+")
+LIKE_ESCAPE_CHAR = "/"
+
+
+def search_filter_params(search_query: str) -> dict[str, str]:
+    # The bound values of the search filter; which ones are present decides the shape of the CTE
+    search_query = search_query.strip()
+    terms = SEARCH_TERM_PATTERN.findall(search_query.lower())
+    params = {"search_query": search_query}
+
+    if terms:
+        params["search_tsquery"] = " & ".join(f"{term}:*" for term in terms)
+
+    if len(search_query) >= TRIGRAM_MIN_LENGTH or not terms:
+        escaped_query = "".join(LIKE_ESCAPE_CHAR + char if char in (LIKE_ESCAPE_CHAR, "%", "_") else char for char in search_query)
+        params["search_pattern"] = f"%{escaped_query}%"
 
-from app.database.models import BeatmapSnapshot, BeatmapsetSnapshot, beatmap_snapshot_beatmapset_snapshot_association
+    return params
 
 
 def search_filter_cte_factory(search_query: str) -> CTE:
+    # Every term as a prefix (so "grave" finds "graveyard"), or the whole query as a substring, scored by relevance
+    params = search_filter_params(search_query)
+    conditions = []
+    relevance = func.similarity(BeatmapsetSnapshotSearch.document, bindparam("search_query", params["search_query"]))
+
+    if "search_tsquery" in params:
+        tsquery = func.to_tsquery(TEXT_SEARCH_CONFIG, bindparam("search_tsquery", params["search_tsquery"]))
+        conditions.append(BeatmapsetSnapshotSearch.search_vector.op("@@")(tsquery))
+        relevance = func.ts_rank_cd(BeatmapsetSnapshotSearch.search_vector, tsquery) + relevance
+
+    if "search_pattern" in params:
+        conditions.append(BeatmapsetSnapshotSearch.document.ilike(bindparam("search_pattern", params["search_pattern"]), escape=LIKE_ESCAPE_CHAR))
+
     return (
         select(
-            beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id
-        )
-        .join(
-            BeatmapsetSnapshot,
-            BeatmapsetSnapshot.id == beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id
-        )
-        .join(
-            BeatmapSnapshot,
-            BeatmapSnapshot.id == beatmap_snapshot_beatmapset_snapshot_association.c.beatmap_snapshot_id
-        )
-        .where(
-            or_(
-                BeatmapSnapshot.version.ilike(f"%{search_query}%"),
-                BeatmapsetSnapshot.artist.ilike(f"%{search_query}%"),
-                BeatmapsetSnapshot.artist_unicode.ilike(f"%{search_query}%"),
-                BeatmapsetSnapshot.title.ilike(f"%{search_query}%"),
-                BeatmapsetSnapshot.title_unicode.ilike(f"%{search_query}%"),
-                BeatmapsetSnapshot.creator.ilike(f"%{search_query}%"),
-                BeatmapsetSnapshot.source.ilike(f"%{search_query}%")
-            )
+            BeatmapsetSnapshotSearch.beatmapset_snapshot_id,
+            relevance.label("relevance")
         )
-        .distinct(beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id)
+        .where(or_(*conditions))
         .cte("search_filter_cte")
     )
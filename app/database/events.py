@@ -1,31 +1,23 @@
 from sqlalchemy import event
 from sqlalchemy.engine.base import Connection
-from sqlalchemy.sql import select, insert, update, func
+from sqlalchemy.orm import Session, UOWTransaction
 from sqlalchemy.orm.mapper import Mapper
 from sqlalchemy.orm.attributes import AttributeEventToken
 
 from app.redis import ChannelName, redis_connection
-from .models import User, ScoreFetcherTask, ProfileFetcherTask, BeatmapsetSnapshot, BeatmapsetListing, BeatmapSnapshot
+from .models import User, Profile, ScoreFetcherTask, BeatmapsetSnapshot, BeatmapSnapshot
+from .sort_keys import mapper_sort_keys_update
+from .statements import score_fetcher_tasks_insert, profile_fetcher_tasks_insert, next_snapshot_number_select, listing_update, listing_insert, beatmapset_snapshot_stats_insert, search_documents_upsert
 
 
 @event.listens_for(User, "after_insert")
 def user_after_insert(mapper: Mapper[User], connection: Connection, target: User):
-    insert_score_fetcher_stmt = (
-        insert(ScoreFetcherTask)
-        .values(user_id=target.id)
-    )
-    insert_profile_fetcher_stmt = (
-        insert(ProfileFetcherTask)
-        .values(user_id=target.id)
-        .returning(ProfileFetcherTask.id)
-    )
-
-    connection.execute(insert_score_fetcher_stmt)
-    result = connection.execute(insert_profile_fetcher_stmt)
-    profile_fetcher_task_id = result.scalar()
+    connection.execute(score_fetcher_tasks_insert([target.id]))
+    profile_fetcher_task_ids = connection.scalars(profile_fetcher_tasks_insert([target.id])).all()
 
     with redis_connection() as rc:
-        rc.publish(ChannelName.PROFILE_FETCHER_TASKS.value, profile_fetcher_task_id)
+        for profile_fetcher_task_id in profile_fetcher_task_ids:
+            rc.publish(ChannelName.PROFILE_FETCHER_TASKS.value, profile_fetcher_task_id)
 
 
 @event.listens_for(ScoreFetcherTask.enabled, "set")
@@ -37,47 +29,30 @@ def score_fetcher_task_enabled_set(target: ScoreFetcherTask, value: bool, oldval
 
 @event.listens_for(BeatmapSnapshot, "before_insert")
 def beatmap_snapshot_before_insert(mapper: Mapper[BeatmapSnapshot], connection: Connection, target: BeatmapSnapshot):
-    select_stmt = (
-        select(func.max(BeatmapSnapshot.snapshot_number))
-        .where(BeatmapSnapshot.beatmap_id == target.beatmap_id)
-    )
-
-    latest_snapshot = connection.scalar(select_stmt)
-    target.snapshot_number = (latest_snapshot or 0) + 1
+    target.snapshot_number = connection.scalar(next_snapshot_number_select(BeatmapSnapshot, BeatmapSnapshot.beatmap_id, target.beatmap_id))
 
 
 @event.listens_for(BeatmapsetSnapshot, "before_insert")
 def beatmapset_snapshot_before_insert(mapper: Mapper[BeatmapsetSnapshot], connection: Connection, target: BeatmapsetSnapshot):
-    select_stmt = (
-        select(func.max(BeatmapsetSnapshot.snapshot_number))
-        .where(BeatmapsetSnapshot.beatmapset_id == target.beatmapset_id)
-    )
-
-    latest_snapshot = connection.scalar(select_stmt)
-    target.snapshot_number = (latest_snapshot or 0) + 1
+    target.snapshot_number = connection.scalar(next_snapshot_number_select(BeatmapsetSnapshot, BeatmapsetSnapshot.beatmapset_id, target.beatmapset_id))
 
 
 @event.listens_for(BeatmapsetSnapshot, "after_insert")
 def beatmapset_snapshot_after_insert(mapper: Mapper[BeatmapsetSnapshot], connection: Connection, target: BeatmapsetSnapshot):
-    select_stmt = (
-        select(BeatmapsetListing.id)
-        .where(BeatmapsetListing.beatmapset_id == target.beatmapset_id)
-    )
-
-    beatmapset_listing_id = connection.scalar(select_stmt)
-
-    if not beatmapset_listing_id:
-        insert_stmt = (
-            insert(BeatmapsetListing)
-            .values(beatmapset_id=target.beatmapset_id, beatmapset_snapshot_id=target.id)
-        )
-
-        connection.execute(insert_stmt)
-    else:
-        update_stmt = (
-            update(BeatmapsetListing)
-            .where(BeatmapsetListing.id == beatmapset_listing_id)
-            .values(beatmapset_snapshot_id=target.id)
-        )
-
-        connection.execute(update_stmt)
+    if connection.scalar(listing_update(target.beatmapset_id, target.id)) is None:
+        connection.execute(listing_insert(target.beatmapset_id, target.id))
+
+
+@event.listens_for(Session, "after_flush")
+def session_after_flush(session: Session, flush_context: UOWTransaction):
+    # Built from the difficulties and tags, whose association rows are only written after the BeatmapsetSnapshot after_insert event
+    if beatmapset_snapshot_ids := [instance.id for instance in session.new if isinstance(instance, BeatmapsetSnapshot)]:
+        connection = session.connection()
+        connection.execute(beatmapset_snapshot_stats_insert(beatmapset_snapshot_ids))
+        connection.execute(search_documents_upsert(beatmapset_snapshot_ids))
+
+
+@event.listens_for(Profile, "after_insert")
+@event.listens_for(Profile, "after_update")
+def profile_after_write(mapper: Mapper[Profile], connection: Connection, target: Profile):
+    connection.execute(mapper_sort_keys_update([target.user_id]))
@@ -3,11 +3,12 @@ from enum import Enum
 from typing import Optional, TypeVar, Any
 
 from sqlalchemy.sql import select
-from sqlalchemy.sql.schema import Table, Column, ForeignKey, UniqueConstraint
+from sqlalchemy.sql.schema import Table, Column, ForeignKey, UniqueConstraint, Index
+from sqlalchemy.sql.ddl import DDL
 from sqlalchemy.sql.sqltypes import Integer, String, DateTime, Text, Boolean, Float
 from sqlalchemy.sql.functions import func
-from sqlalchemy.sql.expression import cast
 from sqlalchemy.inspection import inspect
+from sqlalchemy import event
 from sqlalchemy.orm import relationship, mapped_column
 from sqlalchemy.orm.decl_api import DeclarativeBase
 from sqlalchemy.orm.base import Mapped
@@ -15,6 +16,7 @@ from sqlalchemy.orm.mapper import Mapper
 from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.dialects.postgresql.json import JSON
+from sqlalchemy.dialects.postgresql import TSVECTOR
 
 from app.utils import aware_utcnow
 
@@ -34,6 +36,9 @@ __all__ = [
     "Beatmapset",
     "BeatmapsetSnapshot",
     "BeatmapsetListing",
+    "BeatmapsetListingSortKeys",
+    "BeatmapsetSnapshotSearch",
+    "BeatmapsetSnapshotStats",
     "Leaderboard",
     "Score",
     "Queue",
@@ -151,7 +156,7 @@ class Profile(Base):
 
     @total_kudosu.expression
     def total_kudosu(cls):
-        return func.coalesce(cast(cls.kudosu["total"], Integer), 0)
+        return func.coalesce(cls.kudosu["total"].as_integer(), 0)
 
 
 class ApiKey(Base):
@@ -441,6 +446,92 @@ class BeatmapsetListing(Base):
     )
 
 
+class BeatmapsetListingSortKeys(Base):
+    # Sort keys of a listing's current snapshot, so sorting by a difficulty or mapper field is an index scan instead of a window over every snapshot
+    # Written by archive_beatmapset_snapshot whenever the listing moves to a new snapshot, with the mapper fields kept in sync by the Profile events
+    __tablename__ = "beatmapset_listing_sort_keys"
+    beatmapset_listing_id: Mapped[int] = mapped_column(Integer, ForeignKey("beatmapset_listings.id"), primary_key=True)
+    beatmapset_snapshot_id: Mapped[int] = mapped_column(Integer, ForeignKey("beatmapset_snapshots.id"), nullable=False)
+    user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+
+    # Lowest and highest value across the snapshot's difficulties, for ascending and descending sorts respectively
+    # Only the common sorts are indexed, since every index is written on each archive; the rest sort without one
+    min_beatmap_id: Mapped[int] = mapped_column(Integer)
+    min_user_id: Mapped[int] = mapped_column(Integer)
+    min_difficulty_rating: Mapped[float] = mapped_column(Float, index=True)
+    min_mode: Mapped[str] = mapped_column(String)
+    min_total_length: Mapped[int] = mapped_column(Integer, index=True)
+    min_version: Mapped[str] = mapped_column(String)
+    min_accuracy: Mapped[float] = mapped_column(Float)
+    min_ar: Mapped[float] = mapped_column(Float)
+    min_bpm: Mapped[float] = mapped_column(Float, index=True)
+    min_count_circles: Mapped[int] = mapped_column(Integer)
+    min_count_sliders: Mapped[int] = mapped_column(Integer)
+    min_count_spinners: Mapped[int] = mapped_column(Integer)
+    min_cs: Mapped[float] = mapped_column(Float)
+    min_drain: Mapped[float] = mapped_column(Float)
+    min_last_updated: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    min_passcount: Mapped[int] = mapped_column(Integer)
+    min_playcount: Mapped[int] = mapped_column(Integer)
+
+    max_beatmap_id: Mapped[int] = mapped_column(Integer)
+    max_user_id: Mapped[int] = mapped_column(Integer)
+    max_difficulty_rating: Mapped[float] = mapped_column(Float, index=True)
+    max_mode: Mapped[str] = mapped_column(String)
+    max_total_length: Mapped[int] = mapped_column(Integer, index=True)
+    max_version: Mapped[str] = mapped_column(String)
+    max_accuracy: Mapped[float] = mapped_column(Float)
+    max_ar: Mapped[float] = mapped_column(Float)
+    max_bpm: Mapped[float] = mapped_column(Float, index=True)
+    max_count_circles: Mapped[int] = mapped_column(Integer)
+    max_count_sliders: Mapped[int] = mapped_column(Integer)
+    max_count_spinners: Mapped[int] = mapped_column(Integer)
+    max_cs: Mapped[float] = mapped_column(Float)
+    max_drain: Mapped[float] = mapped_column(Float)
+    max_last_updated: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
+    max_passcount: Mapped[int] = mapped_column(Integer)
+    max_playcount: Mapped[int] = mapped_column(Integer, index=True)
+
+    # Mapper profile, NULL while the mapper has none
+    mapper_country_code: Mapped[Optional[str]] = mapped_column(String(2))
+    mapper_graveyard_beatmapset_count: Mapped[Optional[int]] = mapped_column(Integer)
+    mapper_loved_beatmapset_count: Mapped[Optional[int]] = mapped_column(Integer)
+    mapper_pending_beatmapset_count: Mapped[Optional[int]] = mapped_column(Integer)
+    mapper_ranked_beatmapset_count: Mapped[Optional[int]] = mapped_column(Integer)
+    mapper_total_maps: Mapped[Optional[int]] = mapped_column(Integer, index=True)
+    mapper_total_kudosu: Mapped[Optional[int]] = mapped_column(Integer, index=True)
+
+
+class BeatmapsetSnapshotSearch(Base):
+    # Search document of a beatmapset snapshot, spanning its tags and difficulty names, written alongside the snapshot by either write path
+    __tablename__ = "beatmapset_snapshot_search"
+    beatmapset_snapshot_id: Mapped[int] = mapped_column(Integer, ForeignKey("beatmapset_snapshots.id"), primary_key=True)
+    document: Mapped[str] = mapped_column(Text, nullable=False)
+    search_vector: Mapped[str] = mapped_column(TSVECTOR, nullable=False)
+
+    __table_args__ = (
+        Index("ix_beatmapset_snapshot_search_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_beatmapset_snapshot_search_document_trgm", "document", postgresql_using="gin", postgresql_ops={"document": "gin_trgm_ops"}),
+    )
+
+
+event.listen(BeatmapsetSnapshotSearch.__table__, "before_create", DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+class BeatmapsetSnapshotStats(Base):
+    # Difficulty spread of a beatmapset snapshot, computed once on insert by either write path since snapshots never change
+    # The gap and hit length stats are only set for snapshots with more than one difficulty
+    __tablename__ = "beatmapset_snapshot_stats"
+    beatmapset_snapshot_id: Mapped[int] = mapped_column(Integer, ForeignKey("beatmapset_snapshots.id"), primary_key=True)
+    num_difficulties: Mapped[int] = mapped_column(Integer, nullable=False, index=True)
+    min_sr_gap: Mapped[Optional[float]] = mapped_column(Float, index=True)
+    max_sr_gap: Mapped[Optional[float]] = mapped_column(Float, index=True)
+    avg_sr_gap: Mapped[Optional[float]] = mapped_column(Float, index=True)
+    min_hit_length: Mapped[Optional[int]] = mapped_column(Integer, index=True)
+    max_hit_length: Mapped[Optional[int]] = mapped_column(Integer, index=True)
+    avg_hit_length: Mapped[Optional[float]] = mapped_column(Float, index=True)
+
+
 class Leaderboard(Base):
     __tablename__ = "leaderboards"
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
@@ -575,6 +666,9 @@ class ModelClass(Enum):
     BEATMAPSET = Beatmapset
     BEATMAPSET_SNAPSHOT = BeatmapsetSnapshot
     BEATMAPSET_LISTING = BeatmapsetListing
+    BEATMAPSET_LISTING_SORT_KEYS = BeatmapsetListingSortKeys
+    BEATMAPSET_SNAPSHOT_SEARCH = BeatmapsetSnapshotSearch
+    BEATMAPSET_SNAPSHOT_STATS = BeatmapsetSnapshotStats
     LEADERBOARD = Leaderboard
     SCORE = Score
     QUEUE = Queue
@@ -0,0 +1,50 @@
+from sqlalchemy.sql import select, update, func
+from sqlalchemy.sql.selectable import Select
+from sqlalchemy.sql.dml import Update
+
+from app.database.models import Profile, BeatmapSnapshot, BeatmapsetSnapshot, BeatmapsetListing, BeatmapsetListingSortKeys, beatmap_snapshot_beatmapset_snapshot_association
+
+# Every sort key column is named after its source: min_/max_ plus a BeatmapSnapshot column, or mapper_ plus a Profile column
+AGGREGATES = {"min": func.min, "max": func.max}
+MAPPER_PREFIX = "mapper_"
+
+sort_key_columns = [column.name for column in BeatmapsetListingSortKeys.__table__.columns if column.name.startswith((*(f"{aggregate}_" for aggregate in AGGREGATES), MAPPER_PREFIX))]
+mapper_sort_key_columns = [name for name in sort_key_columns if name.startswith(MAPPER_PREFIX)]
+sort_keys_insert_columns = ["beatmapset_listing_id", "beatmapset_snapshot_id", "user_id", *sort_key_columns]
+
+
+def _source(name: str):
+    if name.startswith(MAPPER_PREFIX):
+        return getattr(Profile, name.removeprefix(MAPPER_PREFIX))
+
+    aggregate, field = name.split("_", 1)
+
+    return AGGREGATES[aggregate](getattr(BeatmapSnapshot, field))
+
+
+def sort_keys_select(beatmapset_listing_ids: list[int]) -> Select:
+    # Columns in the order of sort_keys_insert_columns
+    return (
+        select(
+            BeatmapsetListing.id,
+            BeatmapsetListing.beatmapset_snapshot_id,
+            BeatmapsetSnapshot.user_id,
+            *(_source(name) for name in sort_key_columns)
+        )
+        .join(BeatmapsetSnapshot, BeatmapsetSnapshot.id == BeatmapsetListing.beatmapset_snapshot_id)
+        .join(beatmap_snapshot_beatmapset_snapshot_association, beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+        .join(BeatmapSnapshot, BeatmapSnapshot.id == beatmap_snapshot_beatmapset_snapshot_association.c.beatmap_snapshot_id)
+        .outerjoin(Profile, Profile.user_id == BeatmapsetSnapshot.user_id)
+        .where(BeatmapsetListing.id.in_(beatmapset_listing_ids))
+        .group_by(BeatmapsetListing.id, BeatmapsetSnapshot.id, Profile.id)
+    )
+
+
+def mapper_sort_keys_update(user_ids: list[int]) -> Update:
+    # Copies the mappers' current profiles into the sort keys of all their listings
+    return (
+        update(BeatmapsetListingSortKeys)
+        .where(BeatmapsetListingSortKeys.user_id == Profile.user_id)
+        .where(Profile.user_id.in_(user_ids))
+        .values({name: _source(name) for name in mapper_sort_key_columns})
+    )
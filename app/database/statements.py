@@ -0,0 +1,157 @@
+from sqlalchemy.sql import select, update, func, case
+from sqlalchemy.sql.sqltypes import Numeric, Float
+from sqlalchemy.sql.elements import ColumnElement
+from sqlalchemy.sql.expression import literal_column, cast
+from sqlalchemy.sql.selectable import Select
+from sqlalchemy.sql.dml import Insert, Update
+from sqlalchemy.dialects.postgresql import insert
+
+from app.database.ctes.search_filter import TEXT_SEARCH_CONFIG
+from app.database.models import ScoreFetcherTask, ProfileFetcherTask, BeatmapSnapshot, BeatmapsetSnapshot, BeatmapsetListing, BeatmapsetSnapshotStats, BeatmapsetSnapshotSearch, Tag, beatmap_snapshot_beatmapset_snapshot_association, tag_beatmapset_snapshot_association
+
+# Statements shared by the ORM events and the bulk archive path, which bypasses the events
+
+
+def score_fetcher_tasks_insert(user_ids: list[int]) -> Insert:
+    return (
+        insert(ScoreFetcherTask)
+        .values([{"user_id": user_id} for user_id in user_ids])
+        .on_conflict_do_nothing(index_elements=[ScoreFetcherTask.user_id])
+    )
+
+
+def profile_fetcher_tasks_insert(user_ids: list[int]) -> Insert:
+    # Returns the IDs of the created tasks, which have to be published to the profile fetcher
+    return (
+        insert(ProfileFetcherTask)
+        .values([{"user_id": user_id} for user_id in user_ids])
+        .on_conflict_do_nothing(index_elements=[ProfileFetcherTask.user_id])
+        .returning(ProfileFetcherTask.id)
+    )
+
+
+def next_snapshot_number_select(model: type[BeatmapSnapshot | BeatmapsetSnapshot], parent_column: ColumnElement[int], parent_id: int) -> Select:
+    return (
+        select(func.coalesce(func.max(model.snapshot_number), 0) + 1)
+        .where(parent_column == parent_id)
+    )
+
+
+def listing_update(beatmapset_id: int, beatmapset_snapshot_id: int) -> Update:
+    # Points an existing listing at the new snapshot and returns its ID, or nothing if the beatmapset has no listing yet
+    return (
+        update(BeatmapsetListing)
+        .where(BeatmapsetListing.beatmapset_id == beatmapset_id)
+        .values(beatmapset_snapshot_id=beatmapset_snapshot_id)
+        .returning(BeatmapsetListing.id)
+    )
+
+
+def listing_insert(beatmapset_id: int, beatmapset_snapshot_id: int) -> Insert:
+    return (
+        insert(BeatmapsetListing)
+        .values(beatmapset_id=beatmapset_id, beatmapset_snapshot_id=beatmapset_snapshot_id)
+        .returning(BeatmapsetListing.id)
+    )
+
+
+def beatmapset_snapshot_stats_insert(beatmapset_snapshot_ids: list[int]) -> Insert:
+    # Same rounding as the sr_gaps and hit_lengths hybrids, with gaps between consecutive difficulties by star rating
+    difficulties = (
+        select(
+            beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id,
+            BeatmapSnapshot.hit_length,
+            func.round(
+                func.abs(
+                    cast(BeatmapSnapshot.difficulty_rating, Numeric) -
+                    func.lag(cast(BeatmapSnapshot.difficulty_rating, Numeric))
+                    .over(
+                        partition_by=beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id,
+                        order_by=BeatmapSnapshot.difficulty_rating
+                    )
+                ),
+                2
+            ).label("sr_gap")
+        )
+        .join(beatmap_snapshot_beatmapset_snapshot_association, BeatmapSnapshot.id == beatmap_snapshot_beatmapset_snapshot_association.c.beatmap_snapshot_id)
+        .where(beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id.in_(beatmapset_snapshot_ids))
+        .subquery()
+    )
+    num_difficulties = func.count()
+    is_multi_difficulty = num_difficulties > 1
+    stats_select = (
+        select(
+            difficulties.c.beatmapset_snapshot_id,
+            num_difficulties,
+            cast(func.min(difficulties.c.sr_gap), Float),
+            cast(func.max(difficulties.c.sr_gap), Float),
+            cast(func.round(func.avg(difficulties.c.sr_gap), 2), Float),
+            case((is_multi_difficulty, func.min(difficulties.c.hit_length))),
+            case((is_multi_difficulty, func.max(difficulties.c.hit_length))),
+            case((is_multi_difficulty, cast(func.round(func.avg(difficulties.c.hit_length), 2), Float)))
+        )
+        .group_by(difficulties.c.beatmapset_snapshot_id)
+    )
+
+    return (
+        insert(BeatmapsetSnapshotStats)
+        .from_select(
+            [
+                BeatmapsetSnapshotStats.beatmapset_snapshot_id,
+                BeatmapsetSnapshotStats.num_difficulties,
+                BeatmapsetSnapshotStats.min_sr_gap,
+                BeatmapsetSnapshotStats.max_sr_gap,
+                BeatmapsetSnapshotStats.avg_sr_gap,
+                BeatmapsetSnapshotStats.min_hit_length,
+                BeatmapsetSnapshotStats.max_hit_length,
+                BeatmapsetSnapshotStats.avg_hit_length
+            ],
+            stats_select
+        )
+        .on_conflict_do_nothing(index_elements=[BeatmapsetSnapshotStats.beatmapset_snapshot_id])
+    )
+
+
+def search_documents_upsert(beatmapset_snapshot_ids: list[int]) -> Insert:
+    # Weighted so that title matches rank above artist, then mapper and difficulty names, then source and tags
+    versions = (
+        select(func.string_agg(BeatmapSnapshot.version, " "))
+        .join(beatmap_snapshot_beatmapset_snapshot_association, beatmap_snapshot_beatmapset_snapshot_association.c.beatmap_snapshot_id == BeatmapSnapshot.id)
+        .where(beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+        .scalar_subquery()
+    )
+    tags = (
+        select(func.string_agg(Tag.name, " "))
+        .join(tag_beatmapset_snapshot_association, tag_beatmapset_snapshot_association.c.tag_id == Tag.id)
+        .where(tag_beatmapset_snapshot_association.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+        .scalar_subquery()
+    )
+    weighted_fields = {
+        "A": (BeatmapsetSnapshot.title, BeatmapsetSnapshot.title_unicode),
+        "B": (BeatmapsetSnapshot.artist, BeatmapsetSnapshot.artist_unicode),
+        "C": (BeatmapsetSnapshot.creator, versions),
+        "D": (BeatmapsetSnapshot.source, tags)
+    }
+    search_vector = None
+
+    for weight, fields in weighted_fields.items():
+        weighted_vector = func.setweight(func.to_tsvector(TEXT_SEARCH_CONFIG, func.concat_ws(" ", *fields)), literal_column(f"'{weight}'"))
+        search_vector = weighted_vector if search_vector is None else search_vector.op("||")(weighted_vector)
+
+    search_document_select = (
+        select(
+            BeatmapsetSnapshot.id,
+            func.concat_ws(" ", *(field for fields in weighted_fields.values() for field in fields)),
+            search_vector
+        )
+        .where(BeatmapsetSnapshot.id.in_(beatmapset_snapshot_ids))
+    )
+    insert_stmt = insert(BeatmapsetSnapshotSearch).from_select(
+        [BeatmapsetSnapshotSearch.beatmapset_snapshot_id, BeatmapsetSnapshotSearch.document, BeatmapsetSnapshotSearch.search_vector],
+        search_document_select
+    )
+
+    return insert_stmt.on_conflict_do_update(
+        index_elements=[BeatmapsetSnapshotSearch.beatmapset_snapshot_id],
+        set_={"document": insert_stmt.excluded.document, "search_vector": insert_stmt.excluded.search_vector}
+    )
@@ -3,7 +3,7 @@ from datetime import datetime
 
 from sqlalchemy.sql import any_, all_
 from sqlalchemy.sql.sqltypes import Integer, Float, String, Boolean, DateTime, Text
-from sqlalchemy.sql.elements import ColumnClause, literal, BinaryExpression
+from sqlalchemy.sql.elements import ColumnClause, literal, BinaryExpression, BindParameter
 from sqlalchemy.sql.functions import func
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 
@@ -43,19 +43,21 @@ def get_filter_condition(filter_operator: FilterOperator, target: InstrumentedAt
     if not is_aggregated:
         condition = filter_operator.value(target, value)
     else:
+        value = value if isinstance(value, BindParameter) else literal(value)
+
         match filter_operator:
             case FilterOperator.EQ:
-                condition = literal(value) == any_(func.array_agg(target))
+                condition = value == any_(func.array_agg(target))
             case FilterOperator.NEQ:
-                condition = literal(value) != all_(func.array_agg(target))
+                condition = value != all_(func.array_agg(target))
             case FilterOperator.GT:
-                condition = any_(func.array_agg(target)) > literal(value)
+                condition = any_(func.array_agg(target)) > value
             case FilterOperator.LT:
-                condition = any_(func.array_agg(target)) < literal(value)
+                condition = any_(func.array_agg(target)) < value
             case FilterOperator.GTE:
-                condition = any_(func.array_agg(target)) >= literal(value)
+                condition = any_(func.array_agg(target)) >= value
             case FilterOperator.LTE:
-                condition = any_(func.array_agg(target)) <= literal(value)
+                condition = any_(func.array_agg(target)) <= value
             case _:
                 raise ValueError(f"Invalid flter_operator: {filter_operator}")
 
@@ -2,6 +2,12 @@ from connexion.problem import problem
 from connexion.exceptions import Forbidden
 from connexion.lifecycle import ConnexionRequest, ConnexionResponse
 
+from .exceptions import CircuitOpenError
+
 
 def forbidden(request: ConnexionRequest, exc: Exception | Forbidden) -> ConnexionResponse:
     return problem(status=403, title="Forbidden", detail=exc.detail, type="about:blank")
+
+
+def circuit_open(request: ConnexionRequest, exc: CircuitOpenError) -> ConnexionResponse:
+    return problem(status=503, title="Service Unavailable", detail=str(exc), type="about:blank", headers={"Retry-After": str(max(1, round(exc.remaining_time)))})
@@ -20,6 +20,17 @@ class RestrictedUserError(ValueError):
         self.message = message if message is not None else f"User {self.user_id} is either restricted, deleted, or otherwise inaccessible"
 
 
+class ChecksumMismatchError(ValueError):
+    def __init__(self, expected: str, actual: str, message: str = None):
+        self.expected = expected
+        self.actual = actual
+
+        if message is None:
+            message = f"Expected checksum {expected}, but got {actual}"
+
+        super().__init__(message)
+
+
 class RateLimitExceeded(Exception):
     def __init__(self, next_window: datetime, message: str = None):
         self.next_window = next_window
@@ -32,3 +43,29 @@ class RateLimitExceeded(Exception):
     @property
     def remaining_time(self) -> float:
         return (self.next_window - datetime.now()).total_seconds()
+
+
+class StaleCacheError(ValueError):
+    def __init__(self, model_name: str, version: int | None, message: str = None):
+        self.model_name = model_name
+        self.version = version
+
+        if message is None:
+            message = f"Cached {model_name} has unsupported schema version {version}"
+
+        super().__init__(message)
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_at: datetime, message: str = None):
+        self.name = name
+        self.retry_at = retry_at
+
+        if message is None:
+            message = f"Circuit '{name}' is open. Try again in {self.remaining_time:.2f} seconds."
+
+        super().__init__(message)
+
+    @property
+    def remaining_time(self) -> float:
+        return max(0.0, (self.retry_at - datetime.now()).total_seconds())
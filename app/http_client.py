@@ -0,0 +1,107 @@
+from collections import defaultdict
+
+import httpx
+
+from .logger import logger
+from .config import HTTP_CLIENT_CONFIGURATION
+
+_transport: httpx.AsyncHTTPTransport | None = None
+_client: "HTTPClient | None" = None
+
+
+class HTTPClient(httpx.AsyncClient):
+    def __init__(self, transport: httpx.AsyncHTTPTransport):
+        super().__init__(
+            transport=transport,
+            timeout=httpx.Timeout(
+                connect=HTTP_CLIENT_CONFIGURATION["connect_timeout"],
+                read=HTTP_CLIENT_CONFIGURATION["read_timeout"],
+                write=HTTP_CLIENT_CONFIGURATION["write_timeout"],
+                pool=HTTP_CLIENT_CONFIGURATION["pool_timeout"]
+            )
+        )
+
+
+def get_http_transport() -> httpx.AsyncHTTPTransport:
+    global _transport
+
+    if _transport is None:
+        _transport = httpx.AsyncHTTPTransport(
+            http2=HTTP_CLIENT_CONFIGURATION["http2"],
+            limits=httpx.Limits(
+                max_connections=HTTP_CLIENT_CONFIGURATION["max_connections"],
+                max_keepalive_connections=HTTP_CLIENT_CONFIGURATION["max_keepalive_connections"],
+                keepalive_expiry=HTTP_CLIENT_CONFIGURATION["keepalive_expiry"]
+            )
+        )
+
+    return _transport
+
+
+class SharedTransport(httpx.AsyncBaseTransport):
+    # Sends through whichever shared pool is open at request time, for clients that outlive a close and reopen of the
+    # pool. Closing such a client leaves the pool to close_http_client()
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        return await get_http_transport().handle_async_request(request)
+
+    async def aclose(self):
+        pass
+
+
+def get_http_client() -> HTTPClient:
+    global _client, _transport
+
+    if _client is not None and _client.is_closed:
+        _client = None
+        _transport = None
+
+    if _client is None:
+        _client = HTTPClient(get_http_transport())
+
+    return _client
+
+
+def open_http_client() -> HTTPClient:
+    client = get_http_client()
+    logger.info(f"[{HTTPClient.__name__}] Opened shared connection pool (http2={HTTP_CLIENT_CONFIGURATION["http2"]}, max_connections={HTTP_CLIENT_CONFIGURATION["max_connections"]})")
+
+    return client
+
+
+async def close_http_client():
+    global _client, _transport
+
+    if _client is not None:
+        await _client.aclose()
+    elif _transport is not None:
+        await _transport.aclose()
+
+    _client = None
+    _transport = None
+
+
+def get_pool_stats() -> dict[str, dict[str, int]]:
+    if _transport is None:
+        return {}
+
+    stats: dict[str, dict[str, int]] = defaultdict(lambda: {"active": 0, "idle": 0, "waiting": 0})
+
+    # httpx and httpcore don't expose pool usage publicly, so leave the metric out if their internals have changed
+    try:
+        pool = _transport._pool
+
+        for connection in pool.connections:
+            origin = str(getattr(connection, "_origin", "unknown"))
+
+            if connection.is_idle():
+                stats[origin]["idle"] += 1
+            elif not connection.is_closed():
+                stats[origin]["active"] += 1
+
+        for pool_request in pool._requests:
+            if pool_request.is_queued():
+                stats[str(pool_request.request.url.origin)]["waiting"] += 1
+    except AttributeError:
+        return {}
+
+    return dict(stats)
@@ -3,8 +3,10 @@ from contextlib import asynccontextmanager
 
 from connexion.middleware import ConnexionMiddleware
 
-from app.redis import RedisClient
+from app.redis import RedisClient, listen_for_invalidations
 from app.database import PostgresqlDB
+from app.http_client import open_http_client, close_http_client
+from app.beatmap_manager import BeatmapManager
 from app.logger import logger
 from app.config import DISABLE_SECURITY
 from daemon.service_daemon import ServiceDaemon
@@ -18,6 +20,9 @@ async def lifespan(app: ConnexionMiddleware):
 
     rc = RedisClient()
     db = PostgresqlDB()
+    http_client = open_http_client()
+
+    await BeatmapManager.rebuild_snapshot_index(rc, db)
 
     daemon_app = ServiceDaemon(rc, db)
     daemon_app.register_service(ServiceClass.SCORE_FETCHER)
@@ -25,20 +30,24 @@ async def lifespan(app: ConnexionMiddleware):
     daemon_app.register_service(ServiceClass.QUEUE_REQUEST_HANDLER)
 
     task = asyncio.create_task(daemon_app.run(), name="Daemon Task")
+    invalidation_task = asyncio.create_task(listen_for_invalidations(rc), name="Cache Invalidation Task")
 
     try:
-        yield {"rc": rc, "db": db}
+        yield {"rc": rc, "db": db, "http_client": http_client}
     finally:
         await daemon_app.shutdown()
         task.cancel()
+        invalidation_task.cancel()
 
-        try:
-            await task
-        except asyncio.CancelledError:
-            pass
+        for task_ in (task, invalidation_task):
+            try:
+                await task_
+            except asyncio.CancelledError:
+                pass
 
         await rc.aclose()
         await db.close()
+        await close_http_client()
 
         from app.redis.pool import connection_pool
         connection_pool.close()
@@ -0,0 +1,161 @@
+import contextvars
+from bisect import bisect_left
+from collections import defaultdict
+
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+from .redis.single_flight import single_flight_stats
+from .redis.lock import lock_stats
+from .redis.circuit_breaker import circuit_breaker_stats
+from .redis.local_cache import get_cache_stats
+from .http_client import get_pool_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DEFAULT_CALLER = "unknown"
+UNROUTED_CALLER = "api:unrouted"
+
+current_caller: contextvars.ContextVar[str] = contextvars.ContextVar("current_caller", default=DEFAULT_CALLER)
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if (index := bisect_left(self.buckets, value)) < len(self.buckets):
+            self.bucket_counts[index] += 1
+
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[int]:
+        counts, total = [], 0
+
+        for bucket_count in self.bucket_counts:
+            total += bucket_count
+            counts.append(total)
+
+        return counts
+
+
+# Labelled by (endpoint, caller)
+osu_api_latency: dict[tuple[str, str], Histogram] = defaultdict(Histogram)
+osu_api_response_bytes: dict[tuple[str, str], int] = defaultdict(int)
+osu_api_cache_lookups: dict[tuple[str, str, str], int] = defaultdict(int)
+osu_api_responses: dict[tuple[str, str, str], int] = defaultdict(int)
+
+# Labelled by (bucket, priority, caller)
+rate_limit_wait: dict[tuple[str, str, str], Histogram] = defaultdict(Histogram)
+
+
+def record_osu_api_response(endpoint: str, status: int | str, elapsed: float, size: int = 0):
+    caller = current_caller.get()
+    osu_api_latency[endpoint, caller].observe(elapsed)
+    osu_api_responses[endpoint, caller, str(status)] += 1
+    osu_api_response_bytes[endpoint, caller] += size
+
+
+def record_osu_api_cache_lookup(endpoint: str, hits: int, misses: int):
+    caller = current_caller.get()
+    osu_api_cache_lookups[endpoint, caller, "hit"] += hits
+    osu_api_cache_lookups[endpoint, caller, "miss"] += misses
+
+
+def record_rate_limit_wait(bucket_name: str, priority: str, wait_time: float):
+    rate_limit_wait[bucket_name, priority, current_caller.get()].observe(wait_time)
+
+
+class CallerMiddleware:
+    """Tags everything a request does with the operation it was routed to, so it can be attributed in the metrics"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        operation_id = scope.get("extensions", {}).get("connexion_routing", {}).get("operation_id")
+        # Not the raw path, since every ID in it would make a new series
+        token = current_caller.set(f"api:{operation_id}" if operation_id else UNROUTED_CALLER)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_caller.reset(token)
+
+
+def render_metrics() -> str:
+    lines = []
+
+    def metric(name: str, metric_type: str, description: str, samples: list[tuple[dict[str, str], int | float]]):
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    def histogram(name: str, description: str, histograms: dict[tuple, Histogram], label_names: tuple[str, ...]):
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} histogram")
+
+        for label_values, hist in list(histograms.items()):
+            labels = dict(zip(label_names, label_values))
+
+            for bucket, count in zip(hist.buckets, hist.cumulative_counts()):
+                lines.append(f"{name}_bucket{_format_labels(labels | {"le": str(bucket)})} {count}")
+
+            lines.append(f"{name}_bucket{_format_labels(labels | {"le": "+Inf"})} {hist.count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {hist.sum}")
+            lines.append(f"{name}_count{_format_labels(labels)} {hist.count}")
+
+    histogram("osu_api_request_duration_seconds", "Latency of individual osu! API request attempts", osu_api_latency, ("endpoint", "caller"))
+    metric("osu_api_responses_total", "counter", "osu! API responses by status code, or 'transport_error'", [
+        ({"endpoint": endpoint, "caller": caller, "status": status}, count)
+        for (endpoint, caller, status), count in list(osu_api_responses.items())
+    ])
+    metric("osu_api_response_bytes_total", "counter", "Bytes received from the osu! API", [
+        ({"endpoint": endpoint, "caller": caller}, size)
+        for (endpoint, caller), size in list(osu_api_response_bytes.items())
+    ])
+    metric("osu_api_cache_lookups_total", "counter", "osu! API lookups served from cache ('hit') versus sent over the network ('miss')", [
+        ({"endpoint": endpoint, "caller": caller, "result": result}, count)
+        for (endpoint, caller, result), count in list(osu_api_cache_lookups.items())
+    ])
+    histogram("rate_limit_wait_seconds", "Time spent waiting for a rate limit token", rate_limit_wait, ("bucket", "priority", "caller"))
+
+    cache_stats = get_cache_stats()
+    metric("cache_hits_total", "counter", "Cache hits per tier", [({"tier": tier}, stats["hits"]) for tier, stats in cache_stats.items()])
+    metric("cache_misses_total", "counter", "Cache misses per tier", [({"tier": tier}, stats["misses"]) for tier, stats in cache_stats.items()])
+    metric("local_cache_entries", "gauge", "Entries held in the in-process cache", [({}, cache_stats["local"]["size"])])
+
+    metric("single_flight_calls_total", "counter", "Single-flight calls by outcome", [({"result": result}, count) for result, count in single_flight_stats.items()])
+
+    for stat in ("acquired", "contended", "timeouts", "lost"):
+        metric(f"lock_{stat}_total", "counter", f"Redis lock {stat} count", [({"lock": name}, stats[stat]) for name, stats in list(lock_stats.items())])
+
+    metric("lock_wait_seconds_total", "counter", "Time spent waiting for Redis locks", [({"lock": name}, stats["wait_seconds_total"]) for name, stats in list(lock_stats.items())])
+
+    for stat in ("successes", "failures", "rejected", "opened"):
+        metric(f"circuit_breaker_{stat}_total", "counter", f"Circuit breaker {stat} count", [({"circuit": name}, stats[stat]) for name, stats in list(circuit_breaker_stats.items())])
+
+    metric("http_pool_connections", "gauge", "Shared HTTP connection pool usage", [
+        ({"origin": origin, "state": state}, count)
+        for origin, stats in get_pool_stats().items()
+        for state, count in stats.items()
+    ])
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+
+    escaped = (f'{key}="{str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")}"' for key, value in labels.items())
+
+    return "{" + ",".join(escaped) + "}"
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Callable, Awaitable, Hashable, Iterable, Any
+
+MICRO_BATCH_MAX_SIZE = 50
+MICRO_BATCH_MAX_DELAY = 0.005
+
+Dispatch = Callable[[list[Hashable]], Awaitable[dict[Hashable, Any]]]
+
+
+class MicroBatcher:
+    def __init__(self, dispatch: Dispatch | None = None, max_batch_size: int = MICRO_BATCH_MAX_SIZE, max_delay: float = MICRO_BATCH_MAX_DELAY):
+        self.dispatch = dispatch
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay
+
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self._pending_dispatch: Dispatch | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._dispatch_tasks: set[asyncio.Task] = set()
+
+    async def load(self, key: Hashable, dispatch: Dispatch | None = None) -> Any | None:
+        return (await self.load_many([key], dispatch)).get(key)
+
+    async def load_many(self, keys: Iterable[Hashable], dispatch: Dispatch | None = None) -> dict[Hashable, Any]:
+        # A batch is sent with the dispatch of the call that opened it, so callers sharing a batcher can each bring their own
+        loop = asyncio.get_running_loop()
+        futures: dict[Hashable, asyncio.Future] = {}
+
+        if not self._pending:
+            self._pending_dispatch = dispatch or self.dispatch
+
+        for key in dict.fromkeys(keys):
+            if (future := self._pending.get(key)) is None:
+                future = loop.create_future()
+                self._pending[key] = future
+
+            futures[key] = future
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._pending and self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_delay, self._flush)
+
+        results = await asyncio.gather(*(asyncio.shield(future) for future in futures.values()))
+
+        return {key: result for key, result in zip(futures, results) if result is not None}
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+        pending, self._pending = self._pending, {}
+        dispatch, self._pending_dispatch = self._pending_dispatch, None
+        keys = list(pending)
+
+        for i in range(0, len(keys), self.max_batch_size):
+            batch = {key: pending[key] for key in keys[i:i + self.max_batch_size]}
+            task = asyncio.create_task(self._dispatch_batch(dispatch, batch))
+            self._dispatch_tasks.add(task)
+            task.add_done_callback(self._dispatch_tasks.discard)
+
+    @staticmethod
+    async def _dispatch_batch(dispatch: Dispatch, batch: dict[Hashable, asyncio.Future]):
+        try:
+            results = await dispatch(list(batch))
+
+            for key, future in batch.items():
+                if not future.done():
+                    future.set_result(results.get(key))
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+                    future.exception()
+        finally:
+            # A cancelled dispatch skips both branches above, and would otherwise leave its callers waiting forever
+            for future in batch.values():
+                if not future.done():
+                    future.cancel()
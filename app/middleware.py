@@ -0,0 +1,19 @@
+import re
+
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.types import ASGIApp, Scope, Receive, Send
+
+
+class SelectiveGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that passes responses under the excluded paths through untouched"""
+
+    def __init__(self, app: ASGIApp, exclude_paths: tuple[str, ...] = (), **kwargs):
+        super().__init__(app, **kwargs)
+        self.exclude_paths = [re.compile(pattern) for pattern in exclude_paths]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and any(pattern.search(scope["path"]) for pattern in self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+
+        await super().__call__(scope, receive, send)
@@ -3,6 +3,7 @@ from typing import Literal
 from authlib.integrations.httpx_client import AsyncOAuth2Client
 from authlib.oauth2.auth import OAuth2Token
 
+from .http_client import SharedTransport
 from .config import OAUTH_CONFIGURATION
 
 
@@ -12,7 +13,8 @@ class OAuth(AsyncOAuth2Client):
             client_id=OAUTH_CONFIGURATION["client_id"],
             client_secret=OAUTH_CONFIGURATION["client_secret"],
             token_endpoint_auth_method=OAUTH_CONFIGURATION["token_endpoint_auth_method"],
-            redirect_uri=OAUTH_CONFIGURATION["redirect_uri"]
+            redirect_uri=OAUTH_CONFIGURATION["redirect_uri"],
+            transport=SharedTransport()
         )
 
         self.authorize_url = OAUTH_CONFIGURATION["authorize_url"]
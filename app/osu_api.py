@@ -1,18 +1,43 @@
+import copy
 import time
+import random
 import asyncio
 from enum import Enum
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Awaitable, AsyncIterator, Self
 
 import httpx
 from pydantic import ValidationError
+from redis.exceptions import ResponseError
 
-from .redis import RedisClient, Namespace, LOCK_EXPIRY, CACHED_BEATMAP_EXPIRY, CACHED_BEATMAPSET_EXPIRY, rate_limit
-from .redis.models import OsuClientOAuthToken, Beatmapset, Beatmap
+from .redis import RedisClient, Namespace, RateLimitPriority, LOCK_EXPIRY, CACHED_BEATMAP_EXPIRY, CACHED_BEATMAP_SOFT_EXPIRY, CACHED_BEATMAPSET_EXPIRY, CACHED_BEATMAPSET_SOFT_EXPIRY, CACHED_USER_EXPIRY, CACHED_USER_SOFT_EXPIRY, RedisLock, CircuitBreaker, rate_limit, single_flight
+from .redis.constants import CACHE_REFRESH_LOCK_EXPIRY
+from .redis.local_cache import local_cache, cache_stats, publish_invalidation
+from .redis.models import CachedModel, OsuClientOAuthToken, Beatmapset, Beatmap, User
 from .oauth import OAuth
+from .http_client import HTTPClient, get_http_client
+from .micro_batcher import MicroBatcher
+from .exceptions import StaleCacheError, CircuitOpenError
+from .metrics import record_osu_api_response, record_osu_api_cache_lookup
 from .logger import logger
+from .config import OSU_BASE_URL
+from .utils import parse_iso8601
 
-API_BASEURL = "https://osu.ppy.sh/api/v2"
+API_BASEURL = OSU_BASE_URL + "/api/v2"
 MAX_TOKEN_FETCH_RETRIES = 3
 RATE_LIMIT = 60
+BULK_LOOKUP_LIMIT = 50
+SCORES_PAGE_SIZE = 100
+MAX_REQUEST_RETRIES = 3
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 30
+RETRY_STATUS_CODES = {429, 502, 503, 504}
+CIRCUIT_BREAKER_NAME = "osu_api"
+
+_refresh_tasks: dict[str, asyncio.Task] = {}
+_batchers: dict[tuple, MicroBatcher] = {}
+
 
 class APIEndpoint(Enum):
     # Beatmaps
@@ -33,6 +58,7 @@ class APIEndpoint(Enum):
     ME = API_BASEURL + "/me"
     SCORES = API_BASEURL + "/users/{user}/scores/{type}"
     USER = API_BASEURL + "/users/{user}/{mode}"
+    USERS = API_BASEURL + "/users"
 
     def format(self, *args, **kwargs) -> str:
         args = [arg if arg is not None else "" for arg in args]
@@ -55,8 +81,11 @@ class Ruleset(Enum):
 
 
 class OsuAPIClientBase:
-    def __init__(self, rc: RedisClient):
+    def __init__(self, rc: RedisClient, http_client: HTTPClient = None, priority: RateLimitPriority = RateLimitPriority.INTERACTIVE, rate_limit_timeout: float = None):
         self.rc = rc
+        self.http = http_client if http_client is not None else get_http_client()
+        self.priority = priority
+        self.rate_limit_timeout = rate_limit_timeout
         self._oauth = OAuth()
         self._token: OsuClientOAuthToken | None = None
 
@@ -75,12 +104,6 @@ class OsuAPIClientBase:
 
             return None
 
-        async def do_refresh_token():
-            try:
-                await self.refresh_token()
-            finally:
-                await self.rc.delete(lock_hash_name)
-
         if self._token and self._token.expires_at > time.time():
             return self._token.access_token
 
@@ -88,20 +111,25 @@ class OsuAPIClientBase:
             self._token = token
             return token.access_token
 
-        lock_hash_name = Namespace.LOCK.hash_name(Namespace.OSU_CLIENT_OAUTH_TOKEN.value)
-        lock_acquired = await self.rc.set(lock_hash_name, "locked", ex=LOCK_EXPIRY, nx=True)
+        lock = RedisLock(self.rc, Namespace.OSU_CLIENT_OAUTH_TOKEN.value)
 
-        if lock_acquired:
-            await do_refresh_token()
-        else:
-            for _ in range(LOCK_EXPIRY):
-                await asyncio.sleep(1)
+        if not await lock.acquire(timeout=LOCK_EXPIRY):
+            # Refreshing without the lock would race the holder, so only take a token it has already stored
+            if token := await get_valid_token_from_redis():
+                self._token = token
+                return token.access_token
 
-                if token := await get_valid_token_from_redis():
-                    self._token = token
-                    return token.access_token
+            raise TimeoutError("Timed out waiting for another worker to refresh the osu! API token")
 
-            await do_refresh_token()
+        try:
+            # Another worker may have refreshed the token while we were waiting for the lock
+            if token := await get_valid_token_from_redis():
+                self._token = token
+                return token.access_token
+
+            await self.refresh_token()
+        finally:
+            await lock.release()
 
         return self._token.access_token
 
@@ -123,6 +151,214 @@ class OsuAPIClientBase:
     async def get_auth_headers(self, access_token: str = None) -> dict:
         return {"Authorization": f"Bearer {access_token or await self.get_token()}"}
 
+    async def get_cached(self, hash_name: str, model_class: type[CachedModel]) -> CachedModel | None:
+        if (cached := local_cache.get(hash_name)) is not None:
+            return cached
+
+        try:
+            serialized = await self.rc.get_bytes(hash_name)
+        except ResponseError:
+            serialized = None  # Key still holds a legacy hash entry
+
+        return self._decode_cached(hash_name, serialized, model_class)
+
+    async def get_cached_many(self, hash_names: list[str], model_class: type[CachedModel]) -> list[CachedModel | None]:
+        cached_list = [local_cache.get(hash_name) for hash_name in hash_names]
+        missing_hash_names = [hash_name for hash_name, cached in zip(hash_names, cached_list) if cached is None]
+
+        if missing_hash_names:
+            decoded = {
+                hash_name: self._decode_cached(hash_name, serialized, model_class)
+                for hash_name, serialized in zip(missing_hash_names, await self.rc.mget_bytes(missing_hash_names))
+            }
+            cached_list = [cached if cached is not None else decoded[hash_name] for hash_name, cached in zip(hash_names, cached_list)]
+
+        return cached_list
+
+    @staticmethod
+    def _decode_cached(hash_name: str, serialized: bytes | None, model_class: type[CachedModel]) -> CachedModel | None:
+        if not serialized:
+            cache_stats["redis"]["misses"] += 1
+            return None
+
+        try:
+            cached = model_class.from_bytes(serialized)
+            cache_stats["redis"]["hits"] += 1
+            local_cache.set(hash_name, cached)
+
+            return cached
+        except StaleCacheError as e:
+            logger.debug(f"Skipping stale cache entry '{hash_name}': {e}")
+        except (ValidationError, ValueError) as e:
+            logger.warning(f"Error when deserializing from redis cache: {e}")
+
+        cache_stats["redis"]["misses"] += 1
+        return None
+
+    async def set_cached(self, hash_name: str, model: CachedModel, expiry: int):
+        await self.rc.set(hash_name, model.to_bytes(), ex=expiry)
+        self._set_local_cached(hash_name, model)
+        await publish_invalidation(self.rc, hash_name)
+
+    async def set_cached_many(self, namespace: Namespace, model_class: type[CachedModel], data: dict[int, dict], expiry: int):
+        if not data:
+            return
+
+        models = {}
+
+        for id_, item in data.items():
+            try:
+                models[namespace.hash_name(id_)] = model_class.model_validate(item)
+            except ValidationError as e:
+                logger.warning(f"Not caching {model_class.__name__} {id_}: {e}")
+
+        async with self.rc.pipeline(transaction=False) as pipe:
+            for hash_name, model in models.items():
+                pipe.set(hash_name, model.to_bytes(), ex=expiry)
+                self._set_local_cached(hash_name, model)
+
+            await pipe.execute()
+
+        await publish_invalidation(self.rc, *models)
+
+    @staticmethod
+    def _set_local_cached(hash_name: str, model: CachedModel):
+        model._cached_at = int(time.time())
+        local_cache.set(hash_name, model)
+
+    async def get_or_fetch_cached(self, endpoint: APIEndpoint, hash_name: str, model_class: type[CachedModel], soft_expiry: int, fetch: Callable[..., Awaitable[dict]], *args, max_age: float | None = None) -> dict:
+        cached = await self.get_cached(hash_name, model_class)
+
+        # Callers about to change state on the data pass a max_age, so they wait for a fetch instead of acting on stale data
+        if cached is not None and max_age is not None and cached.cache_age > max_age:
+            cached = None
+
+        if cached is None:
+            record_osu_api_cache_lookup(endpoint.name, hits=0, misses=1)
+            return await fetch(*args)
+
+        record_osu_api_cache_lookup(endpoint.name, hits=1, misses=0)
+
+        if cached.cache_age >= soft_expiry:
+            self.schedule_refresh(hash_name, fetch, *args)
+
+        return cached.model_dump(mode="json")
+
+    async def get_or_fetch_cached_many(self, endpoint: APIEndpoint, namespace: Namespace, ids: list[int], model_class: type[CachedModel], soft_expiry: int, load_many: Callable[[list[int]], Awaitable[dict[int, dict]]], refresh: Callable[[int], Awaitable[dict | None]]) -> dict[int, dict]:
+        ids = list(dict.fromkeys(ids))
+        hash_names = [namespace.hash_name(id_) for id_ in ids]
+        results = {}
+        missing_ids = []
+
+        for id_, hash_name, cached in zip(ids, hash_names, await self.get_cached_many(hash_names, model_class)):
+            if cached is None:
+                missing_ids.append(id_)
+                continue
+
+            if cached.cache_age >= soft_expiry:
+                self.schedule_refresh(hash_name, refresh, id_)
+
+            results[id_] = cached.model_dump(mode="json")
+
+        record_osu_api_cache_lookup(endpoint.name, hits=len(results), misses=len(missing_ids))
+
+        if missing_ids:
+            results |= await load_many(missing_ids)
+
+        return {id_: results[id_] for id_ in ids if id_ in results}
+
+    def schedule_refresh(self, hash_name: str, fetch: Callable[..., Awaitable[dict]], *args):
+        if hash_name in _refresh_tasks:
+            return
+
+        task = asyncio.create_task(self._refresh_cached(hash_name, fetch.__name__, *args), name=f"Cache Refresh Task ({hash_name})")
+        _refresh_tasks[hash_name] = task
+        task.add_done_callback(lambda _: _refresh_tasks.pop(hash_name, None))
+
+    async def _refresh_cached(self, hash_name: str, fetch_name: str, *args):
+        lock = RedisLock(self.rc, Namespace.CACHE_REFRESH.hash_name(hash_name), expiry=CACHE_REFRESH_LOCK_EXPIRY)
+
+        if not await lock.acquire(blocking=False):
+            return
+
+        try:
+            await getattr(self.with_priority(RateLimitPriority.BACKGROUND), fetch_name)(*args)
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            logger.warning(f"Background refresh of '{hash_name}' failed: {e}")
+        finally:
+            await lock.release()
+
+    async def send(self, endpoint: APIEndpoint, url: str, headers: dict, params: list[tuple[str, int | str]] = None) -> httpx.Response:
+        breaker = CircuitBreaker(self.rc, CIRCUIT_BREAKER_NAME)
+
+        for attempt in range(MAX_REQUEST_RETRIES + 1):
+            await breaker.before_call()
+            start_time = time.perf_counter()
+
+            try:
+                response = await self.http.get(url, headers=headers, params=params)
+            except httpx.TransportError as e:
+                record_osu_api_response(endpoint.name, "transport_error", time.perf_counter() - start_time)
+                await breaker.record_failure()
+
+                if attempt == MAX_REQUEST_RETRIES:
+                    raise
+
+                delay = self.backoff_delay(attempt)
+                reason = repr(e)
+            else:
+                record_osu_api_response(endpoint.name, response.status_code, time.perf_counter() - start_time, len(response.content))
+
+                if response.status_code not in RETRY_STATUS_CODES:
+                    # Other server errors aren't retried, but a run of them still means the API is down
+                    if response.status_code >= 500:
+                        await breaker.record_failure()
+                    else:
+                        await breaker.record_success()
+
+                    response.raise_for_status()
+                    return response
+
+                await breaker.record_failure()
+                retry_after = self.parse_retry_after(response)
+                delay = retry_after if retry_after is not None else self.backoff_delay(attempt)
+
+                if attempt == MAX_REQUEST_RETRIES or delay > RETRY_MAX_DELAY:
+                    response.raise_for_status()
+
+                reason = f"HTTP {response.status_code}"
+
+            logger.warning(f"[{self.__class__.__name__}] Request to '{url}' failed ({reason}), retrying in {delay:.2f} seconds ({attempt + 1}/{MAX_REQUEST_RETRIES})")
+            await asyncio.sleep(delay)
+
+    @staticmethod
+    def backoff_delay(attempt: int) -> float:
+        return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+    @staticmethod
+    def parse_retry_after(response: httpx.Response) -> float | None:
+        if (retry_after := response.headers.get("Retry-After")) is None:
+            return None
+
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            pass
+
+        try:
+            return max(0.0, (parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds())
+        except (TypeError, ValueError):
+            return None
+
+    def with_priority(self, priority: RateLimitPriority) -> Self:
+        client = copy.copy(self)
+        client.priority = priority
+        client.rate_limit_timeout = None
+
+        return client
+
     @staticmethod
     def format_query_parameters(query_parameters: dict) -> str:
         parameter_strings = [f"{key}={value}" for key, value in query_parameters.items()]
@@ -131,24 +367,54 @@ class OsuAPIClientBase:
 
 
 class OsuAPIClient(OsuAPIClientBase):
+    @property
+    def _beatmap_batcher(self) -> MicroBatcher:
+        return self._get_batcher("fetch_beatmaps")
+
+    @property
+    def _user_batcher(self) -> MicroBatcher:
+        return self._get_batcher("fetch_users")
+
+    def _get_batcher(self, fetch_name: str) -> MicroBatcher:
+        # Clients are created per request and per task, so the batchers are shared between all clients sending at the same
+        # priority and timeout, letting their single lookups merge. Each batch is sent by the client that opened it, so a
+        # batcher never keeps a client around once its lookups are done
+        key = (fetch_name, self.priority, self.rate_limit_timeout)
+
+        if (batcher := _batchers.get(key)) is None:
+            batcher = _batchers[key] = MicroBatcher(max_batch_size=BULK_LOOKUP_LIMIT)
+
+        return batcher
+
     # BEATMAPS
-    @rate_limit(RATE_LIMIT)
     async def get_beatmap(self, beatmap_id: int) -> dict:
-        async def get_cached_beatmap_from_redis() -> Beatmap | None:
-            if serialized_beatmap := await self.rc.hgetall(cached_beatmap_hash_name):
-                try:
-                    return Beatmap.deserialize(serialized_beatmap)
-                except (ValidationError, ValueError) as e:
-                    logger.warning(f"Error when deserializing from redis cache: {e}")
+        cached_beatmap_hash_name = Namespace.CACHED_BEATMAP.hash_name(beatmap_id)
 
-            return None
+        return await self.get_or_fetch_cached(APIEndpoint.BEATMAP, cached_beatmap_hash_name, Beatmap, CACHED_BEATMAP_SOFT_EXPIRY, self.load_beatmap, beatmap_id)
 
-        cached_beatmap_hash_name = Namespace.CACHED_BEATMAP.hash_name(beatmap_id)
+    async def get_beatmaps(self, beatmap_ids: list[int]) -> dict[int, dict]:
+        return await self.get_or_fetch_cached_many(APIEndpoint.BEATMAPS, Namespace.CACHED_BEATMAP, beatmap_ids, Beatmap, CACHED_BEATMAP_SOFT_EXPIRY, self.load_beatmaps, self.load_beatmap)
 
-        if cached_beatmap := await get_cached_beatmap_from_redis():
-            return cached_beatmap.model_dump(mode="json")
+    async def load_beatmaps(self, beatmap_ids: list[int]) -> dict[int, dict]:
+        return await self._beatmap_batcher.load_many(beatmap_ids, self.fetch_beatmaps)
 
-        url = APIEndpoint.BEATMAP.format(beatmap=beatmap_id)
+    async def load_beatmap(self, beatmap_id: int) -> dict:
+        if (beatmap_data := await self._beatmap_batcher.load(beatmap_id, self.fetch_beatmaps)) is not None:
+            return beatmap_data
+
+        return await self.fetch_beatmap(beatmap_id)
+
+    async def fetch_beatmaps(self, beatmap_ids: list[int]) -> dict[int, dict]:
+        beatmaps_data = {}
+
+        for i in range(0, len(beatmap_ids), BULK_LOOKUP_LIMIT):
+            beatmaps_data |= await self._fetch_beatmaps_chunk(beatmap_ids[i:i + BULK_LOOKUP_LIMIT])
+
+        return beatmaps_data
+
+    @rate_limit(RATE_LIMIT)
+    async def _fetch_beatmaps_chunk(self, beatmap_ids: list[int]) -> dict[int, dict]:
+        url = APIEndpoint.BEATMAPS.value
 
         headers = {
             "Content-Type": "application/json",
@@ -156,34 +422,41 @@ class OsuAPIClient(OsuAPIClientBase):
             **await self.get_auth_headers()
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+        response = await self.send(APIEndpoint.BEATMAPS, url, headers=headers, params=[("ids[]", beatmap_id) for beatmap_id in beatmap_ids])
 
-        response.raise_for_status()
-        beatmap_data = response.json()
+        beatmaps_data = {beatmap_data["id"]: beatmap_data for beatmap_data in response.json()["beatmaps"]}
 
-        cached_beatmap = Beatmapset.model_validate(beatmap_data)
-        await self.rc.hset(cached_beatmap_hash_name, mapping=cached_beatmap.serialize())
-        await self.rc.expire(cached_beatmap_hash_name, CACHED_BEATMAP_EXPIRY)
+        await self.set_cached_many(Namespace.CACHED_BEATMAP, Beatmap, beatmaps_data, CACHED_BEATMAP_EXPIRY)
 
-        return beatmap_data
+        return beatmaps_data
 
+    @single_flight(APIEndpoint.BEATMAP.name)
     @rate_limit(RATE_LIMIT)
-    async def get_beatmapset(self, beatmapset_id: int) -> dict:
-        async def get_cached_beatmapset_from_redis() -> Beatmapset | None:
-            if serialized_beatmapset := await self.rc.hgetall(cached_beatmapset_hash_name):
-                try:
-                    return Beatmapset.deserialize(serialized_beatmapset)
-                except (ValidationError, ValueError) as e:
-                    logger.warning(f"Error when deserializing from redis cache: {e}")
+    async def fetch_beatmap(self, beatmap_id: int) -> dict:
+        url = APIEndpoint.BEATMAP.format(beatmap=beatmap_id)
 
-            return None
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            **await self.get_auth_headers()
+        }
 
+        response = await self.send(APIEndpoint.BEATMAP, url, headers=headers)
+
+        beatmap_data = response.json()
+
+        await self.set_cached(Namespace.CACHED_BEATMAP.hash_name(beatmap_id), Beatmap.model_validate(beatmap_data), CACHED_BEATMAP_EXPIRY)
+
+        return beatmap_data
+
+    async def get_beatmapset(self, beatmapset_id: int, max_age: float | None = None) -> dict:
         cached_beatmapset_hash_name = Namespace.CACHED_BEATMAPSET.hash_name(beatmapset_id)
 
-        if cached_beatmapset := await get_cached_beatmapset_from_redis():
-            return cached_beatmapset.model_dump(mode="json")
+        return await self.get_or_fetch_cached(APIEndpoint.BEATMAPSET, cached_beatmapset_hash_name, Beatmapset, CACHED_BEATMAPSET_SOFT_EXPIRY, self.fetch_beatmapset, beatmapset_id, max_age=max_age)
 
+    @single_flight(APIEndpoint.BEATMAPSET.name)
+    @rate_limit(RATE_LIMIT)
+    async def fetch_beatmapset(self, beatmapset_id: int) -> dict:
         url = APIEndpoint.BEATMAPSET.format(beatmapset=beatmapset_id)
 
         headers = {
@@ -192,15 +465,11 @@ class OsuAPIClient(OsuAPIClientBase):
             **await self.get_auth_headers()
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+        response = await self.send(APIEndpoint.BEATMAPSET, url, headers=headers)
 
-        response.raise_for_status()
         beatmapset_data = response.json()
 
-        cached_beatmapset = Beatmapset.model_validate(beatmapset_data)
-        await self.rc.hset(cached_beatmapset_hash_name, mapping=cached_beatmapset.serialize())
-        await self.rc.expire(cached_beatmapset_hash_name, CACHED_BEATMAPSET_EXPIRY)
+        await self.set_cached(Namespace.CACHED_BEATMAPSET.hash_name(beatmapset_id), Beatmapset.model_validate(beatmapset_data), CACHED_BEATMAPSET_EXPIRY)
 
         return beatmapset_data
 
@@ -215,10 +484,8 @@ class OsuAPIClient(OsuAPIClientBase):
             **await self.get_auth_headers(access_token)
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+        response = await self.send(APIEndpoint.ME, url, headers=headers)
 
-        response.raise_for_status()
         return response.json()
 
     @rate_limit(RATE_LIMIT)
@@ -247,15 +514,38 @@ class OsuAPIClient(OsuAPIClientBase):
 
         url += self.format_query_parameters(query_parameters)
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+        response = await self.send(APIEndpoint.SCORES, url, headers=headers)
 
-        response.raise_for_status()
         return response.json()
 
-    @rate_limit(RATE_LIMIT)
+    async def iter_user_scores(self, user_id: int, score_type: ScoreType, since: datetime | None = None, page_size: int = SCORES_PAGE_SIZE, **kwargs) -> AsyncIterator[dict]:
+        offset = 0
+
+        while True:
+            scores = await self.get_user_scores(user_id, score_type, limit=page_size, offset=offset, **kwargs)
+
+            for score in scores:
+                if since is not None and parse_iso8601(score["created_at"]) <= since:
+                    # Recent scores come newest first, so the rest of them were already seen
+                    if score_type is ScoreType.RECENT:
+                        return
+
+                    continue
+
+                yield score
+
+            if len(scores) < page_size:
+                return
+
+            offset += page_size
+
     async def get_user(self, user_id: int, mode: Ruleset | None = None) -> dict:
-        url = APIEndpoint.USER.format(user=user_id, mode=mode)
+        return await self.get_or_fetch_cached(APIEndpoint.USER, self.cached_user_hash_name(user_id, mode), User, CACHED_USER_SOFT_EXPIRY, self.fetch_user, user_id, mode)
+
+    @single_flight(APIEndpoint.USER.name)
+    @rate_limit(RATE_LIMIT)
+    async def fetch_user(self, user_id: int, mode: Ruleset | None = None) -> dict:
+        url = APIEndpoint.USER.format(user=user_id, mode=mode.value if mode is not None else None)
 
         headers = {
             "Content-Type": "application/json",
@@ -263,8 +553,49 @@ class OsuAPIClient(OsuAPIClientBase):
             **await self.get_auth_headers()
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, headers=headers)
+        response = await self.send(APIEndpoint.USER, url, headers=headers)
 
-        response.raise_for_status()
-        return response.json()
+        user_data = response.json()
+
+        await self.set_cached(self.cached_user_hash_name(user_id, mode), User.model_validate(user_data), CACHED_USER_EXPIRY)
+
+        return user_data
+
+    async def get_users(self, user_ids: list[int]) -> dict[int, dict]:
+        return await self.get_or_fetch_cached_many(APIEndpoint.USERS, Namespace.CACHED_USER_COMPACT, user_ids, User, CACHED_USER_SOFT_EXPIRY, self.load_users_compact, self.load_user_compact)
+
+    async def load_users_compact(self, user_ids: list[int]) -> dict[int, dict]:
+        return await self._user_batcher.load_many(user_ids, self.fetch_users)
+
+    async def load_user_compact(self, user_id: int) -> dict | None:
+        return await self._user_batcher.load(user_id, self.fetch_users)
+
+    async def fetch_users(self, user_ids: list[int]) -> dict[int, dict]:
+        users_data = {}
+
+        for i in range(0, len(user_ids), BULK_LOOKUP_LIMIT):
+            users_data |= await self._fetch_users_chunk(user_ids[i:i + BULK_LOOKUP_LIMIT])
+
+        return users_data
+
+    @rate_limit(RATE_LIMIT)
+    async def _fetch_users_chunk(self, user_ids: list[int]) -> dict[int, dict]:
+        url = APIEndpoint.USERS.value
+
+        headers = {
+            "Content-Type": "application/json",
+            "Accept": "application/json",
+            **await self.get_auth_headers()
+        }
+
+        response = await self.send(APIEndpoint.USERS, url, headers=headers, params=[("ids[]", user_id) for user_id in user_ids])
+
+        users_data = {user_data["id"]: user_data for user_data in response.json()["users"]}
+
+        await self.set_cached_many(Namespace.CACHED_USER_COMPACT, User, users_data, CACHED_USER_EXPIRY)
+
+        return users_data
+
+    @staticmethod
+    def cached_user_hash_name(user_id: int, mode: Ruleset | None = None) -> str:
+        return Namespace.CACHED_USER.hash_name(user_id if mode is None else f"{user_id}:{mode.value}")
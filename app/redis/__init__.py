@@ -1,4 +1,8 @@
 from .rc import RedisClient, redis_connection
-from .enums import ChannelName, Namespace
-from .constants import LOCK_EXPIRY, CACHED_BEATMAP_EXPIRY, CACHED_BEATMAPSET_EXPIRY
-from .decorators import rate_limit
+from .enums import ChannelName, Namespace, RateLimitPriority, CircuitState
+from .constants import LOCK_EXPIRY, CACHED_BEATMAP_EXPIRY, CACHED_BEATMAP_SOFT_EXPIRY, CACHED_BEATMAPSET_EXPIRY, CACHED_BEATMAPSET_SOFT_EXPIRY, CACHED_USER_EXPIRY, CACHED_USER_SOFT_EXPIRY, FRESH_READ_MAX_AGE
+from .decorators import rate_limit, single_flight
+from .single_flight import SingleFlight, single_flight_stats
+from .lock import RedisLock, lock_stats
+from .circuit_breaker import CircuitBreaker, circuit_breaker_stats
+from .local_cache import local_cache, get_cache_stats, listen_for_invalidations
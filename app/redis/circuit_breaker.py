@@ -0,0 +1,95 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from .rc import RedisClient
+from .enums import Namespace, CircuitState
+from .constants import CIRCUIT_BREAKER_FAILURE_THRESHOLD, CIRCUIT_BREAKER_FAILURE_WINDOW, CIRCUIT_BREAKER_RECOVERY_TIMEOUT
+from app.exceptions import CircuitOpenError
+from app.logger import logger
+
+# Returns the seconds left until the next probe is allowed, or 0 if the call may proceed
+ALLOW_SCRIPT = """
+local recovery_timeout = tonumber(ARGV[1])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local breaker = redis.call("HMGET", KEYS[1], "state", "opened_at")
+local state = breaker[1] or "closed"
+local opened_at = tonumber(breaker[2]) or 0
+
+if state == "closed" then
+    return "0"
+end
+
+local remaining = opened_at + recovery_timeout - now
+
+if remaining > 0 then
+    return tostring(remaining)
+end
+
+-- Let a single probe through, and reopen the window for everyone else until it reports back
+redis.call("HSET", KEYS[1], "state", "half_open", "opened_at", tostring(now))
+return "0"
+"""
+
+FAILURE_SCRIPT = """
+local failure_threshold = tonumber(ARGV[1])
+local failure_window = tonumber(ARGV[2])
+local recovery_timeout = tonumber(ARGV[3])
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local state = redis.call("HGET", KEYS[1], "state") or "closed"
+local failures = redis.call("HINCRBY", KEYS[1], "failures", 1)
+
+if state == "half_open" or (state == "closed" and failures >= failure_threshold) then
+    redis.call("HSET", KEYS[1], "state", "open", "opened_at", tostring(now))
+    redis.call("EXPIRE", KEYS[1], math.ceil(recovery_timeout + failure_window))
+    return 1
+end
+
+if state == "closed" then
+    redis.call("EXPIRE", KEYS[1], failure_window)
+end
+
+return 0
+"""
+
+circuit_breaker_stats: dict[str, dict[str, int]] = defaultdict(lambda: {"successes": 0, "failures": 0, "rejected": 0, "opened": 0})
+
+
+class CircuitBreaker:
+    def __init__(self, rc: RedisClient, name: str, failure_threshold: int = CIRCUIT_BREAKER_FAILURE_THRESHOLD, failure_window: int = CIRCUIT_BREAKER_FAILURE_WINDOW, recovery_timeout: int = CIRCUIT_BREAKER_RECOVERY_TIMEOUT):
+        self.rc = rc
+        self.name = name
+        self.hash_name = Namespace.CIRCUIT_BREAKER.hash_name(name)
+        self.failure_threshold = failure_threshold
+        self.failure_window = failure_window
+        self.recovery_timeout = recovery_timeout
+
+        self._stats = circuit_breaker_stats[name]
+        self._allow_script = rc.register_script(ALLOW_SCRIPT)
+        self._failure_script = rc.register_script(FAILURE_SCRIPT)
+
+    async def before_call(self):
+        remaining = float(await self._allow_script(keys=[self.hash_name], args=[self.recovery_timeout]))
+
+        if remaining > 0:
+            self._stats["rejected"] += 1
+            raise CircuitOpenError(self.name, datetime.now() + timedelta(seconds=remaining))
+
+    async def record_success(self):
+        self._stats["successes"] += 1
+        await self.rc.delete(self.hash_name)
+
+    async def record_failure(self):
+        self._stats["failures"] += 1
+
+        if await self._failure_script(keys=[self.hash_name], args=[self.failure_threshold, self.failure_window, self.recovery_timeout]):
+            self._stats["opened"] += 1
+            logger.warning(f"[{self.__class__.__name__}] Circuit '{self.name}' opened, pausing calls for {self.recovery_timeout} seconds")
+
+    async def get_state(self) -> CircuitState:
+        return CircuitState(await self.rc.hget(self.hash_name, "state") or CircuitState.CLOSED.value)
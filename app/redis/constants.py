@@ -1,3 +1,20 @@
 LOCK_EXPIRY = 10
-CACHED_BEATMAP_EXPIRY = 3600
-CACHED_BEATMAPSET_EXPIRY = 3600
+LOCK_MAX_LEASE = 300
+CACHED_BEATMAP_EXPIRY = 86400
+CACHED_BEATMAP_SOFT_EXPIRY = 3600
+CACHED_BEATMAPSET_EXPIRY = 86400
+CACHED_BEATMAPSET_SOFT_EXPIRY = 3600
+CACHED_USER_EXPIRY = 86400
+CACHED_USER_SOFT_EXPIRY = 3600
+FRESH_READ_MAX_AGE = 60
+CACHE_REFRESH_LOCK_EXPIRY = 60
+LOCAL_CACHE_MAX_SIZE = 1024
+LOCAL_CACHE_TTL = 30
+CIRCUIT_BREAKER_FAILURE_THRESHOLD = 5
+CIRCUIT_BREAKER_FAILURE_WINDOW = 60
+CIRCUIT_BREAKER_RECOVERY_TIMEOUT = 30
+BACKGROUND_RESERVE_RATIO = 0.3
+SINGLE_FLIGHT_TIMEOUT = 30
+SINGLE_FLIGHT_RESULT_EXPIRY = 5
+CACHE_COMPRESSION_THRESHOLD = 512
+CACHE_COMPRESSION_LEVEL = 3
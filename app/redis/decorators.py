@@ -1,15 +1,36 @@
+import random
 import asyncio
 from typing import Callable, Any, Awaitable
 from functools import wraps
 from datetime import datetime, timedelta
 
 from .rc import RedisClient
-from .enums import Namespace
+from .enums import RateLimitPriority
+from .rate_limiter import TokenBucket
+from .single_flight import SingleFlight
 from app.logger import logger
 from app.exceptions import RateLimitExceeded
+from app.metrics import record_rate_limit_wait
 
+RATE_LIMIT_RETRY_JITTER = 0.05
 
-def rate_limit(limit_per_window: int, auto_retry: bool = True):
+
+def _resolve_rc(func: Callable, args: tuple) -> RedisClient:
+    obj = args[0] if args else None
+    rc: RedisClient | None = None
+
+    if obj and isinstance(obj, RedisClient):
+        rc = obj
+    elif obj and hasattr(obj, "rc"):
+        rc = getattr(obj, "rc")
+
+    if rc is None:
+        raise ValueError(f"First argument of '{func.__name__}' must be either an instance of {RedisClient.__name__} or an object that contains a {RedisClient.__name__} instance attribute named 'rc'")
+
+    return rc
+
+
+def rate_limit(limit_per_window: int, window: int = 60, burst: int = None, bucket_name: str = "default", auto_retry: bool = True, timeout: float = None):
     def decorator(func: Callable[..., Awaitable[Any]]):
         if not asyncio.iscoroutinefunction(func):
             raise ValueError(f"Function '{func.__name__}' must be async to use @rate_limit")
@@ -17,44 +38,53 @@ def rate_limit(limit_per_window: int, auto_retry: bool = True):
         @wraps(func)
         async def wrapper(*args, **kwargs) -> Awaitable[Any]:
             obj = args[0] if args else None
-            rc: RedisClient | None = None
+            rc = _resolve_rc(func, args)
+
+            priority: RateLimitPriority = getattr(obj, "priority", RateLimitPriority.INTERACTIVE)
+            timeout_ = getattr(obj, "rate_limit_timeout", None) or timeout
 
-            if obj and isinstance(obj, RedisClient):
-                rc = obj
-            elif obj and hasattr(obj, "rc"):
-                rc = getattr(obj, "rc")
+            loop = asyncio.get_running_loop()
+            start_time = loop.time()
+            deadline = start_time + timeout_ if timeout_ is not None else None
+            token_bucket = TokenBucket(rc, bucket_name, limit_per_window, window=window, burst=burst)
 
-            if rc is None:
-                raise ValueError(f"First argument of '{func.__name__}' must be either an instance of {RedisClient.__name__} or an object that contains a {RedisClient.__name__} instance attribute named 'rc'")
+            while (wait := await token_bucket.acquire(priority)) > 0:
+                next_token_at = datetime.now() + timedelta(seconds=wait)
 
-            async def sub_wrapper():
-                now = datetime.now()
-                window_start = now - timedelta(seconds=now.second, microseconds=now.microsecond)
-                window_end = window_start + timedelta(minutes=1)
-                window_delta_seconds = int((window_end - now).total_seconds() + 1)
-                counter_hash_name = Namespace.RATE_LIMIT_COUNTER.hash_name(int(window_start.timestamp()))
+                if not auto_retry or (deadline is not None and loop.time() + wait > deadline):
+                    record_rate_limit_wait(bucket_name, priority.name.lower(), loop.time() - start_time)
+                    raise RateLimitExceeded(next_token_at)
 
-                if (current_count := await rc.incr(counter_hash_name)) == 1:
-                    await rc.expire(counter_hash_name, window_delta_seconds)
+                func_repr = (
+                    f"{repr(func)}"
+                    f" ({", ".join(str(arg) for arg in args[1:])}"
+                    f"{", " if kwargs else ""}"
+                    f"{", ".join(["{}={}".format(key, value) for key, value in kwargs.items()])})"
+                )
 
-                if current_count > limit_per_window:
-                    if not auto_retry:
-                        raise RateLimitExceeded(window_end)
+                logger.info(f"Rate limited ({priority.name.lower()}): {func_repr}, retrying in {wait:.2f} seconds")
+                await asyncio.sleep(wait + random.uniform(0, RATE_LIMIT_RETRY_JITTER))
 
-                    func_repr = (
-                        f"{repr(func)}"
-                        f" ({", ".join(str(arg) for arg in args[1:])}"
-                        f"{", " if kwargs else ""}"
-                        f"{", ".join(["{}={}".format(key, value) for key, value in kwargs.items()])})"
-                    )
+            record_rate_limit_wait(bucket_name, priority.name.lower(), loop.time() - start_time)
 
-                    logger.info(f"Rate limited: {func_repr}, retrying in {window_delta_seconds} seconds")
-                    await asyncio.sleep(window_delta_seconds)
-                    return await sub_wrapper()
+            return await func(*args, **kwargs)
+
+        return wrapper
 
-                return await func(*args, **kwargs)
+    return decorator
+
+
+def single_flight(name: str):
+    def decorator(func: Callable[..., Awaitable[Any]]):
+        if not asyncio.iscoroutinefunction(func):
+            raise ValueError(f"Function '{func.__name__}' must be async to use @single_flight")
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> Awaitable[Any]:
+            rc = _resolve_rc(func, args)
+            key = ":".join([name, *(str(arg) for arg in args[1:]), *(f"{key}={value}" for key, value in sorted(kwargs.items()))])
 
-            return await sub_wrapper()
+            return await SingleFlight(rc).do(key, lambda: func(*args, **kwargs))
 
         return wrapper
 
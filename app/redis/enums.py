@@ -1,21 +1,52 @@
 from enum import Enum
 
+from .constants import BACKGROUND_RESERVE_RATIO
+
 
 class ChannelName(Enum):
     SCORE_FETCHER_TASKS = "score_fetcher_tasks"
     PROFILE_FETCHER_TASKS = "profile_fetcher_tasks"
     QUEUE_REQUEST_HANDLER_TASKS = "queue_request_handler_tasks"
+    SINGLE_FLIGHT = "single_flight"
+    CACHE_INVALIDATION = "cache_invalidation"
+    LOCK_RELEASED = "lock_released"
+
+    def subchannel(self, suffix: int | str) -> str:
+        return f"{self.value}:{suffix}"
 
 
 class Namespace(Enum):
     LOCK = "lock"
-    RATE_LIMIT_COUNTER = "rate_limit_counter"
+    RATE_LIMIT_BUCKET = "rate_limit_bucket"
     OSU_CLIENT_OAUTH_TOKEN = "osu_client_oauth_token"
     OSU_USER_PROFILE = "osu_user_profile"
     CSRF_STATE = "csrf_state"
     QUEUE_REQUEST_HANDLER_TASK = "queue_request_handler_task"
     CACHED_BEATMAP = "cached_beatmap"
     CACHED_BEATMAPSET = "cached_beatmapset"
+    CACHED_USER = "cached_user"
+    CACHED_USER_COMPACT = "cached_user_compact"
+    CACHE_REFRESH = "cache_refresh"
+    CIRCUIT_BREAKER = "circuit_breaker"
+    SINGLE_FLIGHT_RESULT = "single_flight_result"
+    SCORE_WATERMARK = "score_watermark"
+    BEATMAPSET_ZIP = "beatmapset_zip"
+    BEATMAPSET_SNAPSHOT_INDEX = "beatmapset_snapshot_index"
 
     def hash_name(self, suffix: int | str) -> str:
         return f"{self.value}:{suffix}"
+
+
+class RateLimitPriority(Enum):
+    INTERACTIVE = 0
+    BACKGROUND = 1
+
+    @property
+    def reserve_ratio(self) -> float:
+        return 0.0 if self is RateLimitPriority.INTERACTIVE else BACKGROUND_RESERVE_RATIO
+
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
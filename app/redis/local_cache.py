@@ -0,0 +1,101 @@
+import json
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .rc import RedisClient
+from .enums import ChannelName
+from .constants import LOCAL_CACHE_MAX_SIZE, LOCAL_CACHE_TTL
+from app.utils import generate_uuid
+from app.logger import logger
+
+INSTANCE_ID = generate_uuid()
+
+cache_stats: dict[str, dict[str, int]] = {
+    "local": {"hits": 0, "misses": 0},
+    "redis": {"hits": 0, "misses": 0}
+}
+
+
+class LocalCache:
+    def __init__(self, max_size: int = LOCAL_CACHE_MAX_SIZE, ttl: float = LOCAL_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Any | None:
+        if (entry := self._entries.get(key)) is None:
+            cache_stats["local"]["misses"] += 1
+            return None
+
+        expires_at, value = entry
+
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            cache_stats["local"]["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        cache_stats["local"]["hits"] += 1
+
+        return value
+
+    def set(self, key: str, value: Any):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+
+local_cache = LocalCache()
+
+
+def get_cache_stats() -> dict[str, dict[str, int | float]]:
+    stats = {}
+
+    for tier, counts in cache_stats.items():
+        lookups = counts["hits"] + counts["misses"]
+        stats[tier] = {**counts, "hit_ratio": counts["hits"] / lookups if lookups else 0.0}
+
+    stats["local"]["size"] = len(local_cache)
+
+    return stats
+
+
+async def publish_invalidation(rc: RedisClient, *keys: str):
+    if keys:
+        await rc.publish(ChannelName.CACHE_INVALIDATION.value, json.dumps({"origin": INSTANCE_ID, "keys": keys}))
+
+
+async def listen_for_invalidations(rc: RedisClient):
+    pubsub = rc.pubsub()
+
+    try:
+        await pubsub.subscribe(ChannelName.CACHE_INVALIDATION.value)
+        logger.info(f"[{LocalCache.__name__}] Listening for invalidations on '{ChannelName.CACHE_INVALIDATION.value}'")
+
+        async for message in pubsub.listen():
+            if message["type"] != "message":
+                continue
+
+            try:
+                invalidation = json.loads(message["data"])
+            except json.JSONDecodeError:
+                continue
+
+            if invalidation.get("origin") != INSTANCE_ID:
+                local_cache.delete(*invalidation.get("keys", []))
+    finally:
+        await pubsub.aclose()
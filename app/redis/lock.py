@@ -0,0 +1,150 @@
+import asyncio
+from collections import defaultdict
+
+from .rc import RedisClient
+from .enums import ChannelName, Namespace
+from .constants import LOCK_EXPIRY, LOCK_MAX_LEASE
+from app.utils import generate_uuid
+from app.logger import logger
+
+RELEASE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    redis.call("DEL", KEYS[1])
+    redis.call("PUBLISH", ARGV[2], ARGV[1])
+    return 1
+end
+
+return 0
+"""
+
+RENEW_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+
+return 0
+"""
+
+lock_stats: dict[str, dict[str, int | float]] = defaultdict(lambda: {"acquired": 0, "contended": 0, "timeouts": 0, "lost": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0})
+
+
+class RedisLock:
+    def __init__(self, rc: RedisClient, name: str, expiry: float = LOCK_EXPIRY, auto_renew: bool = True, max_lease: float | None = LOCK_MAX_LEASE):
+        self.rc = rc
+        self.name = name
+        self.hash_name = Namespace.LOCK.hash_name(name)
+        self.channel_name = ChannelName.LOCK_RELEASED.subchannel(name)
+        self.expiry = expiry
+        self.auto_renew = auto_renew
+        self.max_lease = max_lease
+        self.token: str | None = None
+
+        self._stats = lock_stats[name.split(":", 1)[0]]
+        self._renew_task: asyncio.Task | None = None
+        self._release_script = rc.register_script(RELEASE_SCRIPT)
+        self._renew_script = rc.register_script(RENEW_SCRIPT)
+
+    async def __aenter__(self) -> "RedisLock":
+        if not await self.acquire():
+            raise TimeoutError(f"Timed out waiting for lock '{self.name}'")
+
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.release()
+
+    @property
+    def locked(self) -> bool:
+        return self.token is not None
+
+    async def acquire(self, blocking: bool = True, timeout: float = None) -> bool:
+        loop = asyncio.get_running_loop()
+        start_time = loop.time()
+        token = generate_uuid()
+
+        if await self._try_acquire(token):
+            self._on_acquired(token, 0.0)
+            return True
+
+        self._stats["contended"] += 1
+
+        if not blocking:
+            return False
+
+        deadline = start_time + timeout if timeout is not None else None
+        pubsub = self.rc.pubsub()
+
+        try:
+            await pubsub.subscribe(self.channel_name)
+
+            while True:
+                if await self._try_acquire(token):
+                    self._on_acquired(token, loop.time() - start_time)
+                    return True
+
+                # Wake on release, or when the current lease would expire without one
+                ttl = await self.rc.pttl(self.hash_name)
+                wait = self.expiry if ttl == -1 else max(ttl, 0) / 1000
+
+                if deadline is not None:
+                    if (remaining := deadline - loop.time()) <= 0:
+                        self._stats["timeouts"] += 1
+                        return False
+
+                    wait = min(wait, remaining)
+
+                await pubsub.get_message(ignore_subscribe_messages=True, timeout=wait)
+        finally:
+            await pubsub.aclose()
+
+    async def release(self) -> bool:
+        if self.token is None:
+            return False
+
+        token, self.token = self.token, None
+
+        if self._renew_task is not None:
+            self._renew_task.cancel()
+            self._renew_task = None
+
+        released = await self._release_script(keys=[self.hash_name], args=[token, self.channel_name])
+
+        if not released:
+            logger.warning(f"[{self.__class__.__name__}] Lock '{self.name}' expired before it was released")
+
+        return bool(released)
+
+    async def renew(self) -> bool:
+        if self.token is None:
+            return False
+
+        return bool(await self._renew_script(keys=[self.hash_name], args=[self.token, int(self.expiry * 1000)]))
+
+    async def _try_acquire(self, token: str) -> bool:
+        return bool(await self.rc.set(self.hash_name, token, px=int(self.expiry * 1000), nx=True))
+
+    def _on_acquired(self, token: str, wait_time: float):
+        self.token = token
+        self._stats["acquired"] += 1
+        self._stats["wait_seconds_total"] += wait_time
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], wait_time)
+
+        if self.auto_renew:
+            self._renew_task = asyncio.create_task(self._renew_periodically(token), name=f"Lock Renewal Task ({self.name})")
+
+    async def _renew_periodically(self, token: str):
+        loop = asyncio.get_running_loop()
+        # A holder stuck past the max lease stops being renewed, so its lock expires instead of being held forever
+        deadline = loop.time() + self.max_lease if self.max_lease is not None else None
+
+        while self.token == token:
+            await asyncio.sleep(self.expiry / 3)
+
+            if deadline is not None and loop.time() + self.expiry > deadline:
+                logger.warning(f"[{self.__class__.__name__}] Lock '{self.name}' reached its max lease of {self.max_lease} seconds, no longer renewing it")
+                return
+
+            if self.token == token and not await self.renew():
+                self._stats["lost"] += 1
+                logger.warning(f"[{self.__class__.__name__}] Lost lock '{self.name}' before renewal")
+                return
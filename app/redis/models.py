@@ -1,16 +1,71 @@
-from typing import Optional, Any
+import time
+import struct
+from typing import Optional, Any, ClassVar, Self
 from datetime import datetime
 from ast import literal_eval
 
-from pydantic import BaseModel, computed_field
+import zstandard
+from pydantic import BaseModel, ConfigDict, PrivateAttr, computed_field
+
+from .constants import CACHE_COMPRESSION_THRESHOLD, CACHE_COMPRESSION_LEVEL
+from app.exceptions import StaleCacheError
 
 __all__ = [
+    "CachedModel",
     "OsuClientOAuthToken",
     "QueueRequestHandlerTask",
     "Beatmap",
-    "Beatmapset"
+    "Beatmapset",
+    "User"
 ]
 
+CACHE_HEADER = struct.Struct(">BBI")
+FLAG_ZSTD = 0x01
+
+_compressor = zstandard.ZstdCompressor(level=CACHE_COMPRESSION_LEVEL)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+class CachedModel(BaseModel):
+    CACHE_SCHEMA_VERSION: ClassVar[int] = 2
+
+    _cached_at: int | None = PrivateAttr(default=None)
+
+    @property
+    def cache_age(self) -> float:
+        return time.time() - self._cached_at if self._cached_at is not None else 0.0
+
+    def to_bytes(self) -> bytes:
+        payload = self.model_dump_json().encode()
+        flags = 0
+
+        if len(payload) >= CACHE_COMPRESSION_THRESHOLD:
+            payload = _compressor.compress(payload)
+            flags |= FLAG_ZSTD
+
+        return CACHE_HEADER.pack(self.CACHE_SCHEMA_VERSION, flags, int(time.time())) + payload
+
+    @classmethod
+    def from_bytes(cls, data: bytes | bytearray | memoryview) -> Self:
+        if not data or data[0] != cls.CACHE_SCHEMA_VERSION or len(data) < CACHE_HEADER.size:
+            raise StaleCacheError(cls.__name__, data[0] if data else None)
+
+        _, flags, cached_at = CACHE_HEADER.unpack_from(data)
+
+        # model_validate_json can't decode a memoryview, so copy out the payload whatever buffer it came in
+        payload = bytes(data[CACHE_HEADER.size:])
+
+        if flags & FLAG_ZSTD:
+            try:
+                payload = _decompressor.decompress(payload)
+            except zstandard.ZstdError as e:
+                raise ValueError(f"Corrupt compressed {cls.__name__} cache entry: {e}") from e
+
+        model = cls.model_validate_json(payload)
+        model._cached_at = cached_at
+
+        return model
+
 
 class OsuClientOAuthToken(BaseModel):
     access_token: str
@@ -84,7 +139,7 @@ class QueueRequestHandlerTask(BaseModel):
         return cls.model_validate(deserialized_dict)
 
 
-class Beatmap(BaseModel):
+class Beatmap(CachedModel):
     id: int
     user_id: int
     accuracy: float
@@ -113,39 +168,8 @@ class Beatmap(BaseModel):
     url: str
     version: str
 
-    def serialize(self) -> dict[str, str]:
-        serialized_dict = {}
-
-        for key, value in self.__dict__.items():
-            match key:
-                case "deleted_at" | "last_updated":
-                    value = value.isoformat() if value is not None else ""
-
-            serialized_dict[key] = str(value) if value is not None else ""
-
-        return serialized_dict
-
-    @classmethod
-    def deserialize(cls, serialized_dict: dict[str, str]) -> "Beatmap":
-        deserialized_dict = {}
 
-        for key, value in serialized_dict.items():
-            match key:
-                case "id" | "beatmap_id" | "user_id" | "snapshot_number" | "count_circles" | "count_sliders" | "count_spinners" | "hit_length" | "max_combo" | "mode_int" | "passcount" | "playcount" | "ranked" | "total_length":
-                    value = int(value)
-                case "accuracy" | "ar" | "bpm" | "cs" | "difficulty_rating" | "drain":
-                    value = float(value)
-                case "failtimes" | "owners":
-                    value = literal_eval(value)
-                case "deleted_at" | "last_updated":
-                    value = datetime.fromisoformat(value) if value else None
-
-            deserialized_dict[key] = value
-
-        return cls.model_validate(deserialized_dict)
-
-
-class Beatmapset(BaseModel):
+class Beatmapset(CachedModel):
     id: int
     user_id: int
     artist: str
@@ -175,35 +199,9 @@ class Beatmapset(BaseModel):
     video: bool
     beatmaps: list["Beatmap"]
 
-    def serialize(self) -> dict[str, str]:
-        serialized_dict = {}
 
-        for key, value in self.__dict__.items():
-            match key:
-                case "beatmaps":
-                    value = [beatmap_cache.serialize() for beatmap_cache in value]
+class User(CachedModel):
+    model_config = ConfigDict(extra="allow")
 
-            serialized_dict[key] = str(value) if value is not None else ""
-
-        return serialized_dict
-
-    @classmethod
-    def deserialize(cls, serialized_dict: dict[str, str]) -> "Beatmapset":
-        deserialized_dict = {}
-
-        for key, value in serialized_dict.items():
-            match key:
-                case "id" | "user_id" | "snapshot_number" | "favourite_count" | "offset" | "play_count" | "ranked" | "track_id":
-                    value = int(value) if value else None
-                case "verified" | "nsfw" | "video":
-                    value = literal_eval(value.capitalize())
-                case "availability" | "covers" | "genre" | "hype" | "language" | "user":
-                    value = literal_eval(value) if value else None
-                case "deleted_at" | "last_updated" | "submitted_date":
-                    value = datetime.fromisoformat(value) if value else None
-                case "beatmaps":
-                    value = [Beatmap.deserialize(beatmap_cache) for beatmap_cache in literal_eval(value)]
-
-            deserialized_dict[key] = value
-
-        return cls.model_validate(deserialized_dict)
+    id: int
+    username: str
@@ -0,0 +1,50 @@
+from .rc import RedisClient
+from .enums import Namespace, RateLimitPriority
+
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[4])
+local reserve = math.max(0, math.min(tonumber(ARGV[3]), capacity - requested))
+
+local time = redis.call("TIME")
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+
+local bucket = redis.call("HMGET", KEYS[1], "tokens", "updated_at")
+local tokens = tonumber(bucket[1]) or capacity
+local updated_at = tonumber(bucket[2]) or now
+
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+
+local wait = 0
+
+if tokens - requested >= reserve then
+    tokens = tokens - requested
+else
+    wait = (requested + reserve - tokens) / refill_rate
+end
+
+redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+redis.call("EXPIRE", KEYS[1], math.ceil(capacity / refill_rate) + 1)
+
+return tostring(wait)
+"""
+
+
+class TokenBucket:
+    def __init__(self, rc: RedisClient, name: str, limit_per_window: int, window: int = 60, burst: int = None):
+        if limit_per_window <= 0 or window <= 0:
+            raise ValueError("limit_per_window and window must be positive")
+
+        self.rc = rc
+        self.hash_name = Namespace.RATE_LIMIT_BUCKET.hash_name(name)
+        self.capacity = burst if burst is not None else max(1, limit_per_window // 6)
+        self.refill_rate = limit_per_window / window
+
+        self._script = rc.register_script(TOKEN_BUCKET_SCRIPT)
+
+    async def acquire(self, priority: RateLimitPriority = RateLimitPriority.INTERACTIVE, tokens: int = 1) -> float:
+        reserve = self.capacity * priority.reserve_ratio
+        wait = await self._script(keys=[self.hash_name], args=[self.capacity, self.refill_rate, reserve, tokens])
+
+        return float(wait)
@@ -30,6 +30,15 @@ class RedisClient(AsyncRedis):
 
         return keys
 
+    async def get_bytes(self, name: str) -> bytes | None:
+        return await self.execute_command("GET", name, NEVER_DECODE=True)
+
+    async def mget_bytes(self, names: list[str]) -> list[bytes | None]:
+        if not names:
+            return []
+
+        return await self.execute_command("MGET", *names, NEVER_DECODE=True)
+
 
 @contextmanager
 def redis_connection():
@@ -0,0 +1,98 @@
+import copy
+import json
+import asyncio
+from typing import Callable, Any, Awaitable
+
+from .rc import RedisClient
+from .enums import ChannelName, Namespace
+from .constants import SINGLE_FLIGHT_TIMEOUT, SINGLE_FLIGHT_RESULT_EXPIRY
+from .lock import RedisLock
+from app.logger import logger
+
+FAILED_SENTINEL = ""
+
+single_flight_stats: dict[str, int] = {"hits": 0, "misses": 0, "coalesced": 0}
+_in_flight: dict[str, asyncio.Future] = {}
+
+
+class SingleFlight:
+    def __init__(self, rc: RedisClient):
+        self.rc = rc
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        while (future := _in_flight.get(key)) is not None:
+            single_flight_stats["coalesced"] += 1
+
+            try:
+                # Every caller gets its own copy, so one changing its result doesn't change the others'
+                return copy.deepcopy(await asyncio.shield(future))
+            except asyncio.CancelledError:
+                if not future.cancelled() or asyncio.current_task().cancelling():
+                    raise
+
+        future = asyncio.get_running_loop().create_future()
+        _in_flight[key] = future
+
+        try:
+            result = await self._do_shared(key, func)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            _in_flight.pop(key, None)
+
+    async def _do_shared(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        lock = RedisLock(self.rc, Namespace.SINGLE_FLIGHT_RESULT.hash_name(key), expiry=SINGLE_FLIGHT_TIMEOUT, auto_renew=False)
+        result_hash_name = Namespace.SINGLE_FLIGHT_RESULT.hash_name(key)
+        channel_name = ChannelName.SINGLE_FLIGHT.subchannel(key)
+
+        if await lock.acquire(blocking=False):
+            single_flight_stats["misses"] += 1
+
+            try:
+                result = await func()
+            except BaseException:
+                await self.rc.publish(channel_name, FAILED_SENTINEL)
+                await lock.release()
+                raise
+
+            serialized_result = json.dumps(result)
+            await self.rc.set(result_hash_name, serialized_result, ex=SINGLE_FLIGHT_RESULT_EXPIRY)
+            await self.rc.publish(channel_name, serialized_result)
+            await lock.release()
+
+            return result
+
+        if (serialized_result := await self._wait_for_result(result_hash_name, channel_name)) is not None:
+            single_flight_stats["hits"] += 1
+            return json.loads(serialized_result)
+
+        single_flight_stats["misses"] += 1
+        return await func()
+
+    async def _wait_for_result(self, result_hash_name: str, channel_name: str) -> str | None:
+        pubsub = self.rc.pubsub()
+
+        try:
+            await pubsub.subscribe(channel_name)
+
+            if serialized_result := await self.rc.get(result_hash_name):
+                return serialized_result
+
+            async with asyncio.timeout(SINGLE_FLIGHT_TIMEOUT):
+                async for message in pubsub.listen():
+                    if message["type"] == "message":
+                        return message["data"] or None
+        except TimeoutError:
+            logger.warning(f"Timed out waiting for single-flight result on '{channel_name}'")
+        finally:
+            await pubsub.aclose()
+
+        return None
@@ -0,0 +1,59 @@
+import json
+import base64
+import binascii
+from datetime import datetime
+from typing import Any
+
+# Sort keys are plain JSON apart from datetimes, which are tagged so they decode back into something Postgres can compare against
+DATETIME_TAG = "$dt"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+
+    return value
+
+
+def _decode_value(value: Any, python_type: type | None) -> Any:
+    if isinstance(value, dict):
+        if set(value) != {DATETIME_TAG} or not isinstance(value[DATETIME_TAG], str):
+            raise ValueError("Invalid cursor")
+
+        value = datetime.fromisoformat(value[DATETIME_TAG])
+
+    # Values are checked against their sort key's type, so a tampered cursor is rejected here rather than by the database
+    if value is None or python_type is None:
+        return value
+
+    if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+
+    if not isinstance(value, python_type) or (isinstance(value, bool) and python_type is not bool):
+        raise ValueError("Invalid cursor")
+
+    return value
+
+
+def encode_cursor(signature: list[str], values: list[Any]) -> str:
+    """Packs the sort key values of a page's last row into an opaque, URL-safe token"""
+    payload = json.dumps({"s": signature, "v": [_encode_value(value) for value in values]}, separators=(",", ":"))
+
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, signature: list[str], python_types: list[type | None]) -> list[Any]:
+    """Unpacks a token from encode_cursor, rejecting it unless it was issued for the same sorting and its values fit the sort keys"""
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        cursor_signature, values = payload["s"], payload["v"]
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+    if cursor_signature != signature:
+        raise ValueError("Cursor does not match the requested sorting")
+
+    if not isinstance(values, list) or len(values) != len(signature):
+        raise ValueError("Invalid cursor")
+
+    return [_decode_value(value, python_type) for value, python_type in zip(values, python_types)]
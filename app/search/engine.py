@@ -1,30 +1,32 @@
 import json
-from typing import Literal, AsyncGenerator, Generator
+from typing import Literal, AsyncGenerator, Generator, Any
 
-from sqlalchemy.sql import select, and_
+from sqlalchemy.sql import select, and_, or_, false, bindparam
+from sqlalchemy.sql.sqltypes import Integer
 from sqlalchemy.sql.selectable import Select
-from sqlalchemy.sql.elements import ColumnClause, BinaryExpression
+from sqlalchemy.sql.elements import ColumnClause, ColumnElement, BinaryExpression, BindParameter
 from sqlalchemy.sql.expression import CTE
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 from sqlalchemy.orm.strategy_options import joinedload, noload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects import postgresql
 
-from app.database.models import Profile, BeatmapSnapshot, BeatmapsetSnapshot, BeatmapsetListing, Queue, Request, ModelClass
+from app.database.models import Profile, BeatmapSnapshot, BeatmapsetSnapshot, BeatmapsetListing, BeatmapsetListingSortKeys, Queue, Request, ModelClass
 from app.database.utils import validate_column_value, get_filter_condition
 from app.database.ctes.hashable_cte import HashableCTE
-from app.database.ctes.bm_ss.sorting import bm_ss_sorting_cte_factory
-from app.database.ctes.search_filter import search_filter_cte_factory
+from app.database.ctes.search_filter import search_filter_cte_factory, search_filter_params
 from app.database.ctes.bm_ss.filtering import bm_ss_filtering_cte_factory
-from app.database.ctes.profile.sorting import profile_sorting_cte_factory
 from app.database.ctes.profile.filtering import profile_filtering_cte_factory
 from app.database.ctes.request.sorting import request_sorting_cte_factory
 from app.database.ctes.request.filtering import request_filtering_cte_factory
 from app.exceptions import TypeValidationError
 from .enums import FilterName, SortOrder, FilterOperator, AdvancedFilterField, SortingField
+from .cursor import encode_cursor, decode_cursor
+from .query_template import QueryTemplate, SortKey, query_templates
 
 PaginatedResultsGenerator = AsyncGenerator[list[BeatmapsetListing], AsyncSession]
 FilterDict = dict[str, dict]
+FilterCondition = tuple[FilterName, str, str | None, FilterOperator, Any]
 
 
 class SearchEngine:
@@ -36,9 +38,15 @@ class SearchEngine:
         self._queue_id: int | None = None
         self._limit: int = 50
         self._offset: int = 0
+        self._cursor_values: list | None = None
         self._requests_only: bool = False
+        self._sort_keys: list[SortKey] = []
+        self._listing_sort_keys_joined: bool = False
+        self._params: dict[str, Any] = {}
+        self._template: QueryTemplate | None = None
 
         self.query: Select | None = None
+        self.next_cursor: str | None = None
 
     def search(
         self,
@@ -53,8 +61,12 @@ class SearchEngine:
         queue_id: int = None,
         limit: int = None,
         offset: int = None,
+        cursor: str = None,
         requests_only: bool = False
     ) -> PaginatedResultsGenerator:
+        if cursor and offset:
+            raise ValueError("cursor and offset can't be used together")
+
         if search_query:
             self.search_query = search_query
         if sorting:
@@ -80,23 +92,83 @@ class SearchEngine:
 
         self.compose_query()
 
+        if cursor:
+            self._cursor_values = decode_cursor(cursor, self._cursor_signature, self._cursor_python_types)
+
         return self.results_generator(session)
 
     async def results_generator(self, session: AsyncSession) -> PaginatedResultsGenerator:
+        # Pages by keyset unless an offset was asked for, so every page costs the same as the first
+        num_entities = 1 if not self._requests_only else 2
+
         while True:
-            page_query = self.query.limit(self._limit).offset(self._offset)
+            page_query = self.query
+            params = {**self._params, "page_limit": self._limit, "page_offset": self._offset}
 
-            result = await session.execute(page_query)
-            results = result.scalars().all() if not self._requests_only else result.all()
+            if not self._offset and self._cursor_values is not None:
+                page_query = self._keyset_query(self._cursor_values)
+                params.update({f"cursor_{idx}": value for idx, value in enumerate(self._cursor_values) if value is not None})
 
-            if not results:
+            result = await session.execute(page_query, params)
+            rows = result.all()
+
+            if not rows:
+                self.next_cursor = None
                 break
 
+            results = [row[0] for row in rows] if not self._requests_only else [tuple(row[:num_entities]) for row in rows]
+
+            # A short page is the last one, so there's nothing to continue from
+            self._cursor_values = list(rows[-1][num_entities:])
+            self.next_cursor = encode_cursor(self._cursor_signature, self._cursor_values) if len(rows) == self._limit else None
+
             yield results
 
-            self._offset += self._limit
+            if self.next_cursor is None:
+                break
+
+            if self._offset:
+                self._offset += self._limit
 
     def compose_query(self):
+        # Requests of the same shape share one query template, and only differ in the values bound to it
+        filter_conditions = [
+            (filter_name, *condition)
+            for filter_name, filter_ in self._filters.items() if filter_
+            for condition in self._normalize_filter(filter_, filter_name.value)
+        ]
+        search_params = search_filter_params(self.search_query) if self.search_query else {}
+        sort_orders = [self.sort_orders[idx] if idx < len(self.sort_orders) else SortOrder.ASCENDING for idx in range(len(self.sorting))]
+
+        shape = (
+            self._requests_only,
+            tuple(zip(self.sorting, sort_orders)),
+            tuple(search_params),
+            bool(self.queue_id),
+            tuple((filter_name, field, func_str, filter_operator, value is None) for filter_name, field, func_str, filter_operator, value in filter_conditions)
+        )
+
+        self._params = {**search_params}
+
+        if self.queue_id:
+            self._params["queue_id"] = self.queue_id
+
+        for idx, (*_, value) in enumerate(filter_conditions):
+            if value is not None:
+                self._params[f"filter_{idx}"] = value
+
+        if (template := query_templates.get(shape)) is None:
+            template = self._compose_template(sort_orders, filter_conditions)
+            query_templates.set(shape, template)
+
+        self._template = template
+        self._sort_keys = template.sort_keys
+        self.query = template.query
+
+    def _compose_template(self, sort_orders: list[SortOrder], filter_conditions: list[FilterCondition]) -> QueryTemplate:
+        self._sort_keys = []
+        self._listing_sort_keys_joined = False
+
         if not self._requests_only:
             self.query = (
                 select(BeatmapsetListing)
@@ -141,19 +213,28 @@ class SearchEngine:
             )
         )
 
-        for idx, sorting_field in enumerate(self.sorting):
-            try:
-                sort_order = self.sort_orders[idx]
-            except IndexError:
-                sort_order = SortOrder.ASCENDING
-
+        for sorting_field, sort_order in zip(self.sorting, sort_orders):
             self._apply_sorting(sorting_field, sort_order)
 
+        if self.search_query:
+            cte = search_filter_cte_factory(self.search_query)
+
+            self.query = self.query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+            self._add_sort_key("relevance", cte.c.relevance, SortOrder.DESCENDING)
+
+        # Unique tiebreakers, so the order is total and a cursor points at exactly one row
+        self._add_sort_key("beatmapset_snapshot.id", BeatmapsetSnapshot.id, SortOrder.ASCENDING)
+
+        if self._requests_only:
+            self._add_sort_key("request.id", Request.id, SortOrder.ASCENDING)
+
+        self.query = self.query.add_columns(*(key.label(f"sort_key_{idx}") for idx, (_, key, _) in enumerate(self._sort_keys)))
+
         if self.queue_id:
             request_cte = (
                 select(Request.id, Request.beatmapset_id)
                 .join(Queue, Queue.id == Request.queue_id)
-                .where(Queue.id == self.queue_id)
+                .where(Queue.id == bindparam("queue_id", self.queue_id))
                 .cte("request_cte")
             )
 
@@ -162,16 +243,20 @@ class SearchEngine:
             else:
                 self.query = self.query.join(request_cte, request_cte.c.id == Request.id)
 
-        if self.search_query:
-            cte = search_filter_cte_factory(self.search_query)
+        # Conditions on the same field (and function) share one join, as they did in the filter dicts
+        grouped_conditions: dict[tuple[FilterName, str, str | None], list[tuple[FilterOperator, BindParameter | None]]] = {}
 
-            self.query = self.query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+        for idx, (filter_name, field, func_str, filter_operator, value) in enumerate(filter_conditions):
+            column = getattr(filter_name.value.value, field)
+            value_param = bindparam(f"filter_{idx}", type_=column.type if isinstance(column, InstrumentedAttribute) else None) if value is not None else None
+            grouped_conditions.setdefault((filter_name, field, func_str), []).append((filter_operator, value_param))
+
+        for (filter_name, field, func_str), conditions in grouped_conditions.items():
+            self._apply_filter(filter_name.value, field, func_str, conditions)
 
-        for filter_name, filter_ in self._filters.items():
-            if not filter_:
-                continue
+        page_query = self.query.limit(bindparam("page_limit", type_=Integer)).offset(bindparam("page_offset", type_=Integer))
 
-            self._apply_filter(self._filters[filter_name], filter_name.value)
+        return QueryTemplate(page_query, self._sort_keys)
 
     @staticmethod
     def _load_sorting(sorting: list[str]) -> list[SortingField]:
@@ -188,25 +273,30 @@ class SearchEngine:
 
     def _apply_sorting(self, sorting_field: SortingField, sort_order: SortOrder):
         def apply_cte(rows_ranked: bool = True):
-            self.query = (
-                self.query
-                .join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
-                .order_by(sort_order.sort_func(cte.c.target))
-            )
+            self.query = self.query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
+            self._add_sort_key(sorting_field.name.lower(), cte.c.target, sort_order)
 
             if rows_ranked:
                 self.query = self.query.where(cte.c.rank == 1)
 
+        def apply_listing_sort_key(column_name: str):
+            if not self._listing_sort_keys_joined:
+                self.query = self.query.join(BeatmapsetListingSortKeys, BeatmapsetListingSortKeys.beatmapset_listing_id == BeatmapsetListing.id)
+                self._listing_sort_keys_joined = True
+
+            self._add_sort_key(sorting_field.name.lower(), getattr(BeatmapsetListingSortKeys, column_name), sort_order)
+
+        field_name = sorting_field.name.split("__", 1)[1].lower()
+
         match sorting_field.model_class:
             case ModelClass.PROFILE:
-                cte = profile_sorting_cte_factory(sorting_field.value, sort_order)
-                apply_cte()
+                apply_listing_sort_key(f"mapper_{field_name}")
             case ModelClass.BEATMAP_SNAPSHOT:
-                cte = bm_ss_sorting_cte_factory(sorting_field.value, sort_order)
-                apply_cte()
+                # A set sorts by its lowest difficulty ascending and by its highest descending
+                apply_listing_sort_key(f"{"min" if sort_order is SortOrder.ASCENDING else "max"}_{field_name}")
             case ModelClass.BEATMAPSET_SNAPSHOT:
                 if isinstance(sorting_field.value, InstrumentedAttribute):
-                    self.query = self.query.order_by(sort_order.sort_func(sorting_field.value))
+                    self._add_sort_key(sorting_field.name.lower(), sorting_field.value, sort_order)
                 elif isinstance(sorting_field.value, HashableCTE):
                     cte = sorting_field.value.cte
                     cte = cte.alias("sorting_" + cte.name)
@@ -215,6 +305,55 @@ class SearchEngine:
                 cte = request_sorting_cte_factory(sorting_field.value, sort_order)
                 apply_cte()
 
+    def _add_sort_key(self, name: str, key: ColumnElement, sort_order: SortOrder):
+        self.query = self.query.order_by(sort_order.sort_func(key))
+        self._sort_keys.append((name, key, sort_order))
+
+    def _keyset_query(self, values: list) -> Select:
+        # A null cursor value changes the condition's shape rather than its bound value, so those get their own query
+        nulls = tuple(value is None for value in values)
+
+        if (keyset_query := self._template.keyset_queries.get(nulls)) is None:
+            keyset_query = self._template.keyset_queries[nulls] = self.query.where(self._keyset_condition(nulls))
+
+        return keyset_query
+
+    def _keyset_condition(self, nulls: tuple[bool, ...]) -> ColumnElement:
+        # Rows strictly after the cursor: (k1 after v1) OR (k1 = v1 AND k2 after v2) OR ...
+        # Postgres sorts NULLs last ascending and first descending, so "after" has to account for them per key
+        clauses = []
+        equalities = []
+
+        for idx, ((_, key, sort_order), is_null) in enumerate(zip(self._sort_keys, nulls)):
+            if is_null:
+                after = key.is_not(None) if sort_order is SortOrder.DESCENDING else false()
+                equal = key.is_(None)
+            else:
+                value = bindparam(f"cursor_{idx}", type_=key.type)
+                after = or_(key > value, key.is_(None)) if sort_order is SortOrder.ASCENDING else key < value
+                equal = key == value
+
+            clauses.append(and_(*equalities, after))
+            equalities.append(equal)
+
+        return or_(*clauses)
+
+    @property
+    def _cursor_signature(self) -> list[str]:
+        return [f"{name}:{sort_order.value}" for name, _, sort_order in self._sort_keys]
+
+    @property
+    def _cursor_python_types(self) -> list[type | None]:
+        python_types = []
+
+        for _, key, _ in self._sort_keys:
+            try:
+                python_types.append(key.type.python_type)
+            except NotImplementedError:
+                python_types.append(None)
+
+        return python_types
+
     @staticmethod
     def _load_filter(filter_json: str) -> FilterDict:
         try:
@@ -227,95 +366,95 @@ class SearchEngine:
 
         return filter_
 
-    def _apply_filter(self, filter_: FilterDict, model_class: ModelClass):
-        def condition_generator(conditions_dict: dict, target: InstrumentedAttribute | ColumnClause, is_aggregated: bool = False) -> Generator[BinaryExpression, None, None]:
-            if not isinstance(conditions_dict, dict):
-                raise ValueError(f"Invalid conditions format for field '{field}': {conditions_dict}. Must be a dict of operators and values")
+    def _normalize_filter(self, filter_: FilterDict, model_class: ModelClass) -> Generator[tuple[str, str | None, FilterOperator, Any], None, None]:
+        # Validates a filter dict and flattens it into (field, function, operator, value) conditions
+        for field, field_value in filter_.items():
+            field = field.lower()
+            column = getattr(model_class.value, field, None)
 
-            for operator_str, value in conditions_dict.items():
-                operator_str = operator_str.lower()
+            column_is_column = isinstance(column, InstrumentedAttribute)
+            column_is_hybrid = column is not None and field in model_class.value.__annotations__.keys() and field not in model_class.mapper.columns.keys()
 
-                try:
-                    filter_operator = getattr(FilterOperator, operator_str.upper())
-                except KeyError:
-                    raise ValueError(f"Invalid operator '{operator_str}' for field '{field}' in condition {dict({operator_str: value})}")
+            if not column_is_column and not column_is_hybrid:
+                raise ValueError(f"Field '{field}' not applicable to '{model_class.value.__name__}'")
 
-                if column_is_column:  # TODO: Validate against hybrid too
-                    try:
-                        validate_column_value(column, value)
-                    except TypeValidationError as e:
-                        raise TypeError(f"Invalid value type for field '{field}' in condition {dict({operator_str: value})}: Expected {e.expected_types}, got {e.value_type.__name__}")
-                    except ValueError as e:
-                        raise e
+            conditions_dicts: dict[str | None, dict] = {None: field_value}
 
-                yield get_filter_condition(filter_operator, target, value, is_aggregated=is_aggregated)
+            if self._needs_advanced_filtering(model_class, field):
+                advanced_filter_field = AdvancedFilterField[field.upper()]
 
-        def apply_conditions(target: InstrumentedAttribute | ColumnClause, conditions_dict: dict):
-            for condition in condition_generator(conditions_dict, target):
-                conditions.append(condition)
-
-        def apply_cte(cte: CTE, conditions_dict: dict):
-            target = cte.columns["target"]
-            apply_conditions(target, conditions_dict)
-
-            self.query = self.query.join(cte, BeatmapsetSnapshot.id == cte.c.beatmapset_snapshot_id)
-
-        def apply_simple_filter():
-            if column.class_ is Profile:
-                cte = profile_filtering_cte_factory(column)
-                self.query = self.query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
-                apply_conditions(cte.c.target, field_value)
-            elif column.class_ is BeatmapSnapshot:
-                aggregated_conditions = condition_generator(field_value, column, is_aggregated=True)
-                cte = bm_ss_filtering_cte_factory(column, aggregated_conditions)
-                self.query = self.query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
-            elif column.class_ is Request:
-                cte = request_filtering_cte_factory(column)
-                self.query = self.query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
-                apply_conditions(cte.c.target, field_value)
-            else:
-                apply_conditions(column, field_value)
+                if isinstance(advanced_filter_field.value, dict):
+                    if not isinstance(field_value, dict):
+                        raise ValueError(f"Invalid functions format for field '{field}': {field_value}. Must be a dict of functions and conditions")
 
-        def apply_advanced_filter():
-            advanced_filter_field = AdvancedFilterField[field.upper()]
+                    conditions_dicts = {}
 
-            if isinstance(advanced_filter_field.value, dict):
-                for func_str, conditions_dict in field_value.items():
-                    func_str = func_str.lower()
+                    for func_str, conditions_dict in field_value.items():
+                        func_str = func_str.lower()
+
+                        if func_str not in advanced_filter_field.value:
+                            raise ValueError(f"Unsupported function '{func_str}' for field '{field}'. Must be one of: {", ".join(advanced_filter_field.value.keys())}")
+
+                        conditions_dicts[func_str] = conditions_dict
+                elif not isinstance(advanced_filter_field.value, CTE):
+                    raise ValueError(f"Unknown error occurred while processing field '{field}'. Please let a developer know")
+
+            for func_str, conditions_dict in conditions_dicts.items():
+                if not isinstance(conditions_dict, dict):
+                    raise ValueError(f"Invalid conditions format for field '{field}': {conditions_dict}. Must be a dict of operators and values")
+
+                for operator_str, value in conditions_dict.items():
+                    operator_str = operator_str.lower()
 
                     try:
-                        cte = advanced_filter_field.value[func_str]
-                        cte = cte.alias("filtering_" + cte.name)
+                        filter_operator = FilterOperator[operator_str.upper()]
                     except KeyError:
-                        raise ValueError(f"Unsupported function '{func_str}' for field '{field}'. Must be one of: {", ".join(advanced_filter_field.value.keys())}")
+                        raise ValueError(f"Invalid operator '{operator_str}' for field '{field}' in condition {dict({operator_str: value})}")
 
-                    return apply_cte(cte, conditions_dict)
-            elif isinstance(advanced_filter_field.value, CTE):
-                cte = advanced_filter_field.value
-                return apply_cte(cte, field_value)
-            else:
-                raise ValueError(f"Unknown error occurred while processing field '{field}'. Please let a developer know")
+                    if column_is_column:  # TODO: Validate against hybrid too
+                        try:
+                            validate_column_value(column, value)
+                        except TypeValidationError as e:
+                            raise TypeError(f"Invalid value type for field '{field}' in condition {dict({operator_str: value})}: Expected {e.expected_types}, got {e.value_type.__name__}")
 
-        conditions: list[BinaryExpression] = []
+                    yield field, func_str, filter_operator, value
 
-        for field, field_value in filter_.items():
-            field = field.lower()
-            column = getattr(model_class.value, field, None)
+    @staticmethod
+    def _needs_advanced_filtering(model_class: ModelClass, field: str) -> bool:
+        column = getattr(model_class.value, field, None)
+        column_is_hybrid = column is not None and field in model_class.value.__annotations__.keys() and field not in model_class.mapper.columns.keys()
 
-            column_is_column = isinstance(column, InstrumentedAttribute)
-            column_is_hybrid = column is not None and field in model_class.value.__annotations__.keys() and field not in model_class.mapper.columns.keys()
-            needs_advanced_filtering = column_is_hybrid and field.upper() in AdvancedFilterField.__members__.keys()
+        return column_is_hybrid and field.upper() in AdvancedFilterField.__members__.keys()
 
-            if not column_is_column and not column_is_hybrid:
-                raise ValueError(f"Field '{field}' not applicable to '{model_class.value.__name__}'")
+    def _apply_filter(self, model_class: ModelClass, field: str, func_str: str | None, conditions: list[tuple[FilterOperator, BindParameter | None]]):
+        def condition_generator(target: InstrumentedAttribute | ColumnClause, is_aggregated: bool = False) -> Generator[BinaryExpression, None, None]:
+            for filter_operator, value in conditions:
+                yield get_filter_condition(filter_operator, target, value, is_aggregated=is_aggregated)
 
-            if not needs_advanced_filtering:
-                apply_simple_filter()
-            else:
-                apply_advanced_filter()
+        def apply_cte(cte: CTE, is_aggregated: bool = False):
+            self.query = self.query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id)
 
-        if conditions:
-            self.query = self.query.where(and_(*conditions))
+            if not is_aggregated:
+                self.query = self.query.where(and_(*condition_generator(cte.c.target)))
+
+        column = getattr(model_class.value, field)
+
+        if self._needs_advanced_filtering(model_class, field):
+            cte = AdvancedFilterField[field.upper()].value
+
+            if func_str is not None:
+                cte = cte[func_str]
+                cte = cte.alias("filtering_" + cte.name)
+
+            apply_cte(cte)
+        elif column.class_ is Profile:
+            apply_cte(profile_filtering_cte_factory(column))
+        elif column.class_ is BeatmapSnapshot:
+            apply_cte(bm_ss_filtering_cte_factory(column, condition_generator(column, is_aggregated=True)), is_aggregated=True)
+        elif column.class_ is Request:
+            apply_cte(request_filtering_cte_factory(column))
+        else:
+            self.query = self.query.where(and_(*condition_generator(column)))
 
     @property
     def search_query(self) -> str:
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from typing import Hashable
+
+from sqlalchemy.sql.selectable import Select
+from sqlalchemy.sql.elements import ColumnElement
+
+from .enums import SortOrder
+
+QUERY_TEMPLATE_CACHE_MAX_SIZE = 256
+
+SortKey = tuple[str, ColumnElement, SortOrder]
+
+
+class QueryTemplate:
+    # A composed search query whose request values are all bind parameters, so it can be reused as is.
+    # Reusing the same statement object also keeps its memoized cache key for SQLAlchemy's compiled cache.
+    def __init__(self, query: Select, sort_keys: list[SortKey]):
+        self.query = query
+        self.sort_keys = sort_keys
+
+        # Keyset page queries, by which of the cursor values are null
+        self.keyset_queries: dict[tuple[bool, ...], Select] = {}
+
+
+class QueryTemplateCache:
+    def __init__(self, max_size: int = QUERY_TEMPLATE_CACHE_MAX_SIZE):
+        self.max_size = max_size
+
+        self._templates: OrderedDict[Hashable, QueryTemplate] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+    def get(self, shape: Hashable) -> QueryTemplate | None:
+        if (template := self._templates.get(shape)) is None:
+            self.misses += 1
+            return None
+
+        self._templates.move_to_end(shape)
+        self.hits += 1
+
+        return template
+
+    def set(self, shape: Hashable, template: QueryTemplate):
+        self._templates[shape] = template
+        self._templates.move_to_end(shape)
+
+        while len(self._templates) > self.max_size:
+            self._templates.popitem(last=False)
+
+    def clear(self):
+        self._templates.clear()
+
+
+query_templates = QueryTemplateCache()
@@ -53,3 +53,10 @@ def get_nested_value(data: dict[str, Any], path: str) -> Any:
             raise KeyError(f"Key '{key}' not found in {value}")
 
     return value
+
+
+def etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+
+    return if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
@@ -0,0 +1,51 @@
+import time
+from typing import AsyncIterator, AsyncIterable
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED, ZIP_STORED
+
+READ_CHUNK_SIZE = 65536
+ZIP_COMPRESSION_METHODS = {
+    "stored": ZIP_STORED,
+    "deflate": ZIP_DEFLATED
+}
+
+
+class _ChunkBuffer:
+    # Write-only sink for ZipFile. It has no tell(), so ZipFile treats it as unseekable and writes data descriptors instead of seeking back
+    def __init__(self):
+        self.chunks: list[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+async def stream_zip(files: list[tuple[str, AsyncIterable[bytes]]], compression: int = ZIP_DEFLATED) -> AsyncIterator[bytes]:
+    """Yields a zip of (archive name, content chunks) pairs as it is written, holding at most one chunk of each file in memory"""
+    buffer = _ChunkBuffer()
+    date_time = time.localtime()[:6]
+
+    with ZipFile(buffer, "w", compression=compression) as zip_file:
+        for archive_name, chunks in files:
+            zip_info = ZipInfo(archive_name, date_time=date_time)
+            zip_info.compress_type = compression
+
+            with zip_file.open(zip_info, "w") as entry:
+                async for chunk in chunks:
+                    entry.write(chunk)
+
+                    if data := buffer.drain():
+                        yield data
+
+            if data := buffer.drain():
+                yield data
+
+    # Central directory, written when the ZipFile closes
+    if data := buffer.drain():
+        yield data
@@ -0,0 +1,51 @@
+import asyncio
+import argparse
+from functools import partial
+from typing import Callable, Awaitable
+
+from app.database import PostgresqlDB
+from app.database.models import BeatmapsetSnapshotSearch, BeatmapsetSnapshotStats
+from app.logger import logger
+
+BACKFILL_TARGETS = ("stats", "search", "sort_keys")
+
+
+def get_backfill_steps(db: PostgresqlDB) -> dict[str, tuple[Callable[[int], Awaitable[list[int]]], Callable[[list[int]], Awaitable[None]]]]:
+    # How to find a batch of IDs missing a side table row, and how to write their rows
+    return {
+        "stats": (partial(db.get_beatmapset_snapshot_ids_without, BeatmapsetSnapshotStats), db.insert_beatmapset_snapshot_stats),
+        "search": (partial(db.get_beatmapset_snapshot_ids_without, BeatmapsetSnapshotSearch), db.upsert_search_documents),
+        "sort_keys": (db.get_stale_sort_key_listing_ids, db.upsert_listing_sort_keys)
+    }
+
+
+async def backfill(targets: list[str], batch_size: int = 1000):
+    # Fills in the side tables for beatmapset snapshots and listings archived before they existed
+    db = PostgresqlDB()
+    await db.create_database()  # Creates any missing side tables (and the pg_trgm extension) on existing installations
+    backfill_steps = get_backfill_steps(db)
+
+    for target in targets:
+        find_ids, fill = backfill_steps[target]
+        logger.info(f"Backfilling {target}...")
+        i = 0
+
+        while ids := await find_ids(batch_size):
+            await fill(ids)
+            i += len(ids)
+
+            if __name__ == "__main__":
+                print(f"\r[{target}] {i} rows written", end="")
+
+        logger.info(f"\nBackfill of {target} complete: {i} rows written")
+
+    await db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill in the stats, search documents and sort keys of beatmapsets archived before they existed")
+    parser.add_argument("--only", action="append", choices=BACKFILL_TARGETS, help="Only backfill these, repeat for more than one (all by default)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per transaction")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.only or list(BACKFILL_TARGETS), batch_size=args.batch_size))
@@ -0,0 +1,52 @@
+import asyncio
+import argparse
+
+from app.osu_api import ScoreType
+from app.database import PostgresqlDB
+from app.http_client import close_http_client
+from app.redis import RedisClient
+from app.logger import logger
+from daemon.services.score_fetcher import ScoreFetcher
+
+BACKFILL_SCORE_TYPES = (ScoreType.BEST.value, ScoreType.FIRSTS.value)
+
+
+async def backfill_scores(score_types: list[ScoreType], user_ids: list[int] | None = None):
+    # The score fetcher only keeps up with recent scores, so best and first place scores set before that are paged in here
+    rc = RedisClient()
+    db = PostgresqlDB()
+    score_fetcher = ScoreFetcher(rc, db)
+
+    tasks = await db.get_score_fetcher_tasks(enabled=True)
+
+    if user_ids is not None:
+        tasks = [task for task in tasks if task.user_id in user_ids]
+
+    total_tasks = len(tasks)
+    logger.info(f"Backfilling {", ".join(score_type.value for score_type in score_types)} scores of {total_tasks} users...")
+
+    for i, task in enumerate(tasks, start=1):
+        for score_type in score_types:
+            # Already backfilled scores are skipped through the watermark fetch_scores leaves behind
+            await score_fetcher.fetch_scores(task.id, score_type)
+
+        if __name__ == "__main__" and total_tasks:
+            progress = int((i / total_tasks) * 100)
+            bar = "=" * (progress // 2)
+            spaces = " " * (50 - len(bar))
+
+            print(f"\r[scores] [{bar}{spaces}] {progress}% ({i}/{total_tasks})", end="")
+
+    await close_http_client()
+    await rc.aclose()
+    await db.close()
+    logger.info("\nScore backfill complete!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch the best and first place scores of users with an enabled score fetcher task")
+    parser.add_argument("--only", action="append", choices=BACKFILL_SCORE_TYPES, help="Only backfill these scores, repeat for more than one (all by default)")
+    parser.add_argument("--users", type=int, nargs="+", help="Only backfill these user IDs")
+    args = parser.parse_args()
+
+    asyncio.run(backfill_scores([ScoreType(score_type) for score_type in args.only or BACKFILL_SCORE_TYPES], user_ids=args.users))
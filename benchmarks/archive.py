@@ -0,0 +1,254 @@
+import time
+import asyncio
+import argparse
+import statistics
+
+import httpx
+from httpx import HTTPError
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app.beatmap_manager import BeatmapManager
+from app.database import PostgresqlDB
+from app.database.models import Profile, Tag
+from app.database.schemas import BeatmapSnapshotSchema, BeatmapsetSnapshotSchema, ProfileSchema
+from app.redis import RedisClient, RedisLock, Namespace, LOCK_EXPIRY
+from app.utils import combine_checksums, aware_utcnow
+from app.exceptions import RestrictedUserError
+from fake_osu_api import create_app
+
+# Synthetic beatmapset IDs are offset per seed so every archive writes a brand new set, while
+# keeping the derived beatmap IDs (beatmapset_id * 10 + n) within the range of an integer column
+BEATMAPSET_ID_OFFSET = 150_000_000
+
+
+# Archive path used before the single-transaction upserts, kept here for comparison
+class LegacyBeatmapManager(BeatmapManager):
+    async def archive(self, beatmapset_id: int, download: bool = True) -> list[int]:
+        beatmapset_dict = await self.oac.get_beatmapset(beatmapset_id)
+        checksum = combine_checksums([beatmap["checksum"] for beatmap in beatmapset_dict["beatmaps"]])
+
+        await self._ensure_populated(beatmapset_dict)
+
+        if not await self.db.get_beatmapset_snapshot(checksum=checksum):
+            return await self._snapshot(beatmapset_dict)
+        else:
+            return []
+
+    async def _ensure_populated(self, beatmapset_dict: dict):
+        beatmapset_id = beatmapset_dict["id"]
+        user_id = beatmapset_dict["user_id"]
+        inaccessible_user_ids = await self._find_inaccessible_users([user_id, *(beatmap_dict["user_id"] for beatmap_dict in beatmapset_dict["beatmaps"])])
+
+        # Beatmapset
+        try:
+            await self._ensure_user_populated(user_id, inaccessible_user_ids)
+        except RestrictedUserError:
+            user_dict = beatmapset_dict["user"]
+
+            if user_dict.get("is_deleted", False):
+                user_dict["username"] = beatmapset_dict.get("creator")
+
+            await self._populate_profile(user_id, restricted_user_dict=user_dict, is_restricted=True)
+
+        if not await self.db.get_beatmapset(id=beatmapset_id):
+            await self.db.add_beatmapset(id=beatmapset_id, user_id=user_id)
+
+        # Beatmap
+        for beatmap_dict in beatmapset_dict["beatmaps"]:
+            beatmap_id = beatmap_dict["id"]
+            user_id = beatmap_dict["user_id"]
+
+            try:
+                await self._ensure_user_populated(user_id, inaccessible_user_ids)
+            except RestrictedUserError:
+                await self._populate_profile(user_id, is_restricted=True)
+
+            if not await self.db.get_beatmap(id=beatmap_id):
+                await self.db.add_beatmap(id=beatmap_id, beatmapset_id=beatmapset_id, user_id=user_id)
+
+    async def _ensure_user_populated(self, user_id: int, inaccessible_user_ids: set[int] = frozenset()) -> Profile | None:
+        if not await self.db.get_user(id=user_id):
+            await self.db.add_user(id=user_id)
+
+        if user_id in inaccessible_user_ids:
+            raise RestrictedUserError(user_id)
+
+        try:
+            return await self._populate_profile(user_id)
+        except HTTPError:
+            raise RestrictedUserError(user_id)
+
+    async def _find_inaccessible_users(self, user_ids: list[int]) -> set[int]:
+        unprofiled_user_ids = [user_id for user_id in dict.fromkeys(user_ids) if not await self.db.get_profile(user_id=user_id)]
+
+        if not unprofiled_user_ids:
+            return set()
+
+        try:
+            accessible_users = await self.oac.get_users(unprofiled_user_ids)
+        except HTTPError:
+            return set()
+
+        return set(unprofiled_user_ids) - accessible_users.keys()
+
+    async def _populate_profile(self, user_id: int, restricted_user_dict: dict = None, is_restricted: bool = False) -> Profile | None:
+        restricted_user_dict = restricted_user_dict if restricted_user_dict is not None else {}
+        lock = RedisLock(self.rc, Namespace.OSU_USER_PROFILE.hash_name(user_id))
+        await lock.acquire(timeout=LOCK_EXPIRY)
+
+        try:
+            if (profile := await self.db.get_profile(user_id=user_id)) and not is_restricted:
+                return profile
+
+            if not is_restricted:
+                user_dict = await self.oac.get_user(user_id)
+                profile_dict = ProfileSchema.model_validate(user_dict).model_dump()
+            else:
+                profile_dict = {
+                    "user_id": user_id,
+                    "is_restricted": True,
+                    "avatar_url": restricted_user_dict.get("avatar_url"),
+                    "username": restricted_user_dict.get("username"),
+                    "country_code": restricted_user_dict.get("country_code"),
+                }
+
+            try:
+                profile = await self.db.add_profile(**profile_dict)
+            except IntegrityError:
+                profile_id = (await self.db.get_profile(user_id=user_id)).id
+                profile = await self.db.update_profile(profile_id, **profile_dict)
+
+            task_id = (await self.db.get_profile_fetcher_task(user_id=user_id)).id
+            await self.db.update_profile_fetcher_task(task_id, last_fetch=aware_utcnow())
+        finally:
+            await lock.release()
+
+        return profile
+
+    async def _snapshot(self, beatmapset_dict: dict) -> list[int]:
+        beatmap_snapshots = []
+        snapshotted_beatmap_ids = []
+
+        # BeatmapSnapshot
+        for beatmap_dict in beatmapset_dict["beatmaps"]:
+            beatmap_snapshot = await self.db.get_beatmap_snapshot(checksum=beatmap_dict["checksum"])
+
+            if not beatmap_snapshot:
+                beatmap_snapshot_dict = BeatmapSnapshotSchema.model_validate(beatmap_dict).model_dump(
+                    exclude={"beatmapset_snapshots", "leaderboard", "owner_profiles"}
+                )
+                beatmap_snapshot_dict["owner_profiles"] = await self._populate_owner_profiles(beatmap_dict["owners"])
+                beatmap_snapshot = await self.db.add_beatmap_snapshot(**beatmap_snapshot_dict)
+                snapshotted_beatmap_ids.append(beatmap_snapshot.beatmap_id)
+
+            beatmap_snapshots.append(beatmap_snapshot)
+
+        # BeatmapsetSnapshot
+        beatmapset_snapshot_dict = BeatmapsetSnapshotSchema.model_validate(beatmapset_dict).model_dump(
+            exclude={"beatmap_snapshots", "tags", "user_profile"}
+        )
+        beatmapset_snapshot_dict["beatmap_snapshots"] = beatmap_snapshots
+        beatmapset_snapshot_dict["tags"] = await self._populate_tags(beatmapset_dict["tags"])
+        await self.db.add_beatmapset_snapshot(**beatmapset_snapshot_dict)
+
+        return snapshotted_beatmap_ids
+
+    async def _populate_owner_profiles(self, owners: list[dict[str, int | str]]) -> list[Profile]:
+        user_ids = [owner["id"] for owner in owners]
+        inaccessible_user_ids = await self._find_inaccessible_users(user_ids)
+        profiles = []
+
+        for user_id in user_ids:
+            try:
+                profile = await self._ensure_user_populated(user_id, inaccessible_user_ids)
+            except RestrictedUserError:
+                profile = await self._populate_profile(user_id, is_restricted=True)
+
+            profiles.append(profile)
+
+        return profiles
+
+    async def _populate_tags(self, tags_str: str) -> list[Tag]:
+        tag_strs = set(tag.strip() for tag in tags_str.split(" ") if tag.strip())
+        tags = []
+
+        if not tags_str:
+            return []
+
+        for tag_str in tag_strs:
+            tag = await self.db.get_tag(name=tag_str)
+
+            if not tag:
+                tag = await self.db.add_tag(name=tag_str)
+
+            tags.append(tag)
+
+        return tags
+
+
+class QueryCounter:
+    def __init__(self, db: PostgresqlDB):
+        self.count = 0
+
+        @event.listens_for(db.engine.sync_engine, "before_cursor_execute")
+        def before_cursor_execute(*args):
+            self.count += 1
+
+
+async def run(bm: BeatmapManager, counter: QueryCounter, beatmapset_ids: list[int]) -> tuple[list[float], list[int]]:
+    latencies, query_counts = [], []
+
+    for beatmapset_id in beatmapset_ids:
+        queries_before = counter.count
+        start_time = time.perf_counter()
+        await bm.archive(beatmapset_id, download=False)
+        latencies.append((time.perf_counter() - start_time) * 1000)
+        query_counts.append(counter.count - queries_before)
+
+    return latencies, query_counts
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare archive latency and query counts of the legacy and single-transaction archive paths against the fake osu! API. Run it against a scratch database.")
+    parser.add_argument("--beatmapsets", type=int, default=50, help="Beatmapsets archived per path")
+    parser.add_argument("--seed", type=int, default=int(time.time()), help="Fake osu! API seed, change it to archive fresh users")
+    args = parser.parse_args()
+
+    rc = RedisClient()
+    db = PostgresqlDB()
+    await db.create_database()
+    counter = QueryCounter(db)
+
+    http = httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app({"seed": args.seed})), base_url="https://osu.ppy.sh")
+    base_id = BEATMAPSET_ID_OFFSET + args.seed % 50_000 * 1000
+
+    async def get_auth_headers(*_args, **_kwargs) -> dict:
+        return {"Authorization": "Bearer benchmark"}
+
+    try:
+        rows = []
+
+        for name, bm_class, offset in (("legacy", LegacyBeatmapManager, 0), ("bulk", BeatmapManager, args.beatmapsets)):
+            bm = bm_class(rc, db)
+            bm.oac.http = http
+            bm.oac.get_auth_headers = get_auth_headers
+            beatmapset_ids = [base_id + offset + i for i in range(args.beatmapsets)]
+            rows.append((name, *await run(bm, counter, beatmapset_ids)))
+            # Archiving the same beatmapsets again only has to notice that their snapshots are known
+            rows.append((f"{name} again", *await run(bm, counter, beatmapset_ids)))
+
+        print(f"Archived {args.beatmapsets} synthetic beatmapsets per path (downloads disabled)")
+        print(f"{'path':<14} {'mean (ms)':>10} {'p95 (ms)':>9} {'queries/set':>12}")
+
+        for name, latencies, query_counts in rows:
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+            print(f"{name:<14} {statistics.mean(latencies):>10.1f} {p95:>9.1f} {statistics.mean(query_counts):>12.1f}")
+    finally:
+        await http.aclose()
+        await rc.aclose()
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+import os
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import tempfile
+import statistics
+
+import zstandard
+
+from app.blob_store import BlobStore
+from fake_osu_api import SyntheticDataGenerator
+
+DICTIONARY_SIZE = 112_640  # zstd's default dictionary size
+
+
+def load_corpus(corpus_dir: str | None, beatmapsets: int, seed: int) -> list[bytes]:
+    if corpus_dir:
+        return [
+            open(os.path.join(directory, filename), "rb").read()
+            for directory, _, filenames in os.walk(corpus_dir)
+            for filename in filenames
+            if filename.endswith(".osu")
+        ]
+
+    generator = SyntheticDataGenerator(seed)
+
+    return [generator.osu_file(beatmap["id"]) for beatmapset_id in range(1, beatmapsets + 1) for beatmap in generator.beatmapset(beatmapset_id)["beatmaps"]]
+
+
+def fill_store(store: BlobStore, files: list[bytes]) -> tuple[list[str], int, int]:
+    # Returns the checksums, along with the total file size and the disk space actually allocated to them
+    checksums, size, allocated = [], 0, 0
+
+    for content in files:
+        checksum = hashlib.md5(content).hexdigest()
+
+        if not store.exists(checksum):
+            temp_path = store.temp_path(checksum)
+
+            with open(temp_path, "wb") as file:
+                file.write(content)
+
+            store.commit(temp_path, checksum)
+            stored_path = store.get_compressed_path(checksum) if store.compression_level is not None else store.get_path(checksum)
+            stat_result = os.stat(stored_path)
+            size += stat_result.st_size
+            allocated += stat_result.st_blocks * 512
+
+        checksums.append(checksum)
+
+    return checksums, size, allocated
+
+
+async def read_latencies(store: BlobStore, checksums: list[str]) -> list[float]:
+    latencies = []
+
+    for checksum in checksums:
+        start_time = time.perf_counter()
+        await store.read(checksum)
+        latencies.append((time.perf_counter() - start_time) * 1_000_000)
+
+    return latencies
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare disk usage and read latency of uncompressed, zstd and dictionary-zstd .osu blobs")
+    parser.add_argument("--corpus", help="Directory of .osu files to use instead of synthetic ones from the fake osu! API")
+    parser.add_argument("--beatmapsets", type=int, default=200, help="Synthetic beatmapsets to generate when no corpus is given")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--level", type=int, default=19, help="zstd compression level")
+    parser.add_argument("--train-ratio", type=float, default=0.5, help="Share of the corpus the dictionary is trained on, the rest is measured")
+    parser.add_argument("--save-dictionary", help="Write the trained dictionary here, for use as BLOB_COMPRESSION_DICTIONARY_PATH")
+    args = parser.parse_args()
+
+    files = list({hashlib.md5(content).hexdigest(): content for content in load_corpus(args.corpus, args.beatmapsets, args.seed)}.values())
+    random.Random(args.seed).shuffle(files)
+    split = int(len(files) * args.train_ratio)
+    training_files, measured_files = files[:split], files[split:]
+
+    dictionary = zstandard.train_dictionary(DICTIONARY_SIZE, training_files, level=args.level).as_bytes()
+
+    if args.save_dictionary:
+        with open(args.save_dictionary, "wb") as file:
+            file.write(dictionary)
+
+    raw_size = sum(len(content) for content in measured_files)
+    print(f"{len(measured_files)} .osu files measured ({raw_size / 1024:.1f} KiB), dictionary trained on {len(training_files)} others ({len(dictionary) / 1024:.1f} KiB)")
+    print(f"{'storage':<10} {'size (KiB)':>11} {'on disk (KiB)':>14} {'ratio':>6} {'read mean (us)':>15} {'read p95 (us)':>14}")
+
+    with tempfile.TemporaryDirectory() as root:
+        for name, store in (
+            ("raw", BlobStore(os.path.join(root, "raw"))),
+            ("zstd", BlobStore(os.path.join(root, "zstd"), compression_level=args.level)),
+            ("zstd+dict", BlobStore(os.path.join(root, "dict"), compression_level=args.level, dictionary=dictionary))
+        ):
+            checksums, size, allocated = fill_store(store, measured_files)
+            await read_latencies(store, checksums[:50])  # Warm up
+            latencies = await read_latencies(store, checksums)
+            p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+
+            print(f"{name:<10} {size / 1024:>11.1f} {allocated / 1024:>14.1f} {raw_size / size:>6.2f} {statistics.mean(latencies):>15.1f} {p95:>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,202 @@
+import asyncio
+import timeit
+import argparse
+from ast import literal_eval
+from datetime import datetime
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from app.redis import RedisClient
+from app.redis.models import Beatmapset, Beatmap
+
+BENCHMARK_KEY_PREFIX = "benchmark:cache_format"
+
+
+def make_beatmapset(beatmap_count: int) -> Beatmapset:
+    beatmaps = [
+        {
+            "id": 1000 + i,
+            "user_id": 2,
+            "accuracy": 8.5,
+            "ar": 9.3,
+            "bpm": 180.0,
+            "checksum": f"{i:032x}",
+            "count_circles": 412 + i,
+            "count_sliders": 288,
+            "count_spinners": 1,
+            "cs": 4.0,
+            "deleted_at": None,
+            "difficulty_rating": 5.21 + i / 10,
+            "drain": 5.0,
+            "failtimes": {"fail": list(range(100)), "exit": list(range(100))},
+            "hit_length": 180,
+            "last_updated": "2025-01-01T00:00:00+00:00",
+            "max_combo": 1024,
+            "mode": "osu",
+            "mode_int": 0,
+            "owners": [{"id": 2, "username": "peppy"}],
+            "passcount": 1234,
+            "playcount": 56789,
+            "ranked": 1,
+            "status": "ranked",
+            "total_length": 200,
+            "url": f"https://osu.ppy.sh/beatmaps/{1000 + i}",
+            "version": f"Difficulty {i}"
+        }
+        for i in range(beatmap_count)
+    ]
+
+    return Beatmapset.model_validate({
+        "id": 1,
+        "user_id": 2,
+        "artist": "Artist",
+        "artist_unicode": "Artist",
+        "availability": {"download_disabled": False, "more_information": None},
+        "covers": {key: f"https://assets.ppy.sh/beatmaps/1/covers/{key}.jpg" for key in ("cover", "card", "list", "slimcover")},
+        "creator": "peppy",
+        "deleted_at": None,
+        "favourite_count": 100,
+        "genre": {"id": 2, "name": "Video Game"},
+        "hype": None,
+        "language": {"id": 3, "name": "English"},
+        "last_updated": "2025-01-01T00:00:00+00:00",
+        "nsfw": False,
+        "offset": 0,
+        "play_count": 100000,
+        "preview_url": "//b.ppy.sh/preview/1.mp3",
+        "ranked": 1,
+        "source": "",
+        "status": "ranked",
+        "submitted_date": "2024-12-01T00:00:00+00:00",
+        "tags": "some tags for the search index " * 4,
+        "title": "Title",
+        "title_unicode": "Title",
+        "track_id": None,
+        "user": {"id": 2, "username": "peppy", "avatar_url": "https://a.ppy.sh/2"},
+        "video": False,
+        "beatmaps": beatmaps
+    })
+
+
+# Format used before the versioned binary encoding, kept here for comparison
+def legacy_serialize_beatmap(beatmap: Beatmap) -> dict[str, str]:
+    serialized_dict = {}
+
+    for key, value in beatmap.__dict__.items():
+        match key:
+            case "deleted_at" | "last_updated":
+                value = value.isoformat() if value is not None else ""
+
+        serialized_dict[key] = str(value) if value is not None else ""
+
+    return serialized_dict
+
+
+def legacy_deserialize_beatmap(serialized_dict: dict[str, str]) -> Beatmap:
+    deserialized_dict = {}
+
+    for key, value in serialized_dict.items():
+        match key:
+            case "id" | "user_id" | "count_circles" | "count_sliders" | "count_spinners" | "hit_length" | "max_combo" | "mode_int" | "passcount" | "playcount" | "ranked" | "total_length":
+                value = int(value)
+            case "accuracy" | "ar" | "bpm" | "cs" | "difficulty_rating" | "drain":
+                value = float(value)
+            case "failtimes" | "owners":
+                value = literal_eval(value)
+            case "deleted_at" | "last_updated":
+                value = datetime.fromisoformat(value) if value else None
+
+        deserialized_dict[key] = value
+
+    return Beatmap.model_validate(deserialized_dict)
+
+
+def legacy_serialize(beatmapset: Beatmapset) -> dict[str, str]:
+    serialized_dict = {}
+
+    for key, value in beatmapset.__dict__.items():
+        match key:
+            case "beatmaps":
+                value = [legacy_serialize_beatmap(beatmap) for beatmap in value]
+
+        serialized_dict[key] = str(value) if value is not None else ""
+
+    return serialized_dict
+
+
+def legacy_deserialize(serialized_dict: dict[str, str]) -> Beatmapset:
+    deserialized_dict = {}
+
+    for key, value in serialized_dict.items():
+        match key:
+            case "id" | "user_id" | "favourite_count" | "offset" | "play_count" | "ranked" | "track_id":
+                value = int(value) if value else None
+            case "nsfw" | "video":
+                value = literal_eval(value.capitalize())
+            case "availability" | "covers" | "genre" | "hype" | "language" | "user":
+                value = literal_eval(value) if value else None
+            case "deleted_at" | "last_updated" | "submitted_date":
+                value = datetime.fromisoformat(value) if value else None
+            case "beatmaps":
+                value = [legacy_deserialize_beatmap(beatmap) for beatmap in literal_eval(value)]
+
+        deserialized_dict[key] = value
+
+    return Beatmapset.model_validate(deserialized_dict)
+
+
+def time_per_call(func, number: int) -> float:
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+async def measure_redis_memory(legacy: dict[str, str], binary: bytes) -> tuple[int, int] | None:
+    rc = RedisClient()
+    legacy_key = f"{BENCHMARK_KEY_PREFIX}:legacy"
+    binary_key = f"{BENCHMARK_KEY_PREFIX}:binary"
+
+    try:
+        await rc.hset(legacy_key, mapping=legacy)
+        await rc.set(binary_key, binary)
+
+        return await rc.memory_usage(legacy_key), await rc.memory_usage(binary_key)
+    except RedisConnectionError:
+        return None
+    finally:
+        try:
+            await rc.delete(legacy_key, binary_key)
+        except RedisConnectionError:
+            pass
+
+        await rc.aclose()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy hash cache format against the binary cache format")
+    parser.add_argument("--beatmaps", type=int, default=8, help="Number of beatmaps in the sample beatmapset")
+    parser.add_argument("--number", type=int, default=200, help="Iterations per timing run")
+    args = parser.parse_args()
+
+    beatmapset = make_beatmapset(args.beatmaps)
+    legacy = legacy_serialize(beatmapset)
+    binary = beatmapset.to_bytes()
+
+    assert legacy_deserialize(legacy).model_dump() == beatmapset.model_dump()
+    assert Beatmapset.from_bytes(binary).model_dump() == beatmapset.model_dump()
+
+    print(f"Beatmapset with {args.beatmaps} beatmaps")
+    print(f"{'format':<8} {'serialize (us)':>15} {'deserialize (us)':>17} {'payload (B)':>12} {'redis (B)':>10}")
+
+    memory = await measure_redis_memory(legacy, binary)
+    legacy_size = sum(len(key) + len(value.encode()) for key, value in legacy.items())
+
+    rows = [
+        ("legacy", lambda: legacy_serialize(beatmapset), lambda: legacy_deserialize(legacy), legacy_size, memory[0] if memory else None),
+        ("binary", beatmapset.to_bytes, lambda: Beatmapset.from_bytes(binary), len(binary), memory[1] if memory else None)
+    ]
+
+    for name, serialize, deserialize, size, redis_memory in rows:
+        print(f"{name:<8} {time_per_call(serialize, args.number):>15.1f} {time_per_call(deserialize, args.number):>17.1f} {size:>12} {redis_memory if redis_memory is not None else 'n/a':>10}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,170 @@
+import time
+import random
+import asyncio
+import argparse
+import statistics
+
+from sqlalchemy.sql import select, func, or_
+from sqlalchemy.sql.selectable import CTE
+
+from app.database import PostgresqlDB
+from app.database.models import BeatmapSnapshot, BeatmapsetSnapshot, BeatmapsetListing, beatmap_snapshot_beatmapset_snapshot_association
+from app.database.schemas import BeatmapSnapshotSchema, BeatmapsetSnapshotSchema
+from app.database.ctes.search_filter import search_filter_cte_factory
+from fake_osu_api import SyntheticDataGenerator
+from fake_osu_api.generator import WORDS
+
+# Synthetic beatmapset IDs used by this benchmark, clear of the ones benchmarks/archive.py writes, while keeping
+# the derived beatmap IDs (beatmapset_id * 10 + n) within the range of an integer column
+BEATMAPSET_ID_OFFSET = 200_000_000
+
+
+# ILIKE scan used before the search documents, kept here for comparison
+def legacy_search_filter_cte_factory(search_query: str) -> CTE:
+    return (
+        select(
+            beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id
+        )
+        .join(
+            BeatmapsetSnapshot,
+            BeatmapsetSnapshot.id == beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id
+        )
+        .join(
+            BeatmapSnapshot,
+            BeatmapSnapshot.id == beatmap_snapshot_beatmapset_snapshot_association.c.beatmap_snapshot_id
+        )
+        .where(
+            or_(
+                BeatmapSnapshot.version.ilike(f"%{search_query}%"),
+                BeatmapsetSnapshot.artist.ilike(f"%{search_query}%"),
+                BeatmapsetSnapshot.artist_unicode.ilike(f"%{search_query}%"),
+                BeatmapsetSnapshot.title.ilike(f"%{search_query}%"),
+                BeatmapsetSnapshot.title_unicode.ilike(f"%{search_query}%"),
+                BeatmapsetSnapshot.creator.ilike(f"%{search_query}%"),
+                BeatmapsetSnapshot.source.ilike(f"%{search_query}%")
+            )
+        )
+        .distinct(beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id)
+        .cte("search_filter_cte")
+    )
+
+
+async def seed(db: PostgresqlDB, generator: SyntheticDataGenerator, beatmapsets: int, concurrency: int):
+    # Archives synthetic beatmapsets straight from the generator, skipping ones a previous run already wrote
+    async with db.session() as session:
+        select_stmt = (
+            select(BeatmapsetListing.beatmapset_id)
+            .where(BeatmapsetListing.beatmapset_id.between(BEATMAPSET_ID_OFFSET, BEATMAPSET_ID_OFFSET + beatmapsets))
+        )
+        existing_ids = set((await session.scalars(select_stmt)).all())
+
+    queue = asyncio.Queue()
+
+    for beatmapset_id in range(BEATMAPSET_ID_OFFSET + 1, BEATMAPSET_ID_OFFSET + beatmapsets + 1):
+        if beatmapset_id not in existing_ids:
+            queue.put_nowait(beatmapset_id)
+
+    total, start_time = queue.qsize(), time.perf_counter()
+
+    async def worker():
+        while not queue.empty():
+            beatmapset_dict = generator.beatmapset(queue.get_nowait())
+
+            await db.archive_beatmapset_snapshot(
+                BeatmapsetSnapshotSchema.model_validate(beatmapset_dict).model_dump(
+                    exclude={"id", "snapshot_number", "snapshot_date", "verified", "beatmap_snapshots", "tags", "user_profile"}
+                ),
+                [
+                    BeatmapSnapshotSchema.model_validate(beatmap_dict).model_dump(
+                        exclude={"id", "snapshot_number", "snapshot_date", "beatmapset_snapshots", "leaderboard", "owner_profiles"}
+                    )
+                    for beatmap_dict in beatmapset_dict["beatmaps"]
+                ],
+                {},
+                [],
+                list(dict.fromkeys(tag for tag in beatmapset_dict["tags"].split(" ") if tag))
+            )
+
+            if (done := total - queue.qsize()) % 1000 == 0:
+                print(f"\rSeeded {done}/{total} beatmapsets ({time.perf_counter() - start_time:.0f}s)", end="")
+
+    if total:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        print()
+
+
+async def time_query(db: PostgresqlDB, search_query: str, legacy: bool, repeats: int) -> tuple[list[float], int]:
+    if legacy:
+        cte = legacy_search_filter_cte_factory(search_query)
+        order_by = [BeatmapsetListing.beatmapset_snapshot_id]
+    else:
+        cte = search_filter_cte_factory(search_query)
+        order_by = [cte.c.relevance.desc(), BeatmapsetListing.beatmapset_snapshot_id]
+
+    page_stmt = (
+        select(BeatmapsetListing.beatmapset_snapshot_id)
+        .join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetListing.beatmapset_snapshot_id)
+        .order_by(*order_by)
+        .limit(50)
+    )
+    count_stmt = select(func.count()).select_from(cte)
+    latencies = []
+
+    async with db.session() as session:
+        matches = await session.scalar(count_stmt)
+
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            await session.execute(page_stmt)
+            latencies.append((time.perf_counter() - start_time) * 1000)
+
+    return latencies, matches
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare the legacy ILIKE search with the indexed search documents on synthetic beatmapsets. Run it against a scratch database.")
+    parser.add_argument("--beatmapsets", type=int, default=100_000, help="Synthetic beatmapsets to seed (already seeded ones are reused)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent archive transactions while seeding")
+    parser.add_argument("--repeats", type=int, default=10, help="Timed runs of each query")
+    parser.add_argument("--seed", type=int, default=0, help="Fake osu! API seed")
+    args = parser.parse_args()
+
+    db = PostgresqlDB()
+    generator = SyntheticDataGenerator(args.seed)
+    rng = random.Random(args.seed)
+
+    try:
+        await db.create_database()
+        await seed(db, generator, args.beatmapsets, args.concurrency)
+
+        sample = generator.beatmapset(BEATMAPSET_ID_OFFSET + rng.randint(1, args.beatmapsets))
+        search_queries = [
+            rng.choice(WORDS),  # Common word
+            rng.choice(WORDS)[:4],  # Word prefix
+            rng.choice(WORDS)[1:3],  # Shorter than a trigram, so only matched as a prefix
+            " ".join(rng.sample(WORDS, 2)),  # Two words
+            sample["title"],  # Exact title
+            sample["creator"],  # Rare mapper name
+            sample["creator"][-5:],  # Substring only
+            "Difficulty 3",  # Difficulty name
+            "zzzz"  # No matches
+        ]
+
+        print(f"{'query':<28} {'legacy matches':>15} {'mean/p95 (ms)':>15} {'indexed matches':>16} {'mean/p95 (ms)':>15}")
+
+        for search_query in search_queries:
+            row = [f"{search_query[:28]:<28}"]
+
+            for legacy in (True, False):
+                latencies, matches = await time_query(db, search_query, legacy, args.repeats)
+                p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+
+                row.append(f"{matches:>{15 if legacy else 16}} {f"{statistics.mean(latencies):.1f} / {p95:.1f}":>15}")
+
+            print(" ".join(row))
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,101 @@
+import json
+import time
+import random
+import argparse
+import statistics
+
+from sqlalchemy.dialects import postgresql
+
+from app.search import SearchEngine
+from app.search.query_template import query_templates
+from fake_osu_api.generator import WORDS
+
+SORTING_CHOICES = [
+    [],
+    ["beatmapsnapshot.difficulty_rating"],
+    ["profile.total_kudosu", "beatmapsnapshot.bpm"],
+    ["beatmapsetsnapshot.num_difficulties"]
+]
+
+
+def random_request(rng: random.Random) -> dict:
+    # Listing requests of a handful of shapes, with different values every time
+    request = {"sorting": rng.choice(SORTING_CHOICES), "sort_orders": [rng.choice(["asc", "desc"])]}
+
+    if rng.random() < 0.5:
+        request["search_query"] = " ".join(rng.sample(WORDS, rng.randint(1, 2)))
+
+    if rng.random() < 0.5:
+        request["beatmap_filter"] = json.dumps({"difficulty_rating": {"gte": round(rng.uniform(0, 5), 2), "lt": round(rng.uniform(5, 10), 2)}})
+
+    if rng.random() < 0.3:
+        request["beatmapset_filter"] = json.dumps({"sr_gaps": {"max": {"lte": round(rng.uniform(0.5, 2), 2)}}})
+
+    if rng.random() < 0.2:
+        request["mapper_filter"] = json.dumps({"country_code": {"eq": rng.choice(["US", "JP", "DE", "KR"])}})
+
+    return request
+
+
+def time_requests(requests: list[dict], use_templates: bool) -> dict[str, list[float]]:
+    # Python-side cost of one request before it reaches the database: composing the statement, generating its
+    # SQLAlchemy cache key, and compiling it whenever the key isn't in the (here emulated) compiled cache yet
+    dialect = postgresql.dialect()
+    compiled_cache = {}
+    timings = {"compose": [], "cache key": [], "compile": [], "total": []}
+
+    query_templates.clear()
+    query_templates.hits = query_templates.misses = 0
+
+    for request in requests:
+        if not use_templates:
+            query_templates.clear()  # Every request composes its query from scratch, as before the templates
+
+        start_time = time.perf_counter()
+        se = SearchEngine()
+        se.search(None, **request)
+        composed_time = time.perf_counter()
+        cache_key = se.query._generate_cache_key().key
+        keyed_time = time.perf_counter()
+
+        if cache_key not in compiled_cache:
+            compiled_cache[cache_key] = se.query.compile(dialect=dialect)
+
+        compiled_time = time.perf_counter()
+
+        timings["compose"].append((composed_time - start_time) * 1e6)
+        timings["cache key"].append((keyed_time - composed_time) * 1e6)
+        timings["compile"].append((compiled_time - keyed_time) * 1e6)
+        timings["total"].append((compiled_time - start_time) * 1e6)
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the Python-side compose and compile time per search request with and without the query template cache")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests to time")
+    parser.add_argument("--seed", type=int, default=0, help="Request generator seed")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    requests = [random_request(rng) for _ in range(args.requests)]
+
+    print(f"{'':<12} {'per request (µs)':>36} {'with templates (µs)':>36}")
+    print(f"{'':<12} {'mean':>11} {'p50':>11} {'p95':>12} {'mean':>11} {'p50':>11} {'p95':>12}")
+
+    results = [time_requests(requests, use_templates) for use_templates in (False, True)]
+
+    for stage in results[0]:
+        row = [f"{stage:<12}"]
+
+        for timings in results:
+            samples = timings[stage]
+            row.append(f"{statistics.mean(samples):>11.1f} {statistics.median(samples):>11.1f} {statistics.quantiles(samples, n=20)[-1]:>12.1f}")
+
+        print(" ".join(row))
+
+    print(f"\nTemplates cached: {len(query_templates)} ({query_templates.hits} hits, {query_templates.misses} misses)")
+
+
+if __name__ == "__main__":
+    main()
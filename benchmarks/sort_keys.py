@@ -0,0 +1,125 @@
+import asyncio
+import argparse
+
+from sqlalchemy.sql import select, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql.selectable import Select
+from sqlalchemy.sql.functions import func
+from sqlalchemy.dialects import postgresql
+
+from app.database import PostgresqlDB
+from app.database.models import User, Profile, BeatmapSnapshot, BeatmapsetSnapshot, BeatmapsetListing, BeatmapsetListingSortKeys, beatmap_snapshot_beatmapset_snapshot_association
+from app.database.schemas import ProfileSchema
+from app.database.sort_keys import mapper_sort_keys_update
+from app.search.enums import SortingField, SortOrder, ModelClass
+from backfill import backfill
+from benchmarks.search import seed
+from fake_osu_api import SyntheticDataGenerator
+
+PROFILE_BATCH_SIZE = 1000
+
+
+# row_number() sorting CTEs used before the listing sort keys, kept here for comparison
+def legacy_sorting_cte(sorting_field: SortingField, sort_order: SortOrder):
+    column = sorting_field.value
+    select_stmt = select(
+        BeatmapsetSnapshot.id.label("beatmapset_snapshot_id"),
+        column.label("target"),
+        func.row_number().over(partition_by=BeatmapsetSnapshot.id, order_by=sort_order.sort_func(column)).label("rank")
+    )
+
+    if sorting_field.model_class is ModelClass.PROFILE:
+        select_stmt = select_stmt.join(Profile, Profile.user_id == BeatmapsetSnapshot.user_id).distinct(BeatmapsetSnapshot.id)
+    else:
+        select_stmt = (
+            select_stmt
+            .select_from(BeatmapSnapshot)
+            .join(beatmap_snapshot_beatmapset_snapshot_association, beatmap_snapshot_beatmapset_snapshot_association.c.beatmap_snapshot_id == BeatmapSnapshot.id)
+            .join(BeatmapsetSnapshot, BeatmapsetSnapshot.id == beatmap_snapshot_beatmapset_snapshot_association.c.beatmapset_snapshot_id)
+        )
+
+    return select_stmt.cte(f"legacy_{sorting_field.name.lower()}_ranked_cte")
+
+
+async def seed_profiles(db: PostgresqlDB, generator: SyntheticDataGenerator):
+    # seed() archives without profiles, which would leave nothing for the profile sorts to order by
+    async with db.session() as session:
+        select_stmt = (
+            select(User.id)
+            .outerjoin(Profile, Profile.user_id == User.id)
+            .where(Profile.id.is_(None))
+        )
+        user_ids = list((await session.scalars(select_stmt)).all())
+
+        for i in range(0, len(user_ids), PROFILE_BATCH_SIZE):
+            batch_user_ids = user_ids[i:i + PROFILE_BATCH_SIZE]
+            profile_dicts = [
+                ProfileSchema.model_validate(user_dict).model_dump(exclude={"id", "updated_at"}) | {"is_restricted": False}
+                for user_id in batch_user_ids
+                if (user_dict := generator.user(user_id)) is not None
+            ]
+
+            if profile_dicts:
+                await session.execute(insert(Profile).values(profile_dicts).on_conflict_do_nothing(index_elements=[Profile.user_id]))
+                await session.execute(mapper_sort_keys_update(batch_user_ids), execution_options={"synchronize_session": False})
+
+        await session.commit()
+
+
+def page_query(sorting_field: SortingField, sort_order: SortOrder, legacy: bool, limit: int) -> Select:
+    # The part of SearchEngine's page query that the sorting changes
+    query = select(BeatmapsetListing.id).join(BeatmapsetSnapshot, BeatmapsetSnapshot.id == BeatmapsetListing.beatmapset_snapshot_id)
+
+    if legacy:
+        cte = legacy_sorting_cte(sorting_field, sort_order)
+        query = query.join(cte, cte.c.beatmapset_snapshot_id == BeatmapsetSnapshot.id).where(cte.c.rank == 1)
+        key = cte.c.target
+    else:
+        field_name = sorting_field.name.split("__", 1)[1].lower()
+        prefix = "mapper" if sorting_field.model_class is ModelClass.PROFILE else "min" if sort_order is SortOrder.ASCENDING else "max"
+        query = query.join(BeatmapsetListingSortKeys, BeatmapsetListingSortKeys.beatmapset_listing_id == BeatmapsetListing.id)
+        key = getattr(BeatmapsetListingSortKeys, f"{prefix}_{field_name}")
+
+    return query.order_by(sort_order.sort_func(key), BeatmapsetSnapshot.id).limit(limit)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the listing page query sorted through the legacy row_number() CTEs and through the listing sort keys. Run it against a scratch database.")
+    parser.add_argument("sorting", nargs="*", default=["beatmapsnapshot.difficulty_rating:desc", "beatmapsnapshot.bpm:asc", "profile.total_kudosu:desc"], help="Sorting fields as field:order")
+    parser.add_argument("--beatmapsets", type=int, default=100_000, help="Synthetic beatmapsets to seed (already seeded ones are reused)")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent archive transactions while seeding")
+    parser.add_argument("--limit", type=int, default=50, help="Page size")
+    parser.add_argument("--seed", type=int, default=0, help="Fake osu! API seed")
+    args = parser.parse_args()
+
+    db = PostgresqlDB()
+
+    try:
+        await db.create_database()
+        generator = SyntheticDataGenerator(args.seed)
+
+        await seed(db, generator, args.beatmapsets, args.concurrency)
+        await backfill(["sort_keys"])
+        await seed_profiles(db, generator)
+
+        async with db.session() as session:
+            await session.execute(text("ANALYZE"))
+
+            for sorting in args.sorting:
+                target, _, order = sorting.partition(":")
+                sorting_field = SortingField[target.replace(".", "__").upper()]
+                sort_order = SortOrder(order or SortOrder.ASCENDING.value)
+
+                for name, legacy in (("before (row_number CTE)", True), ("after (listing sort keys)", False)):
+                    query = page_query(sorting_field, sort_order, legacy, args.limit)
+                    compiled_query = query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+                    plan = (await session.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {compiled_query}"))).scalars().all()
+
+                    print(f"\n=== {sorting} {name} ===")
+                    print("\n".join(plan))
+    finally:
+        await db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,10 @@
 import asyncio
 import logging
+import contextvars
 
 from app.redis import RedisClient
 from app.database import PostgresqlDB
+from app.metrics import current_caller
 from .services import ServiceClass, ServiceType
 
 logger = logging.getLogger("daemon")
@@ -18,7 +20,7 @@ class ServiceDaemon:
 
     async def run(self):
         self.service_tasks = {
-            service_class: asyncio.create_task(service.run(), name=f"Service-{service_class.name}")
+            service_class: asyncio.create_task(service.run(), name=f"Service-{service_class.name}", context=self.service_context(service_class))
             for service_class, service in self.services.items()
         }
 
@@ -30,6 +32,13 @@ class ServiceDaemon:
             logger.exception("Daemon encountered an error:\n%s", e)
             raise
 
+    @staticmethod
+    def service_context(service_class: ServiceClass) -> contextvars.Context:
+        context = contextvars.copy_context()
+        context.run(current_caller.set, f"daemon:{service_class.name.lower()}")
+
+        return context
+
     def register_service(self, service_class: ServiceClass):
         self.services[service_class] = service_class.value(self.rc, self.db)
 
@@ -8,9 +8,10 @@ from httpx import ConnectTimeout
 from app.osu_api import OsuAPIClient
 from app.database.models import ProfileFetcherTask
 from app.database.schemas import ProfileSchema
-from app.redis import ChannelName, Namespace, LOCK_EXPIRY
+from app.redis import ChannelName, Namespace, RateLimitPriority, RedisLock
 from app.utils import aware_utcnow
 from app.decorators import auto_retry
+from app.exceptions import CircuitOpenError
 from .enums import RuntimeTaskName
 from .service import Service
 
@@ -25,7 +26,7 @@ class ProfileFetcher(Service):
         super().__init__(*args)
 
         self.pubsub = self.rc.pubsub()
-        self.oac = OsuAPIClient(self.rc)
+        self.oac = OsuAPIClient(self.rc, priority=RateLimitPriority.BACKGROUND)
 
         self.task_heap: list[tuple[datetime, int]] = []
         self.tasks: dict[int, asyncio.Task] = {}
@@ -104,7 +105,17 @@ class ProfileFetcher(Service):
         if delay > 0:
             await asyncio.sleep(delay)
 
-        await self.fetch_profile(task_id)
+        try:
+            await self.fetch_profile(task_id)
+        except CircuitOpenError as e:
+            logger.warning(f"osu! API is unavailable, postponing task {task_id} by {e.remaining_time:.0f} seconds")
+
+            async with self.task_condition:
+                heapq.heappush(self.task_heap, (e.retry_at.astimezone(timezone.utc), task_id))
+                self.task_condition.notify()
+
+            return
+
         fetch_time = aware_utcnow()
         next_execution_time = fetch_time + timedelta(hours=PROFILE_FETCHER_INTERVAL_HOURS)
         await self.db.update_profile_fetcher_task(task_id, last_fetch=fetch_time)
@@ -125,15 +136,13 @@ class ProfileFetcher(Service):
         if not (task := await self.db.get_profile_fetcher_task(id=task_id)):
             raise ValueError(f"Task with ID '{task_id}' not found")
 
-        lock_hash_name = Namespace.LOCK.hash_name(Namespace.OSU_USER_PROFILE.hash_name(task.user_id))
-
-        try:
-            lock_acquired = await self.rc.set(lock_hash_name, "locked", ex=LOCK_EXPIRY, nx=True)
+        lock = RedisLock(self.rc, Namespace.OSU_USER_PROFILE.hash_name(task.user_id))
 
-            if not lock_acquired:
-                return
+        if not await lock.acquire(blocking=False):
+            return
 
-            user_dict = await self.oac.get_user(task.user_id)
+        try:
+            user_dict = await self.oac.fetch_user(task.user_id)
             profile = await self.db.get_profile(user_id=task.user_id)
 
             profile_dict = ProfileSchema.model_validate(user_dict).model_dump(
@@ -145,4 +154,4 @@ class ProfileFetcher(Service):
             else:
                 await self.db.update_profile(profile.id, **profile_dict)
         finally:
-            await self.rc.delete(lock_hash_name)
+            await lock.release()
@@ -8,10 +8,11 @@ from httpx import ConnectTimeout
 from api import v1 as api
 from app.osu_api import OsuAPIClient, ScoreType
 from app.database.models import ScoreFetcherTask
-from app.redis import ChannelName
-from app.utils import aware_utcnow
+from app.redis import ChannelName, Namespace, RateLimitPriority
+from app.utils import aware_utcnow, parse_iso8601
 from app.config import PRIMARY_ADMIN_USER_ID
 from app.decorators import auto_retry
+from app.exceptions import CircuitOpenError
 from .enums import RuntimeTaskName
 from .service import Service
 
@@ -26,7 +27,7 @@ class ScoreFetcher(Service):
         super().__init__(*args)
 
         self.pubsub = self.rc.pubsub()
-        self.oac = OsuAPIClient(self.rc)
+        self.oac = OsuAPIClient(self.rc, priority=RateLimitPriority.BACKGROUND)
 
         self.task_heap: list[tuple[datetime, int]] = []
         self.tasks: dict[int, asyncio.Task] = {}
@@ -105,7 +106,17 @@ class ScoreFetcher(Service):
         if delay > 0:
             await asyncio.sleep(delay)
 
-        await self.fetch_scores(task_id)
+        try:
+            await self.fetch_scores(task_id)
+        except CircuitOpenError as e:
+            logger.warning(f"osu! API is unavailable, postponing task {task_id} by {e.remaining_time:.0f} seconds")
+
+            async with self.task_condition:
+                heapq.heappush(self.task_heap, (e.retry_at.astimezone(timezone.utc), task_id))
+                self.task_condition.notify()
+
+            return
+
         fetch_time = aware_utcnow()
         next_execution_time = fetch_time + timedelta(hours=SCORE_FETCHER_INTERVAL_HOURS)
         await self.db.update_score_fetcher_task(task_id, last_fetch=fetch_time)
@@ -122,17 +133,51 @@ class ScoreFetcher(Service):
             logger.error(f"Task '{task.get_name()}' failed with error: {e}", exc_info=True)
 
     @auto_retry(retry_exceptions=(ConnectTimeout,))
-    async def fetch_scores(self, task_id: int):
+    async def fetch_scores(self, task_id: int, score_type: ScoreType = ScoreType.RECENT):
+        # Best and first place scores aren't ordered by creation date, so every page of them is still fetched and the
+        # watermark only spares the database checks of the ones already seen
         if not (task := await self.db.get_score_fetcher_task(id=task_id)):
             raise ValueError(f"Task with ID '{task_id}' not found")
 
-        scores = await self.oac.get_user_scores(task.user_id, ScoreType.RECENT)
+        watermark = await self.get_watermark(task.user_id, score_type)
+        newest_created_at = watermark
+        oldest_deferred_created_at = None
+        submittable_beatmap_ids: dict[int, bool] = {}
 
-        for score in scores:
-            if not await self.score_is_submittable(score):
-                continue
+        async for score in self.oac.iter_user_scores(task.user_id, score_type, since=watermark):
+            created_at = parse_iso8601(score["created_at"])
+            newest_created_at = max(newest_created_at, created_at) if newest_created_at is not None else created_at
+            beatmap_id = score["beatmap"]["id"]
+
+            if beatmap_id not in submittable_beatmap_ids:
+                submittable_beatmap_ids[beatmap_id] = await self.score_is_submittable(score)
 
-            await api.scores.post(score, user=PRIMARY_ADMIN_USER_ID)
+            if submittable_beatmap_ids[beatmap_id]:
+                _, status_code = await api.scores.post(score, user=PRIMARY_ADMIN_USER_ID)
+
+                if status_code in (201, 409):
+                    continue
+
+            # Scores that can't be stored yet, like those on a beatmap without a leaderboard, are kept ahead of the watermark
+            # so the next runs check them again
+            oldest_deferred_created_at = min(oldest_deferred_created_at, created_at) if oldest_deferred_created_at is not None else created_at
+
+        if oldest_deferred_created_at is not None:
+            newest_created_at = min(newest_created_at, oldest_deferred_created_at - timedelta(microseconds=1))
+
+        if newest_created_at is not None and newest_created_at != watermark:
+            await self.rc.set(self.watermark_hash_name(task.user_id, score_type), newest_created_at.isoformat())
+
+    async def get_watermark(self, user_id: int, score_type: ScoreType) -> datetime | None:
+        # Without one every score is checked again, since the stored scores don't tell which older ones were deferred
+        if watermark := await self.rc.get(self.watermark_hash_name(user_id, score_type)):
+            return datetime.fromisoformat(watermark)
+
+        return None
 
     async def score_is_submittable(self, score: dict) -> bool:
         return bool(await self.db.get_leaderboard(beatmap_id=score["beatmap"]["id"]))
+
+    @staticmethod
+    def watermark_hash_name(user_id: int, score_type: ScoreType) -> str:
+        return Namespace.SCORE_WATERMARK.hash_name(f"{user_id}:{score_type.value}")
@@ -0,0 +1,3 @@
+from .app import create_app, FakeOsuAPI, FaultInjectionMiddleware
+from .generator import SyntheticDataGenerator
+from .fixtures import FixtureStore
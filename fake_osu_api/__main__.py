@@ -0,0 +1,41 @@
+import asyncio
+import argparse
+
+import uvicorn
+
+from .app import create_app
+from .config import FAKE_OSU_API_CONFIGURATION
+from .fixtures import record
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m fake_osu_api", description="Local stand-in for the osu! API")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Serve synthetic and/or recorded responses")
+    serve_parser.add_argument("--host", default=FAKE_OSU_API_CONFIGURATION["host"])
+    serve_parser.add_argument("--port", type=int, default=FAKE_OSU_API_CONFIGURATION["port"])
+    serve_parser.add_argument("--seed", type=int, default=FAKE_OSU_API_CONFIGURATION["seed"])
+    serve_parser.add_argument("--fixtures-dir", default=FAKE_OSU_API_CONFIGURATION["fixtures_dir"])
+    serve_parser.add_argument("--fixtures-only", action="store_true", default=FAKE_OSU_API_CONFIGURATION["fixtures_only"])
+    serve_parser.add_argument("--latency-ms", type=float, default=FAKE_OSU_API_CONFIGURATION["latency_ms"])
+    serve_parser.add_argument("--latency-jitter-ms", type=float, default=FAKE_OSU_API_CONFIGURATION["latency_jitter_ms"])
+    serve_parser.add_argument("--rate-limit-per-minute", type=int, default=FAKE_OSU_API_CONFIGURATION["rate_limit_per_minute"])
+    serve_parser.add_argument("--error-rate", type=float, default=FAKE_OSU_API_CONFIGURATION["error_rate"])
+
+    record_parser = subparsers.add_parser("record", help="Record real osu! API responses into a fixtures directory")
+    record_parser.add_argument("--fixtures-dir", required=True)
+    record_parser.add_argument("--beatmapsets", type=int, nargs="*", default=[])
+    record_parser.add_argument("--users", type=int, nargs="*", default=[])
+
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        config = {key: value for key, value in vars(args).items() if key in FAKE_OSU_API_CONFIGURATION}
+        uvicorn.run(create_app(config), host=args.host, port=args.port)
+    elif args.command == "record":
+        asyncio.run(record(args.fixtures_dir, args.beatmapsets, args.users))
+
+
+if __name__ == "__main__":
+    main()
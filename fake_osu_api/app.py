@@ -0,0 +1,207 @@
+import time
+import random
+import asyncio
+from collections import deque
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+
+from .config import FAKE_OSU_API_CONFIGURATION
+from .generator import SyntheticDataGenerator
+from .fixtures import FixtureStore
+
+BULK_LOOKUP_LIMIT = 50
+TOKEN_EXPIRES_IN = 86400
+
+
+class FaultInjectionMiddleware(BaseHTTPMiddleware):
+    def __init__(self, app, latency_ms: float = 0, latency_jitter_ms: float = 0, rate_limit_per_minute: int = 0, error_rate: float = 0):
+        super().__init__(app)
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.error_rate = error_rate
+
+        self._request_times: deque[float] = deque()
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if self.rate_limit_per_minute > 0:
+            now = time.monotonic()
+
+            while self._request_times and self._request_times[0] <= now - 60:
+                self._request_times.popleft()
+
+            if len(self._request_times) >= self.rate_limit_per_minute:
+                retry_after = max(1, int(self._request_times[0] + 60 - now) + 1)
+                return JSONResponse({"error": "Too Many Attempts."}, status_code=429, headers={"Retry-After": str(retry_after)})
+
+            self._request_times.append(now)
+
+        if self.latency_ms > 0 or self.latency_jitter_ms > 0:
+            await asyncio.sleep(max(0.0, self.latency_ms + random.uniform(-self.latency_jitter_ms, self.latency_jitter_ms)) / 1000)
+
+        if self.error_rate > 0 and random.random() < self.error_rate:
+            return JSONResponse({"error": "Service Unavailable"}, status_code=503)
+
+        return await call_next(request)
+
+
+class FakeOsuAPI:
+    def __init__(self, generator: SyntheticDataGenerator, fixtures: FixtureStore | None = None, fixtures_only: bool = False):
+        self.generator = generator
+        self.fixtures = fixtures
+        self.fixtures_only = fixtures_only
+
+    # SOURCES
+    async def beatmapset(self, beatmapset_id: int) -> dict | None:
+        if self.fixtures and (beatmapset_dict := await self.fixtures.get_beatmapset(beatmapset_id)) is not None:
+            return beatmapset_dict
+
+        return None if self.fixtures_only else self.generator.beatmapset(beatmapset_id)
+
+    async def beatmap(self, beatmap_id: int) -> dict | None:
+        if self.fixtures and (beatmapset_id := self.fixtures.find_beatmapset_by_beatmap(beatmap_id)) is not None:
+            beatmapset_dict = await self.fixtures.get_beatmapset(beatmapset_id)
+            beatmap_dict = next(beatmap for beatmap in beatmapset_dict["beatmaps"] if beatmap["id"] == beatmap_id)
+            return {**beatmap_dict, "beatmapset": {key: value for key, value in beatmapset_dict.items() if key != "beatmaps"}}
+
+        if self.fixtures_only or (beatmap_dict := self.generator.beatmap(beatmap_id)) is None:
+            return None
+
+        beatmapset_dict = self.generator.beatmapset(beatmap_dict["beatmapset_id"])
+        beatmapset_dict.pop("beatmaps")
+
+        return {**beatmap_dict, "beatmapset": beatmapset_dict}
+
+    async def user(self, user_id: int) -> dict | None:
+        if self.fixtures and (user_dict := await self.fixtures.get_user(user_id)) is not None:
+            return user_dict
+
+        return None if self.fixtures_only else self.generator.user(user_id)
+
+    async def scores(self, user_id: int, score_type: str, limit: int, offset: int) -> list[dict] | None:
+        if self.fixtures and (scores := await self.fixtures.get_scores(user_id, score_type)) is not None:
+            return scores[offset:offset + limit]
+
+        return None if self.fixtures_only else self.generator.scores(user_id, score_type, limit, offset)
+
+    async def osu_file(self, beatmap_id: int) -> bytes | None:
+        if self.fixtures and (content := await self.fixtures.get_osu_file(beatmap_id)) is not None:
+            return content
+
+        if self.fixtures_only or self.generator.beatmap(beatmap_id) is None:
+            return None
+
+        return self.generator.osu_file(beatmap_id)
+
+    # ROUTES
+    async def token(self, request: Request) -> Response:
+        form = await request.form()
+
+        if form.get("grant_type") not in ("client_credentials", "authorization_code", "refresh_token"):
+            return JSONResponse({"error": "unsupported_grant_type"}, status_code=400)
+
+        return JSONResponse({
+            "token_type": "Bearer",
+            "expires_in": TOKEN_EXPIRES_IN,
+            "access_token": f"fake-{random.getrandbits(128):032x}",
+            **({"refresh_token": f"fake-{random.getrandbits(128):032x}"} if form.get("grant_type") != "client_credentials" else {})
+        })
+
+    @staticmethod
+    async def authorize(request: Request) -> Response:
+        return JSONResponse({"error": "Interactive authorization is not supported by the fake osu! API"}, status_code=501)
+
+    async def get_beatmapset(self, request: Request) -> Response:
+        return self._json_or_404(await self.beatmapset(request.path_params["beatmapset"]))
+
+    async def get_beatmap(self, request: Request) -> Response:
+        return self._json_or_404(await self.beatmap(request.path_params["beatmap"]))
+
+    async def get_beatmaps(self, request: Request) -> Response:
+        beatmap_ids = self._bulk_ids(request)
+        beatmaps = [beatmap_dict for beatmap_id in beatmap_ids if (beatmap_dict := await self.beatmap(beatmap_id)) is not None]
+
+        return JSONResponse({"beatmaps": beatmaps})
+
+    async def get_user(self, request: Request) -> Response:
+        return self._json_or_404(await self.user(request.path_params["user"]))
+
+    async def get_users(self, request: Request) -> Response:
+        user_ids = self._bulk_ids(request)
+        users = [self._user_compact(user_dict) for user_id in user_ids if (user_dict := await self.user(user_id)) is not None]
+
+        return JSONResponse({"users": users})
+
+    async def get_user_scores(self, request: Request) -> Response:
+        limit = int(request.query_params.get("limit", 100))
+        offset = int(request.query_params.get("offset", 0))
+
+        return self._json_or_404(await self.scores(request.path_params["user"], request.path_params["type"], limit, offset))
+
+    async def download(self, request: Request) -> Response:
+        if (content := await self.osu_file(request.path_params["beatmap"])) is None:
+            return Response(status_code=404)
+
+        return Response(content, media_type="application/octet-stream")
+
+    @staticmethod
+    def _bulk_ids(request: Request) -> list[int]:
+        return [int(id_) for id_ in request.query_params.getlist("ids[]")[:BULK_LOOKUP_LIMIT]]
+
+    @staticmethod
+    def _user_compact(user_dict: dict) -> dict:
+        return {key: value for key, value in user_dict.items() if not key.endswith("_count") and key not in ("kudosu", "join_date", "playmode")}
+
+    @staticmethod
+    def _json_or_404(data: dict | list | None) -> Response:
+        if data is None:
+            return JSONResponse({"error": None}, status_code=404)
+
+        return JSONResponse(data)
+
+
+class BearerAuthMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        if request.url.path.startswith("/api/") and not request.headers.get("Authorization", "").startswith("Bearer "):
+            return JSONResponse({"authentication": "basic"}, status_code=401)
+
+        return await call_next(request)
+
+
+def create_app(config: dict = None) -> Starlette:
+    config = {**FAKE_OSU_API_CONFIGURATION, **(config or {})}
+
+    generator = SyntheticDataGenerator(config["seed"], config["restricted_user_ratio"], config["revision_interval"])
+    fixtures = FixtureStore(config["fixtures_dir"]) if config["fixtures_dir"] else None
+    api = FakeOsuAPI(generator, fixtures, config["fixtures_only"])
+
+    routes = [
+        Route("/oauth/token", api.token, methods=["POST"]),
+        Route("/oauth/authorize", api.authorize),
+        Route("/api/v2/beatmapsets/{beatmapset:int}", api.get_beatmapset),
+        Route("/api/v2/beatmaps", api.get_beatmaps),
+        Route("/api/v2/beatmaps/{beatmap:int}", api.get_beatmap),
+        Route("/api/v2/users", api.get_users),
+        Route("/api/v2/users/{user:int}/scores/{type}", api.get_user_scores),
+        Route("/api/v2/users/{user:int}", api.get_user),
+        Route("/api/v2/users/{user:int}/{mode}", api.get_user),
+        Route("/osu/{beatmap:int}", api.download)
+    ]
+
+    middleware = [
+        Middleware(
+            FaultInjectionMiddleware,
+            latency_ms=config["latency_ms"],
+            latency_jitter_ms=config["latency_jitter_ms"],
+            rate_limit_per_minute=config["rate_limit_per_minute"],
+            error_rate=config["error_rate"]
+        ),
+        Middleware(BearerAuthMiddleware)
+    ]
+
+    return Starlette(routes=routes, middleware=middleware)
@@ -0,0 +1,15 @@
+import os
+
+FAKE_OSU_API_CONFIGURATION = {
+    "host": os.getenv("FAKE_OSU_API_HOST", "127.0.0.1"),
+    "port": int(os.getenv("FAKE_OSU_API_PORT", 8001)),
+    "seed": int(os.getenv("FAKE_OSU_API_SEED", 0)),
+    "fixtures_dir": os.getenv("FAKE_OSU_API_FIXTURES_DIR"),
+    "fixtures_only": os.getenv("FAKE_OSU_API_FIXTURES_ONLY", "false").lower() in ("true", "1", "yes"),
+    "latency_ms": float(os.getenv("FAKE_OSU_API_LATENCY_MS", 0)),
+    "latency_jitter_ms": float(os.getenv("FAKE_OSU_API_LATENCY_JITTER_MS", 0)),
+    "rate_limit_per_minute": int(os.getenv("FAKE_OSU_API_RATE_LIMIT_PER_MINUTE", 0)),
+    "error_rate": float(os.getenv("FAKE_OSU_API_ERROR_RATE", 0)),
+    "restricted_user_ratio": float(os.getenv("FAKE_OSU_API_RESTRICTED_USER_RATIO", 0.05)),
+    "revision_interval": int(os.getenv("FAKE_OSU_API_REVISION_INTERVAL", 0))
+}
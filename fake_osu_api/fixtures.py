@@ -0,0 +1,121 @@
+import os
+import json
+
+import aiofiles
+
+
+class FixtureStore:
+    def __init__(self, fixtures_dir: str):
+        self.fixtures_dir = fixtures_dir
+
+    async def get_beatmapset(self, beatmapset_id: int) -> dict | None:
+        return await self._read_json("beatmapsets", f"{beatmapset_id}.json")
+
+    async def get_user(self, user_id: int) -> dict | None:
+        return await self._read_json("users", f"{user_id}.json")
+
+    async def get_scores(self, user_id: int, score_type: str) -> list[dict] | None:
+        return await self._read_json("scores", str(user_id), f"{score_type}.json")
+
+    async def get_osu_file(self, beatmap_id: int) -> bytes | None:
+        path = os.path.join(self.fixtures_dir, "osu", f"{beatmap_id}.osu")
+
+        if not os.path.exists(path):
+            return None
+
+        async with aiofiles.open(path, "rb") as file:
+            return await file.read()
+
+    async def put_beatmapset(self, beatmapset_dict: dict):
+        await self._write_json(beatmapset_dict, "beatmapsets", f"{beatmapset_dict["id"]}.json")
+
+    async def put_user(self, user_dict: dict):
+        await self._write_json(user_dict, "users", f"{user_dict["id"]}.json")
+
+    async def put_scores(self, user_id: int, score_type: str, scores: list[dict]):
+        await self._write_json(scores, "scores", str(user_id), f"{score_type}.json")
+
+    async def put_osu_file(self, beatmap_id: int, content: bytes):
+        path = os.path.join(self.fixtures_dir, "osu", f"{beatmap_id}.osu")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        async with aiofiles.open(path, "wb") as file:
+            await file.write(content)
+
+    def find_beatmapset_by_beatmap(self, beatmap_id: int) -> int | None:
+        beatmapsets_dir = os.path.join(self.fixtures_dir, "beatmapsets")
+
+        if not os.path.isdir(beatmapsets_dir):
+            return None
+
+        for filename in os.listdir(beatmapsets_dir):
+            with open(os.path.join(beatmapsets_dir, filename), "r") as file:
+                beatmapset_dict = json.load(file)
+
+            if any(beatmap["id"] == beatmap_id for beatmap in beatmapset_dict.get("beatmaps", [])):
+                return beatmapset_dict["id"]
+
+        return None
+
+    async def _read_json(self, *parts: str) -> dict | list | None:
+        path = os.path.join(self.fixtures_dir, *parts)
+
+        if not os.path.exists(path):
+            return None
+
+        async with aiofiles.open(path, "r") as file:
+            return json.loads(await file.read())
+
+    async def _write_json(self, data: dict | list, *parts: str):
+        path = os.path.join(self.fixtures_dir, *parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        async with aiofiles.open(path, "w") as file:
+            await file.write(json.dumps(data, indent=2))
+
+
+async def record(fixtures_dir: str, beatmapset_ids: list[int], user_ids: list[int]):
+    from httpx import HTTPStatusError
+
+    from app.osu_api import OsuAPIClient, ScoreType
+    from app.beatmap_manager import BEATMAP_DOWNLOAD_BASEURL
+    from app.http_client import get_http_client, close_http_client
+    from app.redis import RedisClient
+    from app.logger import logger
+
+    store = FixtureStore(fixtures_dir)
+    rc = RedisClient()
+    oac = OsuAPIClient(rc)
+    http = get_http_client()
+
+    try:
+        for beatmapset_id in beatmapset_ids:
+            try:
+                beatmapset_dict = await oac.fetch_beatmapset(beatmapset_id)
+            except HTTPStatusError as e:
+                logger.warning(f"[{FixtureStore.__name__}] Skipping beatmapset {beatmapset_id}: {e.response.status_code}")
+                continue
+
+            await store.put_beatmapset(beatmapset_dict)
+
+            for beatmap_dict in beatmapset_dict["beatmaps"]:
+                response = await http.get(BEATMAP_DOWNLOAD_BASEURL + str(beatmap_dict["id"]))
+                response.raise_for_status()
+                await store.put_osu_file(beatmap_dict["id"], response.content)
+
+            logger.info(f"[{FixtureStore.__name__}] Recorded beatmapset {beatmapset_id} with {len(beatmapset_dict["beatmaps"])} beatmaps")
+
+        for user_id in user_ids:
+            try:
+                await store.put_user(await oac.fetch_user(user_id))
+
+                for score_type in ScoreType:
+                    await store.put_scores(user_id, score_type.value, await oac.get_user_scores(user_id, score_type, limit=100))
+            except HTTPStatusError as e:
+                logger.warning(f"[{FixtureStore.__name__}] Skipping user {user_id}: {e.response.status_code}")
+                continue
+
+            logger.info(f"[{FixtureStore.__name__}] Recorded user {user_id}")
+    finally:
+        await close_http_client()
+        await rc.aclose()
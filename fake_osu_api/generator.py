@@ -0,0 +1,244 @@
+import time
+import random
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+MAX_DIFFICULTIES = 9
+SCORE_BEATMAPSET_POOL = 1000
+MODES = ("osu", "taiko", "fruits", "mania")
+STATUSES = ("graveyard", "wip", "pending")
+GENRES = ({"id": 2, "name": "Video Game"}, {"id": 3, "name": "Anime"}, {"id": 4, "name": "Rock"}, {"id": 5, "name": "Pop"}, {"id": 10, "name": "Electronic"})
+LANGUAGES = ({"id": 2, "name": "English"}, {"id": 3, "name": "Japanese"}, {"id": 5, "name": "Instrumental"}, {"id": 6, "name": "Korean"})
+WORDS = ("graveyard", "night", "drive", "ocean", "neon", "echo", "storm", "lullaby", "velocity", "memory", "paradise", "signal", "horizon", "cascade", "ember")
+RANKS = ("XH", "X", "SH", "S", "A", "B", "C", "D")
+EPOCH = datetime(2015, 1, 1, tzinfo=timezone.utc)
+RECENT_SCORES_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class SyntheticDataGenerator:
+    def __init__(self, seed: int = 0, restricted_user_ratio: float = 0.05, revision_interval: int = 0):
+        self.seed = seed
+        self.restricted_user_ratio = restricted_user_ratio
+        self.revision_interval = revision_interval
+
+    # BEATMAPSETS
+    def beatmapset(self, beatmapset_id: int) -> dict:
+        rng = self._rng("beatmapset", beatmapset_id, self.revision)
+        user_id = rng.randint(2, 40_000_000)
+        submitted_date = EPOCH + timedelta(days=rng.randint(0, 3000))
+        title = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 4)))
+        artist = " ".join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(1, 2)))
+        status = rng.choice(STATUSES)
+
+        user = self.user_compact(user_id) or {"id": user_id, "username": "[deleted user]", "avatar_url": None, "country_code": None, "is_deleted": True}
+
+        return {
+            "id": beatmapset_id,
+            "user_id": user_id,
+            "artist": artist,
+            "artist_unicode": artist,
+            "availability": {"download_disabled": False, "more_information": None},
+            "covers": {
+                key: f"https://assets.ppy.sh/beatmaps/{beatmapset_id}/covers/{key.replace("@2x", "")}{"@2x" if key.endswith("@2x") else ""}.jpg"
+                for key in ("cover", "cover@2x", "card", "card@2x", "list", "list@2x", "slimcover", "slimcover@2x")
+            },
+            "creator": user["username"],
+            "deleted_at": None,
+            "favourite_count": rng.randint(0, 500),
+            "genre": rng.choice(GENRES),
+            "hype": {"current": rng.randint(0, 5), "required": 5} if status == "pending" else None,
+            "language": rng.choice(LANGUAGES),
+            "last_updated": self._isoformat(submitted_date + timedelta(days=rng.randint(0, 60))),
+            "nsfw": rng.random() < 0.02,
+            "offset": 0,
+            "play_count": rng.randint(0, 100_000),
+            "preview_url": f"//b.ppy.sh/preview/{beatmapset_id}.mp3",
+            "ranked": {"graveyard": -2, "wip": -1, "pending": 0}[status],
+            "source": "",
+            "status": status,
+            "submitted_date": self._isoformat(submitted_date),
+            "tags": " ".join(rng.sample(WORDS, rng.randint(0, 6))),
+            "title": title,
+            "title_unicode": title,
+            "track_id": None,
+            "user": user,
+            "video": rng.random() < 0.1,
+            "beatmaps": [self.beatmap(beatmapset_id * 10 + i) for i in range(self.difficulty_count(beatmapset_id))]
+        }
+
+    def difficulty_count(self, beatmapset_id: int) -> int:
+        return self._rng("difficulties", beatmapset_id).randint(1, MAX_DIFFICULTIES)
+
+    # BEATMAPS
+    def beatmap(self, beatmap_id: int) -> dict | None:
+        beatmapset_id, index = divmod(beatmap_id, 10)
+
+        if index >= self.difficulty_count(beatmapset_id):
+            return None
+
+        rng = self._rng("beatmap", beatmap_id, self.revision)
+        beatmapset_rng = self._rng("beatmapset", beatmapset_id, self.revision)
+        beatmapset_user_id = beatmapset_rng.randint(2, 40_000_000)
+        user_id = beatmapset_user_id if rng.random() < 0.8 else rng.randint(2, 40_000_000)
+        mode_int = 0 if rng.random() < 0.7 else rng.randint(1, 3)
+        count_circles, count_sliders, count_spinners = rng.randint(50, 1500), rng.randint(20, 800), rng.randint(0, 5)
+        total_length = rng.randint(30, 600)
+        difficulty_rating = round(1 + index * 0.8 + rng.random(), 2)
+
+        return {
+            "id": beatmap_id,
+            "beatmapset_id": beatmapset_id,
+            "user_id": user_id,
+            "accuracy": round(rng.uniform(3, 10), 1),
+            "ar": round(rng.uniform(3, 10), 1),
+            "bpm": float(rng.randint(80, 280)),
+            "checksum": hashlib.md5(self.osu_file(beatmap_id)).hexdigest(),
+            "count_circles": count_circles,
+            "count_sliders": count_sliders,
+            "count_spinners": count_spinners,
+            "cs": round(rng.uniform(2, 7), 1),
+            "deleted_at": None,
+            "difficulty_rating": difficulty_rating,
+            "drain": round(rng.uniform(2, 8), 1),
+            "failtimes": {"exit": [rng.randint(0, 50) for _ in range(100)], "fail": [rng.randint(0, 50) for _ in range(100)]},
+            "hit_length": int(total_length * 0.9),
+            "last_updated": self._isoformat(EPOCH + timedelta(days=rng.randint(0, 3000))),
+            "max_combo": count_circles + count_sliders * 2 + count_spinners,
+            "mode": MODES[mode_int],
+            "mode_int": mode_int,
+            "owners": [{"id": user_id, "username": f"mapper{user_id}"}],
+            "passcount": rng.randint(0, 5000),
+            "playcount": rng.randint(0, 50_000),
+            "ranked": -2,
+            "status": "graveyard",
+            "total_length": total_length,
+            "url": f"https://osu.ppy.sh/beatmaps/{beatmap_id}",
+            "version": f"Difficulty {index + 1} ({difficulty_rating:.2f}*)"
+        }
+
+    def osu_file(self, beatmap_id: int) -> bytes:
+        rng = self._rng("osu_file", beatmap_id, self.revision)
+        lines = [
+            "osu file format v14",
+            "",
+            "[General]",
+            "AudioFilename: audio.mp3",
+            f"PreviewTime: {rng.randint(0, 60000)}",
+            "",
+            "[Metadata]",
+            f"BeatmapID:{beatmap_id}",
+            f"BeatmapSetID:{beatmap_id // 10}",
+            "",
+            "[Difficulty]",
+            f"HPDrainRate:{rng.randint(2, 8)}",
+            f"CircleSize:{rng.randint(2, 7)}",
+            f"OverallDifficulty:{rng.randint(3, 10)}",
+            f"ApproachRate:{rng.randint(3, 10)}",
+            "",
+            "[HitObjects]"
+        ]
+        offset = 0
+
+        for _ in range(rng.randint(200, 2000)):
+            offset += rng.randint(100, 400)
+            lines.append(f"{rng.randint(0, 512)},{rng.randint(0, 384)},{offset},1,0,0:0:0:0:")
+
+        return "\n".join(lines).encode()
+
+    # USERS
+    def is_restricted(self, user_id: int) -> bool:
+        return self._rng("restricted", user_id).random() < self.restricted_user_ratio
+
+    def user_compact(self, user_id: int) -> dict | None:
+        if self.is_restricted(user_id):
+            return None
+
+        rng = self._rng("user", user_id)
+
+        return {
+            "id": user_id,
+            "username": f"{rng.choice(WORDS)}{user_id}",
+            "avatar_url": f"https://a.ppy.sh/{user_id}",
+            "country_code": rng.choice(("US", "JP", "DE", "KR", "BR", "PL", "FR", "GB")),
+            "default_group": "default",
+            "is_active": True,
+            "is_bot": False,
+            "is_deleted": False,
+            "is_online": False,
+            "is_supporter": rng.random() < 0.2,
+            "last_visit": None,
+            "pm_friends_only": False,
+            "profile_colour": None
+        }
+
+    def user(self, user_id: int) -> dict | None:
+        if (user := self.user_compact(user_id)) is None:
+            return None
+
+        rng = self._rng("user_profile", user_id)
+        kudosu_total = rng.randint(0, 500)
+
+        return {
+            **user,
+            "graveyard_beatmapset_count": rng.randint(0, 50),
+            "loved_beatmapset_count": rng.randint(0, 2),
+            "pending_beatmapset_count": rng.randint(0, 10),
+            "ranked_beatmapset_count": rng.randint(0, 5),
+            "kudosu": {"available": rng.randint(0, kudosu_total), "total": kudosu_total},
+            "join_date": self._isoformat(EPOCH + timedelta(days=rng.randint(0, 3000))),
+            "playmode": "osu"
+        }
+
+    # SCORES
+    def scores(self, user_id: int, score_type: str, limit: int = 100, offset: int = 0) -> list[dict] | None:
+        if self.is_restricted(user_id):
+            return None
+
+        rng = self._rng("scores", user_id, score_type, self.revision)
+        count = {"recent": rng.randint(0, 20), "best": 100, "firsts": rng.randint(0, 30)}.get(score_type, 0)
+        # Anchored to the start of the revision rather than the clock, so the same revision always serves the same timestamps
+        latest = datetime.fromtimestamp(self.revision * self.revision_interval, timezone.utc) if self.revision_interval > 0 else RECENT_SCORES_EPOCH
+        scores = []
+
+        for i in range(count):
+            beatmapset_id = rng.randint(1, SCORE_BEATMAPSET_POOL)
+            beatmap_id = beatmapset_id * 10 + rng.randrange(self.difficulty_count(beatmapset_id))
+            count_300, count_100, count_50, count_miss = rng.randint(100, 1500), rng.randint(0, 100), rng.randint(0, 20), rng.randint(0, 10)
+            total = count_300 + count_100 + count_50 + count_miss
+            accuracy = (300 * count_300 + 100 * count_100 + 50 * count_50) / (300 * total)
+            created_at = latest - timedelta(hours=i * 6 + rng.randint(0, 5)) if score_type == "recent" else EPOCH + timedelta(days=rng.randint(0, 3000))
+
+            scores.append({
+                "id": rng.randint(1, 2 ** 40),
+                "user_id": user_id,
+                "accuracy": round(accuracy, 4),
+                "best_id": None,
+                "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "max_combo": rng.randint(100, 2000),
+                "mode": "osu",
+                "mode_int": 0,
+                "mods": rng.sample(("HD", "HR", "DT", "NF", "EZ", "FL"), rng.randint(0, 2)),
+                "passed": True,
+                "perfect": count_miss == 0,
+                "pp": round(rng.uniform(10, 400), 3) if score_type != "recent" else None,
+                "rank": rng.choice(RANKS),
+                "replay": False,
+                "score": rng.randint(100_000, 100_000_000),
+                "statistics": {"count_100": count_100, "count_300": count_300, "count_50": count_50, "count_geki": 0, "count_katu": 0, "count_miss": count_miss},
+                "type": "score_best_osu",
+                "beatmap": {"id": beatmap_id, "beatmapset_id": beatmapset_id, "mode": "osu", "status": "graveyard"},
+                "beatmapset": {"id": beatmapset_id}
+            })
+
+        return scores[offset:offset + limit]
+
+    @property
+    def revision(self) -> int:
+        return int(time.time() // self.revision_interval) if self.revision_interval > 0 else 0
+
+    def _rng(self, *parts) -> random.Random:
+        return random.Random(":".join(str(part) for part in (self.seed, *parts)))
+
+    @staticmethod
+    def _isoformat(dt: datetime) -> str:
+        return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -6,7 +6,8 @@ from httpx import HTTPStatusError
 
 from app.database import PostgresqlDB
 from app.beatmap_manager import BeatmapManager
-from app.redis import RedisClient
+from app.http_client import close_http_client
+from app.redis import RedisClient, RateLimitPriority
 from app.logger import logger
 from setup import setup
 
@@ -28,7 +29,7 @@ async def migrate():
 
             if not await db.get_beatmapset(id=beatmapset_id):
                 try:
-                    bm = BeatmapManager(rc, db)
+                    bm = BeatmapManager(rc, db, priority=RateLimitPriority.BACKGROUND)
                     await bm.archive(beatmapset_id)
                 except HTTPStatusError as e:
                     if e.response.status_code == 404:
@@ -44,6 +45,7 @@ async def migrate():
             if __name__ == "__main__":
                 print(f"\r[requests] [{bar}{spaces}] {progress}% ({i}/{total_rows})", end="")
 
+    await close_http_client()
     logger.info("\nMigration complete!")
 
 
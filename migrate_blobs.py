@@ -0,0 +1,74 @@
+import os
+import shutil
+import asyncio
+import argparse
+
+from sqlalchemy.sql import select, func
+
+from app.database import PostgresqlDB
+from app.database.models import BeatmapSnapshot
+from app.beatmap_manager import blob_store
+from app.logger import logger
+from app.config import INSTANCE_DIR
+
+LEGACY_BEATMAPS_PATH = os.path.join(INSTANCE_DIR, "beatmaps")
+LEGACY_BEATMAP_SNAPSHOT_FILE_PATH = os.path.join(LEGACY_BEATMAPS_PATH, "{beatmap_id}/{snapshot_number}.osu")
+
+
+async def migrate_blobs(dry_run: bool = False, keep: bool = False):
+    # Moves instance/beatmaps/{beatmap_id}/{snapshot_number}.osu into the content-addressed blob store
+    db = PostgresqlDB()
+    counts = {"moved": 0, "deduplicated": 0, "missing": 0, "mismatched": 0}
+
+    logger.info(f"Migrating .osu files from {LEGACY_BEATMAPS_PATH} to {blob_store.root}...")
+
+    async with db.session() as session:
+        select_stmt = select(BeatmapSnapshot.beatmap_id, BeatmapSnapshot.snapshot_number, BeatmapSnapshot.checksum)
+        total_rows = await session.scalar(select(func.count()).select_from(BeatmapSnapshot))
+        result = await session.stream(select_stmt)
+        i = 0
+
+        async for beatmap_id, snapshot_number, checksum in result:
+            i += 1
+            legacy_path = LEGACY_BEATMAP_SNAPSHOT_FILE_PATH.format(beatmap_id=beatmap_id, snapshot_number=snapshot_number)
+
+            if not os.path.exists(legacy_path):
+                counts["missing"] += 1
+            elif (actual_checksum := await asyncio.to_thread(blob_store.hash_file, legacy_path)) != checksum:
+                counts["mismatched"] += 1
+                logger.warning(f"{legacy_path} has checksum {actual_checksum}, expected {checksum}; leaving it in place")
+            elif blob_store.exists(checksum):
+                counts["deduplicated"] += 1
+
+                if not dry_run and not keep:
+                    os.remove(legacy_path)
+            else:
+                counts["moved"] += 1
+
+                if not dry_run:
+                    temp_path = blob_store.temp_path(checksum)
+                    await asyncio.to_thread(shutil.copyfile if keep else shutil.move, legacy_path, temp_path)
+                    await asyncio.to_thread(blob_store.commit, temp_path, checksum)
+
+            if __name__ == "__main__" and total_rows:
+                progress = int((i / total_rows) * 100)
+                bar = "=" * (progress // 2)
+                spaces = " " * (50 - len(bar))
+
+                print(f"\r[blobs] [{bar}{spaces}] {progress}% ({i}/{total_rows})", end="")
+
+    if not dry_run and not keep and os.path.isdir(LEGACY_BEATMAPS_PATH):
+        for directory, _, _ in os.walk(LEGACY_BEATMAPS_PATH, topdown=False):
+            if not os.listdir(directory):
+                os.rmdir(directory)
+
+    logger.info(f"\nBlob migration complete{" (dry run)" if dry_run else ""}: {", ".join(f"{count} {name}" for name, count in counts.items())}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move archived .osu files into the content-addressed blob store")
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be migrated")
+    parser.add_argument("--keep", action="store_true", help="Copy files instead of moving them, leaving the old tree intact")
+    args = parser.parse_args()
+
+    asyncio.run(migrate_blobs(dry_run=args.dry_run, keep=args.keep))